@@ -131,7 +131,6 @@ def main():
     with tab1:
         review_container = st.container()
     with tab2:
-        progress_container = st.empty()  # 会話ログの上に表示するため、先に定義
         conversation_container = st.container()
     
     # サイドバー（AIレビューのスピナーをレビュータブに表示するためコンテナを渡す）
@@ -146,11 +145,12 @@ def main():
     
     # タブ1: AIレビュー結果（会話ログ出力先を渡す）
     with review_container:
-        render_review_results(selected_department, conversation_container, progress_container, model_name=model_name)
+        render_review_results(selected_department, conversation_container, model_name=model_name)
     
-    # タブ2: イノベーション分隊の会話ログ
-    with conversation_container:
-        render_conversation_log()
+    # タブ2: イノベーション分隊の会話ログ（実行中はジョブの進捗表示が代わりに描画される）
+    if not st.session_state.get("is_agent_running"):
+        with conversation_container:
+            render_conversation_log()
     
     # タブ3: アイデア創出レポート
     with tab3:
@@ -3,29 +3,37 @@ R&D Brain - Backend Module
 Supabaseとの接続とベクトル検索機能を提供
 """
 
+from __future__ import annotations
+
 import streamlit as st
 
-# duckduckgo-searchの互換性対応
 import sys
-try:
-    import duckduckgo_search
-    if "ddgs" not in sys.modules:
-        sys.modules["ddgs"] = duckduckgo_search
-except ImportError:
-    pass
-
-from langchain_community.vectorstores import SupabaseVectorStore
-from langchain_openai import OpenAIEmbeddings
-from ddgs import DDGS
-from supabase import create_client, Client
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+import hashlib
 import json
+import logging
 import os
+import re
+import time
+import unicodedata
 from dotenv import load_dotenv
 
+# langchain / supabase / OpenAI / DuckDuckGo のクライアントは重いため、
+# アプリの起動を遅らせないよう初めて使うときにインポートする
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import SupabaseVectorStore
+    from langchain_openai import OpenAIEmbeddings
+    from supabase import Client
+
+    from services.chunking import Passage
+
 # .envファイルから環境変数を読み込む
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 def init_vector_store() -> SupabaseVectorStore:
     """
@@ -34,6 +42,10 @@ def init_vector_store() -> SupabaseVectorStore:
     Returns:
         SupabaseVectorStore: 初期化されたベクトルストア
     """
+    from langchain_community.vectorstores import SupabaseVectorStore
+    from langchain_openai import OpenAIEmbeddings
+    from supabase import create_client
+
     # 環境変数から設定を取得
     supabase_url = os.getenv("SUPABASE_URL")
     supabase_key = os.getenv("SUPABASE_KEY")
@@ -66,112 +78,918 @@ def get_supabase_client() -> Client:
     Returns:
         Client: Supabaseクライアント
     """
+    from supabase import create_client
+
     supabase_url = os.getenv("SUPABASE_URL")
     supabase_key = os.getenv("SUPABASE_KEY")
     return create_client(supabase_url, supabase_key)
 
 
-def save_interview_note(text: str, metadata: Dict) -> bool:
+def _call_local_pgvector(function_name: str, params: Dict, dsn: str) -> List[Dict]:
+    """
+    ローカルのPostgres+pgvectorでSQL関数を呼び出す（テスト用のSupabase代替）
+    
+    Args:
+        function_name: 呼び出すSQL関数名
+        params: 関数の引数（名前付き）
+        dsn: Postgresの接続文字列
+    
+    Returns:
+        List[Dict]: 結果行のリスト（Supabase RPCと同じ形式）
+    """
+    import psycopg
+    from psycopg import sql
+    from psycopg.rows import dict_row
+    from psycopg.types.json import Jsonb
+
+    args = []
+    values = {}
+    for name, value in params.items():
+        placeholder = sql.Placeholder(name)
+        if isinstance(value, list):
+            # EmbeddingはpgvectorのテキストRepresentation（[0.1,0.2,...]）で渡す
+            value = "[" + ",".join(str(float(v)) for v in value) + "]"
+            placeholder = sql.SQL("{}::vector").format(placeholder)
+        elif isinstance(value, dict):
+            value = Jsonb(value)
+        args.append(sql.SQL("{} => {}").format(sql.Identifier(name), placeholder))
+        values[name] = value
+
+    query = sql.SQL("select * from {}({})").format(
+        sql.Identifier(function_name), sql.SQL(", ").join(args)
+    )
+    with psycopg.connect(dsn, row_factory=dict_row) as conn:
+        rows = conn.execute(query, values).fetchall()
+
+    # UUIDなどはSupabaseのJSONレスポンスに合わせて文字列化
+    return [
+        {k: (str(v) if k == "id" and v is not None else v) for k, v in row.items()}
+        for row in rows
+    ]
+
+
+def call_rpc(function_name: str, params: Dict) -> List[Dict]:
+    """
+    SupabaseのSQL関数（RPC）を呼び出す
+    
+    環境変数 LOCAL_PGVECTOR_DSN が設定されている場合は、
+    Supabaseの代わりにローカルのPostgres+pgvectorを使用する
+    （config/docker-compose.pgvector.yml 参照）。
+    
+    Args:
+        function_name: 呼び出すSQL関数名
+        params: 関数の引数
+    
+    Returns:
+        List[Dict]: 結果行のリスト
+    """
+    local_dsn = os.getenv("LOCAL_PGVECTOR_DSN")
+    if local_dsn:
+        return _call_local_pgvector(function_name, params, local_dsn)
+
+    response = get_supabase_client().rpc(function_name, params).execute()
+    return response.data if hasattr(response, 'data') else []
+
+
+_embeddings: Optional[OpenAIEmbeddings] = None
+
+
+def get_embeddings() -> OpenAIEmbeddings:
+    """
+    Embeddingモデルを取得する（プロセス内で1つのクライアントを使い回す）
+    
+    Returns:
+        OpenAIEmbeddings: Embeddingモデル
+    """
+    global _embeddings
+    if _embeddings is None:
+        from langchain_openai import OpenAIEmbeddings
+
+        _embeddings = OpenAIEmbeddings(
+            model="text-embedding-3-small",
+            openai_api_key=os.getenv("OPENAI_API_KEY")
+        )
+    return _embeddings
+
+
+def embed_text(text: str) -> List[float]:
+    """
+    テキストをEmbedding化する
+    
+    Args:
+        text: Embedding化するテキスト
+    
+    Returns:
+        List[float]: Embeddingベクトル
+    """
+    return get_embeddings().embed_query(text)
+
+
+# 空白の判定は PostgreSQL の正規表現（config/migrations/003_documents_content_hash.sql）と揃える
+_WHITESPACE = re.compile(r"[ \t\n\r\f\v]+")
+
+
+def normalize_content(text: str) -> str:
+    """
+    ハッシュ計算用に面談内容を正規化する（全角・半角の違いと空白・改行の違いを無視する）
+
+    config/migrations/003_documents_content_hash.sql の既存行の埋め込みと同じ処理。
+
+    Args:
+        text: 面談内容のテキスト
+
+    Returns:
+        str: NFKC正規化し、空白の連続を1つの半角スペースにしたテキスト
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip(" ")
+
+
+def content_hash(text: str) -> str:
+    """
+    面談内容のハッシュ（documents.content_hash。同じ内容の二重登録の判定に使う）
+
+    Args:
+        text: 面談内容のテキスト
+
+    Returns:
+        str: 正規化したテキストのSHA-256の16進文字列
+    """
+    return hashlib.sha256(normalize_content(text).encode("utf-8")).hexdigest()
+
+
+# documents.content_hash（config/migrations/003_documents_content_hash.sql）が使えるか。
+# 未適用のDBでは最初のエラーで False にし、以降は重複判定なしで通常のINSERTを行う
+_content_hash_enabled = True
+
+# content_hash 列・一意制約が無い場合のエラーの目印（PostgreSQL / PostgREST のエラーコードとメッセージ）
+_MISSING_CONTENT_HASH_MARKERS = ("42703", "PGRST204", "does not exist", "schema cache")
+
+
+def _is_missing_content_hash_error(error: Exception) -> bool:
+    """content_hash 列、またはその一意制約が無いDBでのエラーかどうか"""
+    message = str(error)
+    if "42P10" in message:
+        return True
+    return "content_hash" in message and any(marker in message for marker in _MISSING_CONTENT_HASH_MARKERS)
+
+
+def _disable_content_hash(error: Exception) -> None:
+    """content_hash を使わない動作に切り替える（警告は最初の1回だけ出す）"""
+    global _content_hash_enabled
+    if _content_hash_enabled:
+        logger.warning(
+            "documents.content_hash が使えないため、重複登録の判定をせずに保存します"
+            f"（config/migrations/003_documents_content_hash.sql を適用してください）: {error}"
+        )
+    _content_hash_enabled = False
+
+
+def _parse_embedding(value) -> Optional[List[float]]:
+    """PostgRESTが文字列（"[0.1,0.2,...]"）で返すvector列をリストにする"""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def find_document_by_hash(digest: str, supabase: Optional[Client] = None) -> Optional[Dict]:
+    """
+    同じ内容の登録済みの行を探す
+
+    Args:
+        digest: content_hash の値
+        supabase: 使い回すSupabaseクライアント（省略時は作成する）
+
+    Returns:
+        Optional[Dict]: {"id": 行ID, "embedding": ベクトル}、なければNone（content_hash 列が無いDBでも None）
+    """
+    if not _content_hash_enabled:
+        return None
+    supabase = supabase or get_supabase_client()
+    try:
+        response = supabase.table("documents").select("id, embedding").eq("content_hash", digest).limit(1).execute()
+    except Exception as e:
+        if not _is_missing_content_hash_error(e):
+            raise
+        _disable_content_hash(e)
+        return None
+    rows = response.data if hasattr(response, 'data') else []
+    if not rows:
+        return None
+    return {"id": rows[0].get("id"), "embedding": _parse_embedding(rows[0].get("embedding"))}
+
+
+def find_near_duplicate(embedding: List[float], threshold: Optional[float] = None) -> Optional[Dict]:
+    """
+    ベクトルがほぼ同じ登録済みの行を探す（HNSWインデックスを使う match_documents_cross で上位1件だけ取得）
+
+    表記の揺れ（誤字の修正・追記）程度の違いしかない面談メモを、重複として扱うために使う。
+
+    Args:
+        embedding: 保存しようとしている面談内容のEmbedding
+        threshold: 類似度の下限（未指定時は環境変数 DEDUP_SIMILARITY_THRESHOLD、それもなければ判定しない）
+
+    Returns:
+        Optional[Dict]: {"id": 行ID, "similarity": 類似度}、なければNone
+    """
+    if threshold is None:
+        if not os.getenv("DEDUP_SIMILARITY_THRESHOLD"):
+            return None
+        threshold = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD"))
+    rows = call_rpc("match_documents_cross", {
+        "query_embedding": embedding,
+        "match_count": 1,
+        "match_threshold": threshold,
+        "snippet_length": 0,
+    })
+    if not rows:
+        return None
+    return {"id": rows[0].get("id"), "similarity": rows[0].get("similarity")}
+
+
+def embed_with_passages(
+    texts: List[str], embeddings: Optional[List[Optional[List[float]]]] = None
+) -> List[Tuple[List[float], List[Passage], List[List[float]]]]:
+    """
+    面談内容とそのパッセージ（services/chunking.py）を、まとめて1回の embed_documents でEmbedding化する
+
+    Args:
+        texts: 面談内容のリスト
+        embeddings: 計算済みの面談内容のEmbedding（texts と同じ順。None の要素だけ計算する）
+
+    Returns:
+        List[tuple]: 面談内容ごとの (面談内容のベクトル, パッセージのリスト, パッセージのベクトルのリスト)。
+            1パッセージに収まる面談内容は、面談内容のベクトルをパッセージにも使う
+    """
+    from services.chunking import chunk_text
+
+    embeddings = embeddings or [None] * len(texts)
+    inputs: List[str] = []
+    plan = []
+    for text, embedding in zip(texts, embeddings):
+        passages = chunk_text(text)
+        document_slot = None
+        if embedding is None:
+            document_slot = len(inputs)
+            inputs.append(text)
+        passage_slots = None
+        if len(passages) > 1:
+            passage_slots = (len(inputs), len(inputs) + len(passages))
+            inputs.extend(passage.text for passage in passages)
+        plan.append((embedding, document_slot, passages, passage_slots))
+
+    vectors = get_embeddings().embed_documents(inputs) if inputs else []
+    results = []
+    for embedding, document_slot, passages, passage_slots in plan:
+        if document_slot is not None:
+            embedding = vectors[document_slot]
+        passage_vectors = vectors[passage_slots[0]:passage_slots[1]] if passage_slots else [embedding] * len(passages)
+        results.append((embedding, passages, passage_vectors))
+    return results
+
+
+def _save_passages(supabase: Client, documents: List[Tuple[str, List[Passage], List[List[float]]]]) -> None:
+    """
+    パッセージを document_passages に保存する（同じ文書・番号の行は一意制約で無視する）
+
+    Args:
+        supabase: Supabaseクライアント
+        documents: (文書ID, パッセージのリスト, パッセージのベクトルのリスト) のリスト
+    """
+    rows = [
+        {"document_id": document_id, "passage_index": passage.index, "content": passage.text, "embedding": vector}
+        for document_id, passages, vectors in documents
+        for passage, vector in zip(passages, vectors)
+    ]
+    if rows:
+        supabase.table("document_passages").upsert(
+            rows, on_conflict="document_id,passage_index", ignore_duplicates=True
+        ).execute()
+
+
+def save_interview_note(text: str, metadata: Dict, embedding: Optional[List[float]] = None) -> Optional[Dict]:
     """
     面談内容をEmbedding化してSupabaseに保存する
+
+    同じ内容（content_hash が一致）が登録済みの場合は、Embedding APIを呼ばずに既存の行を返す。
+    content_hash 列が無いDB（マイグレーション003が未適用）では、警告を出して重複判定なしで保存する。
+    環境変数 DEDUP_SIMILARITY_THRESHOLD を設定すると、ベクトルがほぼ同じ行も重複として扱う。
     
     Args:
         text: 面談内容のテキスト
         metadata: メタデータ（企業名、役職、事業部、技術タグ、登録日時など）
+        embedding: 計算済みのEmbedding（指定時はEmbedding APIを呼ばない）
     
     Returns:
-        bool: 保存成功時True
+        Optional[Dict]: 保存成功時は {"id": 行ID, "embedding": 保存したベクトル, "duplicate": 登録済みだったか}、
+            失敗時None（後続の検索で同じベクトルを再利用するために返す）
     """
     try:
-        # Embeddingモデルを初期化
-        embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
-        
-        # テキストをEmbedding化
-        embedding = embeddings.embed_query(text)
+        # Supabaseクライアントを取得
+        supabase = get_supabase_client()
+
+        # 同じ内容が登録済みなら、Embeddingの計算と保存を省く
+        digest = content_hash(text)
+        existing = find_document_by_hash(digest, supabase)
+        if existing:
+            logger.info(f"同じ内容の面談メモが登録済みのため、保存をスキップしました: {existing['id']}")
+            return {"id": existing["id"], "embedding": existing["embedding"] or embedding, "duplicate": True}
+
+        # ほぼ同じ内容の判定には面談内容のベクトルが先に必要（判定しない場合はパッセージとまとめて計算する）
+        if embedding is None and os.getenv("DEDUP_SIMILARITY_THRESHOLD"):
+            embedding = embed_text(text)
+        if embedding is not None:
+            near = find_near_duplicate(embedding)
+            if near:
+                logger.info(f"ほぼ同じ内容の面談メモが登録済みのため、保存をスキップしました: {near['id']}（類似度 {near['similarity']:.3f}）")
+                return {"id": near["id"], "embedding": embedding, "duplicate": True}
+
+        # テキストとパッセージをEmbedding化（面談内容のベクトルが計算済みならそれを使う）
+        embedding, passages, passage_vectors = embed_with_passages([text], [embedding])[0]
         
         # メタデータに登録日時を追加（まだない場合）
         if "created_at" not in metadata:
             from datetime import datetime
             metadata["created_at"] = datetime.now().isoformat()
         
-        # Supabaseクライアントを取得
-        supabase = get_supabase_client()
+        # 直接Supabaseに挿入（IDはテーブル側で自動生成される）
+        # 同時に同じ内容が保存された場合は一意制約で無視し、先に保存された行を返す
+        row = {"content": text, "metadata": metadata, "embedding": embedding}
+        response = None
+        if _content_hash_enabled:
+            try:
+                response = supabase.table("documents").upsert(
+                    {**row, "content_hash": digest}, on_conflict="content_hash", ignore_duplicates=True
+                ).execute()
+            except Exception as e:
+                if not _is_missing_content_hash_error(e):
+                    raise
+                _disable_content_hash(e)
+        if response is None:
+            response = supabase.table("documents").insert(row).execute()
         
-        # 直接Supabaseに挿入（IDはBIGSERIALで自動生成される）
-        response = supabase.table("documents").insert({
-            "content": text,
-            "metadata": metadata,
-            "embedding": embedding
-        }).execute()
-        
-        return True
+        rows = response.data if hasattr(response, 'data') else []
+        if not rows:
+            existing = find_document_by_hash(digest, supabase)
+            return {"id": existing["id"] if existing else None, "embedding": embedding, "duplicate": True}
+        row_id = rows[0].get("id")
+
+        # パッセージの保存に失敗しても、文書単位のベクトルで検索できるため保存は成功として扱う
+        try:
+            _save_passages(supabase, [(row_id, passages, passage_vectors)])
+        except Exception as e:
+            logger.warning(f"パッセージの保存に失敗しました（文書単位で検索されます）: {e}")
+        return {"id": row_id, "embedding": embedding, "duplicate": False}
     except Exception as e:
+        # バッチ処理（Streamlit外）からも原因が分かるようにログにも出す
+        logger.error(f"データ保存エラー: {str(e)}", exc_info=True)
         st.error(f"データ保存エラー: {str(e)}")
-        return False
+        return None
+
+
+# 一括保存の既定値
+# OpenAIのEmbedding APIは1リクエスト2048件・30万トークンまで。日本語は1文字≒1トークン以上になるため、
+# 件数と文字数の両方で区切る（1バッチ = embed_documents 1回 + 複数行のINSERT 1回）。
+# パッセージも同じ呼び出しでEmbedding化するため、送る文字数は面談内容の約2.2倍になる
+BULK_BATCH_SIZE = 100
+BULK_BATCH_MAX_CHARS = 60_000
+BULK_CONCURRENCY = 4
+BULK_MAX_ATTEMPTS = 3
+
+
+@dataclass
+class BulkSaveReport:
+    """一括保存の結果（件数と処理時間）"""
+    total: int = 0
+    inserted: int = 0
+    skipped: int = 0  # 保存済み・入力内の重複
+    failed: int = 0
+    batches: int = 0
+    retries: int = 0
+    embed_seconds: float = 0.0  # Embedding APIの合計時間（並列分を含む）
+    insert_seconds: float = 0.0  # 保存済みの確認とINSERTの合計時間（並列分を含む）
+    elapsed_seconds: float = 0.0
+    failed_hashes: List[str] = field(default_factory=list)
+
+    @property
+    def notes_per_second(self) -> float:
+        """処理件数（保存・スキップ）のスループット"""
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return (self.inserted + self.skipped) / self.elapsed_seconds
+
+    def summary(self) -> str:
+        """ログ・CLI向けの1行の要約"""
+        return (
+            f"{self.total}件中 保存 {self.inserted} / スキップ {self.skipped} / 失敗 {self.failed}"
+            f"（{self.batches}バッチ・再試行 {self.retries}回・{self.elapsed_seconds:.1f}秒・"
+            f"{self.notes_per_second:.1f}件/秒、Embedding {self.embed_seconds:.1f}秒・保存 {self.insert_seconds:.1f}秒）"
+        )
+
+
+def _iter_note_batches(
+    notes: Iterable[Tuple[str, Dict]],
+    batch_size: int,
+    max_chars: int,
+    report: BulkSaveReport,
+) -> Iterator[List[Tuple[str, Dict, str]]]:
+    """
+    入力を読み進めながら、件数・文字数の上限で区切ったバッチを返す（入力内の重複はスキップ）
+
+    Yields:
+        List[Tuple[str, Dict, str]]: (テキスト, メタデータ, ハッシュ) のリスト
+    """
+    seen = set()
+    batch: List[Tuple[str, Dict, str]] = []
+    chars = 0
+    for text, metadata in notes:
+        report.total += 1
+        digest = content_hash(text)
+        if not text.strip() or digest in seen:
+            report.skipped += 1
+            continue
+        seen.add(digest)
+        if batch and (len(batch) >= batch_size or chars + len(text) > max_chars):
+            yield batch
+            batch, chars = [], 0
+        batch.append((text, metadata, digest))
+        chars += len(text)
+    if batch:
+        yield batch
+
+
+def _existing_document_ids(supabase: Client, hashes: List[str]) -> Dict[str, str]:
+    """documents に保存済みのハッシュ（content_hash）と行IDの対応を返す"""
+    response = supabase.table("documents").select("id, content_hash").in_("content_hash", hashes).execute()
+    rows = response.data if hasattr(response, 'data') else []
+    return {row.get("content_hash"): row.get("id") for row in rows}
+
+
+def _save_note_batch(supabase: Client, batch: List[Tuple[str, Dict, str]], max_attempts: int) -> Dict:
+    """
+    1バッチ分を保存する（失敗時は保存済みのハッシュを確認し直して再試行するため、二重登録しない）
+
+    Returns:
+        Dict: inserted / skipped / retries / embed_seconds / insert_seconds
+    """
+    from services.resilience import backoff_delay
+
+    stats = {"inserted": 0, "skipped": 0, "retries": 0, "embed_seconds": 0.0, "insert_seconds": 0.0}
+    # 再試行でEmbedding APIを呼び直さないよう、計算済みのベクトルはハッシュごとに残す
+    embeddings: Dict[str, Tuple[List[float], List[Passage], List[List[float]]]] = {}
+    # 応答が失われたINSERTが反映されていた場合は、スキップではなく保存として数える
+    sent: set = set()
+    # パッセージまで保存できた文書のハッシュ
+    completed: set = set()
+    for attempt in range(max_attempts):
+        try:
+            started = time.perf_counter()
+            existing = _existing_document_ids(supabase, [digest for _, _, digest in batch])
+            stats["insert_seconds"] += time.perf_counter() - started
+            pending = [note for note in batch if note[2] not in existing]
+            # 前回の試行で保存した文書のうち、パッセージが未保存のもの
+            unfinished = [note for note in batch if note[2] in existing and note[2] in sent and note[2] not in completed]
+            stats["inserted"] = len(set(existing) & sent)
+            stats["skipped"] = len(batch) - len(pending) - stats["inserted"]
+            if not pending and not unfinished:
+                return stats
+
+            missing = [note for note in pending + unfinished if note[2] not in embeddings]
+            if missing:
+                started = time.perf_counter()
+                vectors = embed_with_passages([text for text, _, _ in missing])
+                stats["embed_seconds"] += time.perf_counter() - started
+                embeddings.update((digest, vector) for (_, _, digest), vector in zip(missing, vectors))
+
+            rows = []
+            for text, metadata, digest in pending:
+                if "created_at" not in metadata:
+                    from datetime import datetime
+                    metadata = {**metadata, "created_at": datetime.now().isoformat()}
+                rows.append({"content": text, "metadata": metadata, "embedding": embeddings[digest][0], "content_hash": digest})
 
+            started = time.perf_counter()
+            if rows:
+                sent.update(digest for _, _, digest in pending)
+                # 他の処理が同時に同じ内容を保存していても、一意制約で無視する
+                response = supabase.table("documents").upsert(
+                    rows, on_conflict="content_hash", ignore_duplicates=True
+                ).execute()
+                saved = {row.get("content_hash"): row.get("id") for row in (response.data if hasattr(response, 'data') else None) or []}
+                existing.update(saved)
+                # 応答に含まれない行は、確認の後に他の処理が保存した内容（一意制約で無視された）
+                sent.difference_update(digest for _, _, digest in pending if digest not in saved)
+                stats["inserted"] += len(saved)
+                stats["skipped"] += len(rows) - len(saved)
 
-def search_cross_pollination(query_text: str, current_department: str, top_k: int = 5) -> List[Dict]:
+            # このバッチで保存した文書のパッセージ（同時に他の処理が保存した文書はその処理に任せる）
+            documents = [
+                (existing[digest], embeddings[digest][1], embeddings[digest][2])
+                for _, _, digest in pending + unfinished if digest in existing
+            ]
+            _save_passages(supabase, documents)
+            completed.update(digest for _, _, digest in pending + unfinished)
+            stats["insert_seconds"] += time.perf_counter() - started
+            return stats
+        except Exception as e:
+            if attempt + 1 >= max_attempts:
+                raise
+            stats["retries"] += 1
+            delay = backoff_delay(attempt)
+            logger.warning(f"一括保存のバッチ（{len(batch)}件）が失敗したため、{delay:.1f}秒後に再試行します: {e}")
+            time.sleep(delay)
+    return stats
+
+
+def save_interview_notes_bulk(
+    notes: Iterable[Tuple[str, Dict]],
+    batch_size: int = BULK_BATCH_SIZE,
+    max_chars: int = BULK_BATCH_MAX_CHARS,
+    concurrency: int = BULK_CONCURRENCY,
+    max_attempts: int = BULK_MAX_ATTEMPTS,
+    progress_callback: Optional[Callable[[BulkSaveReport], None]] = None,
+) -> BulkSaveReport:
+    """
+    大量の面談内容をまとめてEmbedding化してSupabaseに保存する（過去の面談録の移行用）
+
+    入力は全件を読み込まずに先頭から順にバッチへ区切り、バッチごとに embed_documents を1回（パッセージを含む）、
+    複数行のINSERTを文書・パッセージそれぞれ1回行う。同時に実行するバッチ数は concurrency までに抑える。
+    各行の content_hash に内容のハッシュを記録し、保存済みの内容はEmbeddingせずにスキップするため、
+    失敗したバッチの再試行や、同じ入力での再実行でも二重登録にならない。
+    content_hash 列（config/migrations/003_documents_content_hash.sql）が必須。
+
+    Args:
+        notes: (面談内容のテキスト, メタデータ) の列（ジェネレーターでよい）
+        batch_size: 1バッチの最大件数
+        max_chars: 1バッチの最大文字数（Embedding APIのトークン上限に合わせる）
+        concurrency: 同時に処理するバッチ数
+        max_attempts: 1バッチあたりの最大試行回数
+        progress_callback: バッチの完了ごとに途中経過（BulkSaveReport）を受け取る関数
+
+    Returns:
+        BulkSaveReport: 件数とスループット（再試行しても失敗したバッチは failed に数える）
+    """
+    report = BulkSaveReport()
+    started = time.perf_counter()
+    supabase = get_supabase_client()
+
+    def collect(future, batch):
+        try:
+            stats = future.result()
+        except Exception as e:
+            logger.error(f"一括保存のバッチ（{len(batch)}件）が失敗しました: {e}", exc_info=True)
+            report.failed += len(batch)
+            report.failed_hashes.extend(digest for _, _, digest in batch)
+        else:
+            report.inserted += stats["inserted"]
+            report.skipped += stats["skipped"]
+            report.retries += stats["retries"]
+            report.embed_seconds += stats["embed_seconds"]
+            report.insert_seconds += stats["insert_seconds"]
+        report.batches += 1
+        report.elapsed_seconds = time.perf_counter() - started
+        if progress_callback is not None:
+            progress_callback(report)
+
+    concurrency = max(1, concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-save") as executor:
+        in_flight: Dict = {}
+        for batch in _iter_note_batches(notes, max(1, batch_size), max_chars, report):
+            # 入力を先読みしすぎないよう、待ちのバッチは同時実行数の2倍までにする
+            if len(in_flight) >= concurrency * 2:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future, in_flight.pop(future))
+            in_flight[executor.submit(_save_note_batch, supabase, batch, max_attempts)] = batch
+        for future in list(in_flight):
+            collect(future, in_flight.pop(future))
+
+    report.elapsed_seconds = time.perf_counter() - started
+    logger.info(f"一括保存: {report.summary()}")
+    return report
+
+
+def _get_fresh_vector_mirror():
+    """
+    最新のローカルのベクトル索引のミラーを取得する（VECTOR_MIRROR_DIR が未設定・ミラーが古い場合は None）
+
+    古いミラーは使わずにSupabaseで検索するため、次の検索に備えてバックグラウンドで同期しておく。
+    """
+    if not os.getenv("VECTOR_MIRROR_DIR"):
+        return None
+    from services.vector_mirror import get_vector_mirror
+
+    mirror = get_vector_mirror()
+    if mirror.is_fresh():
+        return mirror
+    mirror.sync_in_background()
+    return None
+
+
+def search_cross_pollination(
+    query_text: str,
+    current_department: str,
+    top_k: int = 5,
+    query_embedding: Optional[List[float]] = None,
+    ef_search: Optional[int] = None,
+    aggregation: Optional[str] = None,
+) -> List[Dict]:
     """
     他事業部の知見を検索する（現在の事業部と異なるもののみ）
-    
+
+    パッセージ単位のベクトルで検索し、文書ごとに集約する（config/migrations/004_document_passages.sql）。
+    パッセージのない文書（パッセージ導入前の行）は文書単位のベクトルで検索する。
+    環境変数 VECTOR_MIRROR_DIR を設定した場合は、最新のローカルのミラー（services/vector_mirror.py）で
+    文書単位のベクトルを厳密に検索する（スニペットは本文の先頭。ef_search・aggregation は使わない）。
+
     Args:
         query_text: 検索クエリテキスト
         current_department: 現在の事業部名
         top_k: 取得する結果の数（デフォルト: 5）
+        query_embedding: 計算済みのクエリEmbedding（指定時はEmbedding APIを呼ばない）
+        ef_search: HNSWインデックス探索の候補数（未指定時は環境変数 PGVECTOR_EF_SEARCH、
+            それもなければDBの既定値）。大きいほど再現率が上がり、遅くなる
+        aggregation: パッセージの類似度の文書単位への集約方法。"max"（最も近いパッセージ）または
+            "topk_mean"（近い順に3件の平均）。未指定時は環境変数 PASSAGE_AGGREGATION、それもなければ "max"
     
     Returns:
-        List[Dict]: 検索結果のリスト（各要素はid, content, metadata, similarityを含む）
+        List[Dict]: 検索結果のリスト（各要素はid, content, metadata, similarityを含む。
+            contentは最も近いパッセージのスニペット）
     """
     try:
-        # クエリのEmbeddingを取得
-        embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
-        query_embedding = embeddings.embed_query(query_text)
-        
-        # Supabaseクライアントを取得
-        supabase = get_supabase_client()
-        
-        # match_documents関数を呼び出し（フィルタなしで全件取得）
-        # その後、Python側でdepartment != current_departmentでフィルタリング
-        response = supabase.rpc(
-            "match_documents",
-            {
-                "query_embedding": query_embedding,
-                "match_threshold": 0.0,  # 閾値は低めに設定（後でフィルタリングするため）
-                "match_count": 50,  # 多めに取得してからフィルタリング
-                "filter": {}  # フィルタなし
-            }
-        ).execute()
-        
-        # 結果を取得
-        results = response.data if hasattr(response, 'data') else []
+        # クエリのEmbeddingを取得（計算済みならそれを使う）
+        if query_embedding is None:
+            query_embedding = embed_text(query_text)
+
+        # ローカルのミラー（services/vector_mirror.py）が最新なら、Supabaseに問い合わせずに検索する
+        mirror = _get_fresh_vector_mirror()
+        if mirror is not None:
+            results = mirror.search(query_embedding, current_department, top_k=top_k)
+            for result in results:
+                result["content"] = result["snippet"]
+            return results
+
+        # match_passages_cross関数を呼び出し
+        # 他事業部への絞り込み・文書単位の集約・並び替え・件数制限はDB側で行い、本文はスニペットのみ受け取る
+        params = {
+            "query_embedding": query_embedding,
+            "match_count": top_k,
+            "exclude_department": current_department,
+            "aggregation": aggregation or os.getenv("PASSAGE_AGGREGATION", "max"),
+        }
+        if ef_search is None and os.getenv("PGVECTOR_EF_SEARCH"):
+            ef_search = int(os.getenv("PGVECTOR_EF_SEARCH"))
+        if ef_search is not None:
+            params["ef_search"] = ef_search
+        results = call_rpc("match_passages_cross", params)
         
-        # 現在の事業部と異なるもののみをフィルタリング
-        filtered_results = []
+        # 既存の呼び出し元はcontentキーを参照するため、スニペットをcontentとして渡す
         for result in results:
-            metadata = result.get("metadata", {})
-            department = metadata.get("department", "")
-            
-            # departmentがcurrent_departmentと異なる場合のみ追加
-            if department != current_department:
-                filtered_results.append(result)
+            result["content"] = result.get("snippet") or ""
+            result["metadata"] = result.get("metadata") or {}
         
-        # similarityでソート（降順）
-        filtered_results.sort(key=lambda x: x.get("similarity", 0.0), reverse=True)
-        
-        # top_k件に制限
-        return filtered_results[:top_k]
+        return results
         
     except Exception as e:
-        st.error(f"検索エラー: {str(e)}")
+        # 分隊のワーカースレッドやバッチから呼ばれるため、UIではなくログに出す
+        logger.error(f"検索エラー: {str(e)}", exc_info=True)
         return []
 
 
+# Reciprocal Rank Fusion の定数（元論文・一般的な実装の既定値）
+HYBRID_RRF_K = 60
+# 語句検索に使う語（タグ・品番・規格値）の上限
+HYBRID_LEXICAL_MAX_TERMS = 12
+# RRFで統合する、ベクトル検索・語句検索それぞれの上位の件数（match_documents_hybrid の candidate_count と同じ）
+HYBRID_CANDIDATE_COUNT = 50
+
+# 数値 + 単位（「2.0 W/mK」「600V」「30%」。英単語（「10 samples」）は単位として扱わない）
+_SPEC_VALUE = re.compile(r"(?<![A-Za-z0-9.\-])\d+(?:\.\d+)?\s?[A-Za-z°℃%Ωµμ]{1,3}(?:/[A-Za-z0-9·]{1,4})?(?![A-Za-z])")
+# 英数字のトークン（「UL94」「V-0」「PA46-GF30」）
+_SPEC_CODE = re.compile(r"[A-Za-z0-9]+(?:[-./][A-Za-z0-9]+)*")
+
+
+def extract_spec_tokens(text: str) -> List[str]:
+    """
+    テキストから品番・グレード名・規格値のトークンを出現順に取り出す（重複は除く）
+
+    英字と数字を両方含むトークン（「UL94」「V-0」）、2文字以上の大文字の略語（「PPS」）、
+    数値 + 単位（「2.0 W/mK」）を対象にし、英語の一般的な単語や単独の数値は含めない。
+
+    Args:
+        text: 面談メモなどのテキスト
+
+    Returns:
+        List[str]: トークンのリスト
+    """
+    normalized = unicodedata.normalize("NFKC", text)
+    found = []
+    for match in _SPEC_VALUE.finditer(normalized):
+        found.append((match.start(), match.group()))
+    values = [(start, start + len(token)) for start, token in found]
+    for match in _SPEC_CODE.finditer(normalized):
+        token = match.group()
+        if any(start <= match.start() < end for start, end in values):
+            continue
+        has_digit = any(c.isdigit() for c in token)
+        has_alpha = any(c.isalpha() for c in token)
+        if (has_digit and has_alpha) or (len(token) >= 2 and token.isalpha() and token.isupper()):
+            found.append((match.start(), token))
+
+    tokens = []
+    for _, token in sorted(found):
+        if token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def build_lexical_query(
+    query_text: str,
+    tags: Optional[Iterable[str]] = None,
+    max_terms: Optional[int] = None,
+) -> str:
+    """
+    ハイブリッド検索の語句検索に使うクエリテキストを作る
+
+    面談メモ全体を渡すと日本語の2文字単位の語が数千個 OR でつながり、一般的な語の多い文書が上位になるため、
+    技術タグと、メモから取り出した品番・規格値のトークンだけを使う。
+
+    Args:
+        query_text: 面談メモなどの検索クエリテキスト
+        tags: 技術タグ（重要タグを先に並べる）
+        max_terms: 使う語の上限（未指定時は環境変数 HYBRID_LEXICAL_MAX_TERMS、それもなければ12）
+
+    Returns:
+        str: 語を空白でつないだテキスト（語がなければ空文字列で、語句検索は0件になる）
+    """
+    if max_terms is None:
+        max_terms = int(os.getenv("HYBRID_LEXICAL_MAX_TERMS", HYBRID_LEXICAL_MAX_TERMS))
+    terms = []
+    for term in [*(tags or []), *extract_spec_tokens(query_text)]:
+        term = term.strip()
+        if term and term not in terms:
+            terms.append(term)
+    return " ".join(terms[:max_terms])
+
+
+def search_cross_pollination_hybrid(
+    query_text: str,
+    current_department: str,
+    top_k: int = 5,
+    query_embedding: Optional[List[float]] = None,
+    ef_search: Optional[int] = None,
+    aggregation: Optional[str] = None,
+    rrf_k: Optional[int] = None,
+    lexical_query: Optional[str] = None,
+) -> List[Dict]:
+    """
+    他事業部の知見を、ベクトル検索と語句検索のハイブリッドで検索する（現在の事業部と異なるもののみ）
+
+    品番・グレード名・規格値（「UL94 V-0」「PA46」など）はEmbeddingでは一致しにくいため、
+    documents.content の語句インデックス（英数字トークンと日本語の2文字単位）で探した結果と
+    ベクトル検索の結果を、DB側で Reciprocal Rank Fusion により統合する
+    （config/migrations/005_documents_hybrid_search.sql）。
+    ハイブリッド検索の関数がない・失敗した場合は、ベクトル検索（search_cross_pollination）の結果を返す。
+    環境変数 VECTOR_MIRROR_DIR を設定し、ローカルのミラーが最新の場合は、ベクトル検索をミラーで行い、
+    DBの語句検索（match_documents_lexical）の結果とアプリ側でRRFにより統合する。
+
+    Args:
+        query_text: 検索クエリテキスト（Embeddingの計算と、語句検索のクエリの作成に使う）
+        current_department: 現在の事業部名
+        top_k: 取得する結果の数（デフォルト: 5）
+        query_embedding: 計算済みのクエリEmbedding（指定時はEmbedding APIを呼ばない）
+        ef_search: HNSWインデックス探索の候補数（search_cross_pollination と同じ）
+        aggregation: パッセージの類似度の集約方法（search_cross_pollination と同じ）
+        rrf_k: RRFの定数（1 / (rrf_k + 順位) で統合する）。未指定時は環境変数 HYBRID_RRF_K、
+            それもなければ60。小さいほど各検索の上位を重視する
+        lexical_query: 語句検索のクエリテキスト（未指定時は build_lexical_query(query_text)）。
+            技術タグがあれば build_lexical_query(query_text, tags) を渡す
+
+    Returns:
+        List[Dict]: 検索結果のリスト（各要素はid, content, metadata, similarity, rrf_score,
+            vector_rank, lexical_rankを含む。contentはスニペット）
+    """
+    try:
+        if query_embedding is None:
+            query_embedding = embed_text(query_text)
+
+        if lexical_query is None:
+            lexical_query = build_lexical_query(query_text)
+        rrf_k = rrf_k or int(os.getenv("HYBRID_RRF_K", HYBRID_RRF_K))
+
+        # ローカルのミラーが最新なら、ベクトル検索はSupabaseに問い合わせずにミラーで行う
+        mirror = _get_fresh_vector_mirror()
+        if mirror is not None:
+            return _search_hybrid_with_mirror(mirror, query_embedding, lexical_query, current_department, top_k, rrf_k)
+
+        params = {
+            "query_embedding": query_embedding,
+            "query_text": lexical_query,
+            "match_count": top_k,
+            "exclude_department": current_department,
+            "aggregation": aggregation or os.getenv("PASSAGE_AGGREGATION", "max"),
+            "rrf_k": rrf_k,
+        }
+        if ef_search is None and os.getenv("PGVECTOR_EF_SEARCH"):
+            ef_search = int(os.getenv("PGVECTOR_EF_SEARCH"))
+        if ef_search is not None:
+            params["ef_search"] = ef_search
+        results = call_rpc("match_documents_hybrid", params)
+
+        for result in results:
+            result["content"] = result.get("snippet") or ""
+            result["metadata"] = result.get("metadata") or {}
+
+        return results
+
+    except Exception as e:
+        logger.warning(f"ハイブリッド検索に失敗したため、ベクトル検索のみで検索します: {e}")
+        return search_cross_pollination(
+            query_text,
+            current_department,
+            top_k=top_k,
+            query_embedding=query_embedding,
+            ef_search=ef_search,
+            aggregation=aggregation,
+        )
+
+
+def _search_hybrid_with_mirror(
+    mirror,
+    query_embedding: List[float],
+    lexical_query: str,
+    current_department: str,
+    top_k: int,
+    rrf_k: int,
+) -> List[Dict]:
+    """
+    ミラーのベクトル検索と、DBの語句検索（match_documents_lexical）の順位をRRFで統合する
+
+    match_documents_hybrid と同じく、それぞれの上位 HYBRID_CANDIDATE_COUNT 件を 1 / (rrf_k + 順位) の和で統合する。
+    語句検索の関数がない・失敗した場合は、ミラーのベクトル検索の結果だけを返す。
+
+    Returns:
+        List[Dict]: search_cross_pollination_hybrid と同じ形式の結果
+    """
+    vector_hits = mirror.search(query_embedding, current_department, top_k=HYBRID_CANDIDATE_COUNT, match_threshold=-1.0)
+    lexical_hits = []
+    if lexical_query:
+        try:
+            lexical_hits = call_rpc("match_documents_lexical", {
+                "query_text": lexical_query,
+                "match_count": HYBRID_CANDIDATE_COUNT,
+                "exclude_department": current_department,
+            })
+        except Exception as e:
+            logger.warning(f"語句検索に失敗したため、ミラーのベクトル検索のみで検索します: {e}")
+
+    fused: Dict[str, Dict] = {}
+    for rank, hit in enumerate(vector_hits, start=1):
+        fused[hit["id"]] = {**hit, "rrf_score": 1.0 / (rrf_k + rank), "vector_rank": rank, "lexical_rank": None}
+    for rank, hit in enumerate(lexical_hits, start=1):
+        doc_id = str(hit["id"])
+        result = fused.get(doc_id)
+        if result is None:
+            # 語句検索だけで見つかった文書は、語句が一致したパッセージをスニペットにする
+            result = fused[doc_id] = {
+                "id": doc_id,
+                "metadata": hit.get("metadata") or {},
+                "snippet": hit.get("snippet") or "",
+                "similarity": None,
+                "rrf_score": 0.0,
+                "vector_rank": None,
+            }
+        result["rrf_score"] += 1.0 / (rrf_k + rank)
+        result["lexical_rank"] = rank
+
+    results = sorted(fused.values(), key=lambda result: result["rrf_score"], reverse=True)[:top_k]
+    missing = [result["id"] for result in results if result["similarity"] is None]
+    similarities = mirror.similarities(query_embedding, missing) if missing else {}
+    for result in results:
+        if result["similarity"] is None:
+            result["similarity"] = similarities.get(result["id"])
+        result["content"] = result["snippet"]
+    return results
+
+
+def _get_ddgs():
+    """
+    DuckDuckGo検索クライアントのクラスを取得する（初回呼び出し時にインポート）
+
+    Returns:
+        type: DDGSクラス
+    """
+    # duckduckgo-searchの互換性対応
+    try:
+        import duckduckgo_search
+        if "ddgs" not in sys.modules:
+            sys.modules["ddgs"] = duckduckgo_search
+    except ImportError:
+        pass
+
+    from ddgs import DDGS
+    return DDGS
+
+
 def search_market_trends(tech_tags: List[str], use_case: str = "") -> str:
     """
     技術タグと用途を元に、最新の市場トレンドを検索する
@@ -191,6 +1009,7 @@ def search_market_trends(tech_tags: List[str], use_case: str = "") -> str:
         query = " ".join([p for p in query_parts if p]).strip()[:512]
 
         # DuckDuckGo検索を実行（DDGSのtext APIを使用）
+        DDGS = _get_ddgs()
         with DDGS() as ddgs:
             results = list(ddgs.text(query, max_results=5))
 
@@ -204,5 +1023,5 @@ def search_market_trends(tech_tags: List[str], use_case: str = "") -> str:
         )
 
     except Exception as e:
-        st.warning("市場調査エラー: 市場検索に失敗しました。後でもう一度お試しください。")
+        logger.warning(f"市場調査エラー: 市場検索に失敗しました: {e}")
         return "市場調査結果を取得できませんでした。"
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+アプリ起動時のインポート時間ベンチマーク
+
+新しいPythonプロセスで `python -X importtime -c "import app"` を実行し、
+app のインポートにかかった時間（累積）と、時間のかかっているモジュールの上位を表示します。
+起動時に読み込んではいけない重い依存（langchain・Supabase・OpenAI・pypdf など）が
+インポートされていないかも確認し、予算超過・違反があれば終了コード1で終了します（CI用）。
+
+使用方法:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --repeat 5 --top 30
+    python benchmarks/bench_import_time.py --budget-ms 1500
+    APP_IMPORT_BUDGET_MS=1500 python benchmarks/bench_import_time.py
+
+注意: 1回目はバイトコード（__pycache__）の作成分だけ遅くなるため、
+ウォームアップ後の中央値で判定します。
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# app のインポート（累積）の予算（ミリ秒）
+DEFAULT_BUDGET_MS = 2000.0
+
+# 起動時に読み込んではいけないモジュール（初めて使うときにインポートする）
+FORBIDDEN_AT_STARTUP = [
+    "langchain_core",
+    "langchain_google_genai",
+    "langchain_community",
+    "langchain_openai",
+    "openai",
+    "supabase",
+    "arxiv",
+    "pypdf",
+    "docx",
+    "ddgs",
+    "duckduckgo_search",
+    "psycopg",
+]
+
+IMPORT_LINE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$")
+
+
+class ImportEntry(NamedTuple):
+    """-X importtime の1行"""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+def parse_importtime(stderr: str) -> List[ImportEntry]:
+    """
+    -X importtime の出力（標準エラー）を解析する
+
+    Args:
+        stderr: サブプロセスの標準エラー出力
+
+    Returns:
+        List[ImportEntry]: インポートされたモジュールの一覧（出力順）
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            # ネストしたインポートは2文字ずつインデントされる
+            entries.append(ImportEntry(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def measure_once(module: str) -> Tuple[float, List[ImportEntry]]:
+    """
+    新しいプロセスでモジュールを1回インポートする
+
+    Returns:
+        tuple: (プロセス全体の実時間[ms], インポートの一覧)
+    """
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"{module} のインポートに失敗しました:\n{tail}")
+    return wall_ms, parse_importtime(proc.stderr)
+
+
+def find_forbidden(entries: List[ImportEntry], forbidden: List[str]) -> List[str]:
+    """起動時に読み込まれた禁止モジュール（トップレベルのパッケージ名）"""
+    loaded = {entry.module.split(".")[0] for entry in entries}
+    return [name for name in forbidden if name in loaded]
+
+
+def module_cumulative_ms(entries: List[ImportEntry], module: str) -> float:
+    """対象モジュールのインポート時間（累積, ms）"""
+    for entry in entries:
+        if entry.module == module and entry.depth == 0:
+            return entry.cumulative_us / 1000
+    return 0.0
+
+
+def top_packages(entries: List[ImportEntry], top: int) -> List[Tuple[str, float]]:
+    """
+    トップレベルのパッケージごとの累積時間（ms）の上位
+
+    同じパッケージのサブモジュールは一番外側のインポート（累積が最大のもの）だけを数える。
+    """
+    totals: Dict[str, float] = {}
+    for entry in entries:
+        package = entry.module.split(".")[0]
+        totals[package] = max(totals.get(package, 0.0), entry.cumulative_us / 1000)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="アプリ起動時のインポート時間ベンチマーク")
+    parser.add_argument("--module", default="app", help="インポートするモジュール（デフォルト: app）")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（ウォームアップを除く）")
+    parser.add_argument("--top", type=int, default=20, help="表示する上位パッケージ数")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("APP_IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS)),
+        help=f"インポート時間の予算（ms, 環境変数 APP_IMPORT_BUDGET_MS, デフォルト: {DEFAULT_BUDGET_MS:.0f}）",
+    )
+    args = parser.parse_args()
+
+    print_separator()
+    print(f"インポート時間ベンチマーク: import {args.module}")
+    print_separator()
+
+    # ウォームアップ（__pycache__ の作成）
+    measure_once(args.module)
+
+    wall_times, import_times, entries = [], [], []
+    for i in range(args.repeat):
+        wall_ms, entries = measure_once(args.module)
+        import_ms = module_cumulative_ms(entries, args.module)
+        wall_times.append(wall_ms)
+        import_times.append(import_ms)
+        print(f"  {i + 1}回目: import {import_ms:8.1f} ms / プロセス全体 {wall_ms:8.1f} ms")
+
+    import_ms = statistics.median(import_times)
+    wall_ms = statistics.median(wall_times)
+    print()
+    print(f"中央値: import {import_ms:.1f} ms / プロセス全体 {wall_ms:.1f} ms（予算 {args.budget_ms:.0f} ms）")
+    print(f"インポートされたモジュール数: {len(entries)}")
+
+    print()
+    print(f"累積時間の上位 {args.top} パッケージ:")
+    for package, ms in top_packages(entries, args.top):
+        print(f"  {ms:8.1f} ms  {package}")
+
+    failures = []
+    if import_ms > args.budget_ms:
+        failures.append(f"インポート時間が予算を超えています: {import_ms:.1f} ms > {args.budget_ms:.0f} ms")
+    forbidden = find_forbidden(entries, FORBIDDEN_AT_STARTUP)
+    if forbidden:
+        failures.append(f"起動時に重い依存が読み込まれています: {', '.join(forbidden)}")
+
+    print()
+    print_separator()
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ 予算内で、重い依存は起動時に読み込まれていません")
+
+
+if __name__ == "__main__":
+    main()
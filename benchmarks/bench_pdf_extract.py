@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+PDFテキスト抽出のベンチマーク
+
+合成した数百ページのPDF（議事録のようにテキストの詰まったページ）を作成し、
+services/ingest.extract_pdf の1プロセス抽出と並列抽出の時間を比較します。
+並列抽出の結果が1プロセスの結果とページ順まで一致することと、
+文字数の上限で残りのページを読まずに止まることも確認します。
+
+使用方法:
+    pip install pypdf
+    python benchmarks/bench_pdf_extract.py
+    python benchmarks/bench_pdf_extract.py --pages 150 400 --workers 1 2 4 8 --lines 80
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ingest import extract_pdf
+
+WORDS = [
+    "thermal", "conductivity", "resin", "battery", "module", "housing", "busbar", "insulation",
+    "flame", "retardant", "PPS", "polyamide", "tracking", "index", "molding", "insert",
+    "requirement", "temperature", "strength", "specification", "customer", "prototype", "cost", "schedule",
+]
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+def _escape(text: str) -> str:
+    """PDFの文字列リテラル用にエスケープする"""
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(num_pages: int, lines_per_page: int = 60, seed: int = 0) -> bytes:
+    """
+    テキストだけの合成PDFを作成する（外部ライブラリ不要）
+
+    Args:
+        num_pages: ページ数
+        lines_per_page: 1ページあたりの行数
+        seed: 本文の単語の並びを決めるシード
+
+    Returns:
+        bytes: PDFの内容
+    """
+    objects: List[bytes] = []
+    # 1: カタログ, 2: ページツリー, 3: フォント, 4以降: ページとコンテンツ
+    page_ids = [4 + 2 * i for i in range(num_pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {num_pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for page in range(num_pages):
+        lines = []
+        for line in range(lines_per_page):
+            start = (seed + page * 7 + line * 3) % len(WORDS)
+            words = [WORDS[(start + k * 5) % len(WORDS)] for k in range(10)]
+            lines.append(f"p{page + 1} l{line + 1}: " + " ".join(words))
+        body = "BT /F1 9 Tf 11 TL 36 806 Td " + " ".join(f"({_escape(t)}) '" for t in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_ids[page] + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def measure(data: bytes, num_pages: int, workers: int, max_chars=None):
+    """抽出時間（秒）と結果"""
+    started = time.perf_counter()
+    result = extract_pdf(data, max_pages=num_pages, max_chars=max_chars, workers=workers)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDFテキスト抽出のベンチマーク")
+    parser.add_argument("--pages", type=int, nargs="+", default=[150, 300, 600], help="合成PDFのページ数")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="比較するプロセス数")
+    parser.add_argument("--lines", type=int, default=60, help="1ページあたりの行数")
+    parser.add_argument("--max-chars", type=int, default=50_000, help="早期終了の確認に使う文字数の上限")
+    args = parser.parse_args()
+
+    print_separator()
+    print(f"PDFテキスト抽出のベンチマーク（CPU: {os.cpu_count()}）")
+    print_separator()
+
+    for num_pages in args.pages:
+        data = build_pdf(num_pages, args.lines)
+        print(f"\n{num_pages}ページ（{len(data) / 1024 / 1024:.1f}MB）")
+        baseline_time = None
+        baseline_text = None
+        for workers in args.workers:
+            elapsed, (text, pages, _) = measure(data, num_pages, workers)
+            if baseline_time is None:
+                baseline_time, baseline_text = elapsed, text
+            assert pages == num_pages
+            assert text == baseline_text, f"workers={workers} の結果が1プロセスの結果と一致しません"
+            print(
+                f"  workers={workers}: {elapsed:7.2f} 秒 ({num_pages / elapsed:7.1f} ページ/秒, "
+                f"x{baseline_time / elapsed:4.2f})"
+            )
+
+        elapsed, (text, pages, truncated) = measure(data, num_pages, max(args.workers), max_chars=args.max_chars)
+        assert truncated and len(text) == args.max_chars and text == baseline_text[:args.max_chars]
+        print(f"  上限 {args.max_chars:,}文字: {elapsed:7.2f} 秒（{pages}ページで打ち切り）")
+
+    print()
+    print_separator()
+    print("✅ 並列抽出の結果はページ順まで1プロセスの結果と一致しました")
+
+
+if __name__ == "__main__":
+    main()
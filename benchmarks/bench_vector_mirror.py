@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+ベクトル索引のミラー（services/vector_mirror.py）のベンチマーク
+
+合成Embeddingでミラーを作成し、同期（ファイルへの追記）・読み込み・検索の p50/p95 レイテンシ、検索用の行列のメモリと、
+float32 の厳密検索に対する recall@k（float16 / int8 で保存した影響）を測定します。
+--supabase を指定すると、.env の Supabase（または LOCAL_PGVECTOR_DSN）の match_passages_cross とも比較します。
+
+使用方法:
+    python benchmarks/bench_vector_mirror.py
+    python benchmarks/bench_vector_mirror.py --sizes 10000 50000 --dtypes float16 int8
+    python benchmarks/bench_vector_mirror.py --sizes 10000 --supabase
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.vector_mirror import DIMENSION, VectorMirror
+
+DEPARTMENTS = ["研究開発部", "製品開発部", "営業部", "品質保証部"]
+NUM_CLUSTERS = 64
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+class SyntheticDocuments:
+    """
+    合成の documents テーブル（ミラーの同期が使う select / or_ / order / limit だけを持つ）
+
+    Embeddingはクラスタ中心の周りに分布させる（benchmarks/bench_pgvector_ann.py と同じ）。
+    """
+
+    def __init__(self, n: int, seed: int):
+        rng = np.random.default_rng(seed)
+        centers = rng.standard_normal((NUM_CLUSTERS, DIMENSION)).astype(np.float32)
+        self.vectors = centers[rng.integers(0, NUM_CLUSTERS, n)] + 0.6 * rng.standard_normal((n, DIMENSION)).astype(np.float32)
+        self.offset = 0
+        self.page_size = 0
+        self.not_ = self
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        return self
+
+    def is_(self, column, value):
+        return self
+
+    def or_(self, condition):
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, count):
+        self.page_size = count
+        return self
+
+    def execute(self):
+        end = min(self.offset + self.page_size, len(self.vectors))
+        rows = [
+            {
+                "id": f"{i:08d}",
+                "content": f"合成の面談メモ {i}",
+                "metadata": {"department": DEPARTMENTS[i % len(DEPARTMENTS)]},
+                "embedding": self.vectors[i].tolist(),
+                "created_at": f"{i:08d}",
+            }
+            for i in range(self.offset, end)
+        ]
+        self.offset = end
+        return SimpleNamespace(data=rows)
+
+
+def exact_top_k(documents: SyntheticDocuments, queries: np.ndarray, exclude_department: str, k: int) -> List[set]:
+    """float32 で厳密なtop-k（他事業部のみ）を求める"""
+    vectors = documents.vectors / np.linalg.norm(documents.vectors, axis=1, keepdims=True)
+    excluded = np.array([DEPARTMENTS[i % len(DEPARTMENTS)] == exclude_department for i in range(len(vectors))])
+    truth = []
+    for query in queries:
+        scores = vectors @ (query / np.linalg.norm(query))
+        scores[excluded] = -np.inf
+        truth.append({f"{i:08d}" for i in np.argsort(-scores)[:k]})
+    return truth
+
+
+def report(label: str, latencies: List[float], recall: float = None):
+    """結果を1行で表示"""
+    p50, p95 = np.percentile(latencies, [50, 95])
+    suffix = f"  recall={recall:.3f}" if recall is not None else ""
+    print(f"  {label:<24} p50={p50:8.3f}ms  p95={p95:8.3f}ms{suffix}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ベクトル索引のミラーのベンチマーク")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000], help="合成Embeddingの件数")
+    parser.add_argument("--dtypes", nargs="+", default=["float16", "int8"], help="ファイルに保存する型")
+    parser.add_argument("--queries", type=int, default=100, help="クエリ数")
+    parser.add_argument("--k", type=int, default=5, help="取得件数（recall@k）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--supabase", action="store_true", help="match_passages_cross（Supabase）のレイテンシも測定する")
+    args = parser.parse_args()
+
+    exclude_department = DEPARTMENTS[0]
+    for n in args.sizes:
+        queries = SyntheticDocuments(args.queries, args.seed + 1).vectors
+        truth = exact_top_k(SyntheticDocuments(n, args.seed), queries, exclude_department, args.k)
+        for dtype in args.dtypes:
+            print_separator()
+            print(f"件数: {n:,}  次元: {DIMENSION}  保存形式: {dtype}  クエリ数: {args.queries}  k={args.k}")
+            print_separator()
+            with tempfile.TemporaryDirectory() as directory:
+                started = time.perf_counter()
+                VectorMirror(directory, dtype=dtype).sync(SyntheticDocuments(n, args.seed))
+                print(f"  同期: {time.perf_counter() - started:.1f}s  "
+                      f"ファイル: {os.path.getsize(os.path.join(directory, 'vectors.bin')) / 2**20:.0f}MB")
+
+                started = time.perf_counter()
+                mirror = VectorMirror(directory, dtype=dtype)
+                print(f"  読み込み: {time.perf_counter() - started:.2f}s  "
+                      f"メモリ（検索用の float32 の行列）: {mirror._state.matrix.nbytes / 2**20:.0f}MB")
+
+                latencies, hits = [], 0
+                for query, expected in zip(queries, truth):
+                    started = time.perf_counter()
+                    results = mirror.search(query, exclude_department, top_k=args.k, match_threshold=-1.0)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    hits += len({r["id"] for r in results} & expected)
+                report("mirror", latencies, hits / (len(queries) * args.k))
+
+        if args.supabase:
+            import backend
+
+            latencies = []
+            for query in queries:
+                started = time.perf_counter()
+                backend.call_rpc("match_passages_cross", {
+                    "query_embedding": query.tolist(),
+                    "match_count": args.k,
+                    "exclude_department": exclude_department,
+                })
+                latencies.append((time.perf_counter() - started) * 1000)
+            report("supabase (rpc)", latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,12 @@
 import streamlit as st
 import markdown
 import base64
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 
 
 def render_conversation_log():
@@ -16,8 +21,16 @@ def render_conversation_log():
         st.info("💬 イノベーション分隊の会話ログは、面談録を登録した後に表示されます。")
         return
 
+# 描画済みメッセージHTMLのキャッシュ（(ロール, アバター, 本文のSHA-256) → HTML）
+# 再実行のたびに会話ログ全体をMarkdown変換し直さないよう、プロセス全体で共有する
+MESSAGE_HTML_CACHE_SIZE = 512
+_message_html_cache = OrderedDict()
+_message_html_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=32)
 def get_image_base64(image_path):
-    """画像ファイルをBase64エンコードして返す"""
+    """画像ファイルをBase64エンコードして返す（パスごとにプロセス内でキャッシュ）"""
     if not os.path.exists(image_path):
         return None
     with open(image_path, "rb") as f:
@@ -216,14 +229,17 @@ def get_chat_css():
     """
 
 
-def render_message_html(role, avatar, content):
-    """単一メッセージのHTMLを生成する"""
-    # MarkdownをHTMLに変換（表と改行をサポート）
-    content = markdown.markdown(content, extensions=['tables', 'nl2br'])
-    
+@lru_cache(maxsize=64)
+def resolve_avatar(avatar):
+    """
+    アバターの表示情報を求める（アバターごとにプロセス内でキャッシュし、ファイルの存在確認も1回だけ行う）
+
+    Returns:
+        tuple: (アバターのHTML, ロール表示名の候補, オーケストレーターかどうか)
+    """
     # 画像かどうか判定
-    is_image = avatar and os.path.exists(avatar)
-    
+    is_image = bool(avatar) and os.path.exists(avatar)
+
     if is_image:
         img_src = get_image_base64(avatar)
         avatar_html = f'<img src="{img_src}" class="avatar-image">'
@@ -235,9 +251,7 @@ def render_message_html(role, avatar, content):
 
     # ロール名の決定
     role_display = "AI"
-    if role == "user":
-        role_display = "ユーザー"
-    elif is_orchestrator:
+    if is_orchestrator:
         role_display = "オーケストレーター (PM)"
     elif is_image:
         if "Market_Researcher.png" in avatar:
@@ -248,12 +262,24 @@ def render_message_html(role, avatar, content):
             role_display = "ソリューションアーキテクト (発明家)"
         elif "Devils_Advocate.png" in avatar:
             role_display = "デビルズアドボケイト (鬼の査読官)"
-    
+
+    return avatar_html, role_display, is_orchestrator
+
+
+def markdown_to_html(content):
+    """MarkdownをHTMLに変換（表と改行をサポート）"""
+    return markdown.markdown(content, extensions=['tables', 'nl2br'])
+
+
+def wrap_message_html(role, resolved_avatar, content_html):
+    """変換済みの本文HTMLを吹き出しで囲む"""
+    avatar_html, role_display, is_orchestrator = resolved_avatar
+
     if role == "user":
         # ユーザーメッセージ（右側）
         return f"""
 <div class="message-row user">
-    <div class="message-bubble">{content}</div>
+    <div class="message-bubble">{content_html}</div>
 </div>
 """
     elif is_orchestrator:
@@ -262,7 +288,7 @@ def render_message_html(role, avatar, content):
 <div class="message-row orchestrator">
     <div class="message-content">
         <div class="role-name" style="text-align: right; margin-right: 14px;">{role_display}</div>
-        <div class="message-bubble">{content}</div>
+        <div class="message-bubble">{content_html}</div>
     </div>
     <div class="avatar">{avatar_html}</div>
 </div>
@@ -274,12 +300,129 @@ def render_message_html(role, avatar, content):
     <div class="avatar">{avatar_html}</div>
     <div class="message-content">
         <div class="role-name">{role_display}</div>
-        <div class="message-bubble">{content}</div>
+        <div class="message-bubble">{content_html}</div>
     </div>
 </div>
 """
 
 
+def render_message_html(role, avatar, content):
+    """単一メッセージのHTMLを生成する（同じメッセージは変換結果を再利用する）"""
+    key = (role, avatar, hashlib.sha256(content.encode("utf-8")).hexdigest())
+    with _message_html_cache_lock:
+        html = _message_html_cache.get(key)
+        if html is not None:
+            _message_html_cache.move_to_end(key)
+            return html
+
+    html = wrap_message_html(role, resolve_avatar(avatar), markdown_to_html(content))
+    with _message_html_cache_lock:
+        _message_html_cache[key] = html
+        while len(_message_html_cache) > MESSAGE_HTML_CACHE_SIZE:
+            _message_html_cache.popitem(last=False)
+    return html
+
+
+def clear_render_caches():
+    """アバター・メッセージHTMLのキャッシュを破棄する（画像差し替え時やテスト用）"""
+    get_image_base64.cache_clear()
+    resolve_avatar.cache_clear()
+    with _message_html_cache_lock:
+        _message_html_cache.clear()
+
+
+def find_stable_boundary(text, start=0):
+    """
+    text[start:] のうち、以降のチャンクで変化しない部分の終わり位置を返す
+
+    段落区切り（空行）で区切られたブロックは、後続のチャンクが届いても変換結果が変わらない。
+    ただしコードブロック（```）の中の空行はブロックの区切りとして扱わない。
+    start はブロックの先頭（コードブロックの外）である必要がある。
+    """
+    boundary = start
+    in_fence = False
+    position = start
+    while True:
+        newline = text.find("\n", position)
+        if newline == -1:
+            return boundary
+        line = text[position:newline]
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        elif not in_fence and not line.strip() and position > start:
+            boundary = newline + 1
+        position = newline + 1
+
+
+class StreamingMessageRenderer:
+    """
+    ストリーミング中のメッセージを間引きながら描画する
+
+    チャンクは時間（min_interval秒）または文字数（min_chars）の予算に達するまでまとめ、
+    確定したブロックのHTMLは保持して、変化しうる末尾のブロックだけをMarkdown変換し直す。
+    完了時（finish）に全文を1回だけ変換し直して、最終的な表示を通常の描画と揃える。
+    """
+
+    def __init__(self, placeholder, role, avatar, min_interval=0.1, min_chars=200, clock=time.monotonic):
+        """
+        Args:
+            placeholder: 描画先（st.empty() など markdown メソッドを持つもの）
+            role: "assistant" / "user"
+            avatar: アバター（画像パスまたは絵文字）。ここで1回だけ解決する
+            min_interval: 描画の最小間隔（秒）
+            min_chars: この文字数がたまったら間隔に関係なく描画する
+        """
+        self.placeholder = placeholder
+        self.role = role
+        self.avatar = avatar
+        self.resolved_avatar = resolve_avatar(avatar)
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self._clock = clock
+        self.buffer = ""
+        self._stable_end = 0
+        self._stable_html = ""
+        self._pending_chars = 0
+        self._last_render = None
+
+    def extend(self, text):
+        """チャンクを追加する（描画はしない。定期的に flush する呼び出し元向け）"""
+        self.buffer += text
+        self._pending_chars += len(text)
+
+    def append(self, text):
+        """チャンクを追加する（予算に達した場合のみ描画する）"""
+        self.extend(text)
+        now = self._clock()
+        if (
+            self._last_render is None
+            or self._pending_chars >= self.min_chars
+            or now - self._last_render >= self.min_interval
+        ):
+            self.flush(now)
+
+    def flush(self, now=None):
+        """まとめたチャンクを描画する"""
+        boundary = find_stable_boundary(self.buffer, self._stable_end)
+        if boundary > self._stable_end:
+            self._stable_html += markdown_to_html(self.buffer[self._stable_end:boundary])
+            self._stable_end = boundary
+        tail_html = markdown_to_html(self.buffer[self._stable_end:])
+        self.placeholder.markdown(
+            wrap_message_html(self.role, self.resolved_avatar, self._stable_html + tail_html),
+            unsafe_allow_html=True,
+        )
+        self._pending_chars = 0
+        self._last_render = self._clock() if now is None else now
+
+    def finish(self, content=None):
+        """全文を変換し直して最終表示にする"""
+        if content is not None:
+            self.buffer = content
+        # 会話ログの再描画でも同じHTMLを使えるよう、キャッシュ経由で変換する
+        self.placeholder.markdown(render_message_html(self.role, self.avatar, self.buffer), unsafe_allow_html=True)
+
+
 def render_conversation_log():
     """
     イノベーション分隊の会話ログを表示する（LINE風UI）
@@ -291,17 +434,17 @@ def render_conversation_log():
     # LINE風スタイルの定義
     st.markdown(get_chat_css(), unsafe_allow_html=True)
     
-    # チャットログのHTML構築
-    html_content = '<div class="chat-container">'
+    # チャットログのHTML構築（変換済みのメッセージはキャッシュから取得）
+    parts = ['<div class="chat-container">']
     
     for message in st.session_state.conversation_log:
         avatar = message.get("avatar", "🤖")
         role = message.get("role", "assistant")
         content = message.get("content", "")
         
-        html_content += render_message_html(role, avatar, content)
+        parts.append(render_message_html(role, avatar, content))
             
-    html_content += '</div>'
+    parts.append('</div>')
     
-    st.markdown(html_content, unsafe_allow_html=True)
+    st.markdown("".join(parts), unsafe_allow_html=True)
 
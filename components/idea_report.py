@@ -7,7 +7,7 @@ import os
 from typing import List, Dict
 from services.markdown_parser import parse_markdown_to_slides
 from services.html_report import create_html_report
-from services.slide_report2 import create_slide_report_v2
+# スライド生成（langchain・Gemini）はボタンが押されたときにインポートする
 
 
 
@@ -139,6 +139,8 @@ def render_idea_report():
     with col2:
         if st.button("📊 スライドを作成", type="primary", use_container_width=True):
             try:
+                from services.slide_report2 import create_slide_report_v2
+
                 with st.spinner("スライドを生成中..."):
                     company_name = st.session_state.form_data.get("company_name", "")
                     slides_data = parse_markdown_to_slides(
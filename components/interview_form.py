@@ -3,11 +3,11 @@
 """
 
 import streamlit as st
-from services.ai_review import review_interview_content
 from typing import Dict
+from services.ingest import extract_uploaded_file
 import io
-import docx
-import pypdf
+
+# AIレビュー（langchain・Gemini）は起動を遅らせないよう、使うときにインポートする
 
 
 def render_interview_form() -> Dict:
@@ -40,17 +40,11 @@ def render_interview_form() -> Dict:
 
         if uploaded_file is not None:
             try:
-                text = ""
-                if uploaded_file.type == "text/plain":
-                    text = uploaded_file.getvalue().decode("utf-8")
-                elif uploaded_file.type == "application/pdf":
-                    pdf_reader = pypdf.PdfReader(uploaded_file)
-                    for page in pdf_reader.pages:
-                        text += page.extract_text() + "\n"
-                elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                    doc = docx.Document(uploaded_file)
-                    for para in doc.paragraphs:
-                        text += para.text + "\n"
+                # 同じファイルは再実行のたびに解析し直さない（内容のハッシュでキャッシュ）
+                extracted = extract_uploaded_file(uploaded_file)
+                text = extracted.text
+                if extracted.truncated:
+                    st.warning(f"⚠️ ファイルが長いため、先頭{len(extracted.text):,}文字のみ読み込みました")
                 
                 if text:
                     st.session_state.form_data["interview_memo"] = text
@@ -83,6 +77,8 @@ def render_interview_form() -> Dict:
                 }
                 
                 # AIレビューを実行
+                from services.ai_review import review_interview_content
+
                 with st.spinner("🤖 AIが内容をレビュー中..."):
                     review_result = review_interview_content(interview_memo)
                     st.session_state.review_result = review_result
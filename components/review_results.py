@@ -2,183 +2,39 @@
 AIレビュー結果表示コンポーネント
 """
 
-import streamlit as st
-from services.ai_review import ReviewResult, DEFAULT_TECH_TAGS
-from services.multi_agent import run_innovation_squad
-from backend import save_interview_note
-from datetime import datetime
-from typing import Optional
+from __future__ import annotations
 
-try:
-    from google.api_core import exceptions as google_exceptions
-except Exception:  # ランタイム環境によっては import できない場合がある
-    google_exceptions = None
+import streamlit as st
+from typing import TYPE_CHECKING, Optional
 
+from components.squad_job import render_squad_job, start_squad_job
 
-from components.conversation_log import get_chat_css
+if TYPE_CHECKING:
+    from services.ai_review import ReviewResult
 
 def handle_registration(
     selected_department: str,
     review: ReviewResult,
-    conversation_container: Optional[st.delta_generator.DeltaGenerator] = None,
-    progress_container: Optional[st.delta_generator.DeltaGenerator] = None,
     model_name: str = "gemini-2.5-flash-lite",
 ):
     """
-    登録処理とアイデア創出プロセスを実行する
+    登録処理とアイデア創出プロセスを開始する
+
+    保存とイノベーション分隊はバックグラウンドジョブで実行し（components/squad_job.py）、
+    このスクリプト実行はブロックしない。進捗と会話は会話ログタブで定期的に再描画する。
     
     Args:
         selected_department: 選択された事業部名
         review: AIレビュー結果
-        conversation_container: 会話ログタブに配置したコンテナ（スピナー表示用）
-        progress_container: プログレスバーを表示するコンテナ
         model_name: 使用するAIモデル名
     """
-    # 技術タグが空の場合、デフォルトタグを使用
-    tech_tags = review.tech_tags if review.tech_tags else DEFAULT_TECH_TAGS.copy()
-    
-    # メタデータを準備
-    metadata = {
-        "company_name": st.session_state.form_data.get("company_name", ""),
-        "contact_info": st.session_state.form_data.get("contact_info", ""),
-        "department": selected_department,
-        "tech_tags": tech_tags,
-        "created_at": datetime.now().isoformat()
-    }
-    
-    # 保存
-    with st.spinner("💾 データを保存中..."):
-        success = save_interview_note(
-            text=st.session_state.form_data.get("interview_memo", ""),
-            metadata=metadata
-        )
-    
-    if success:
-        st.success("✅ データが正常に保存されました！")
-
-        # アイデア創出プロセスを実行
-        target_container = conversation_container or st
-        with target_container:
-            try:
-                # LINE風チャットUIのCSSを注入（コンテナ作成前に適用）
-                st.markdown(get_chat_css(), unsafe_allow_html=True)
-
-                # カスタムレイアウトで進捗を表示
-                status_text_area = st.empty()
-                progress_bar = st.progress(0)
-                
-                # 詳細ログ用のExpander（最初は閉じておく）
-                with st.expander("詳細ログを表示", expanded=False):
-                    log_area = st.empty()
-                    logs = []
-
-                # 会話ログ用のスクロール可能なコンテナを作成
-                # Streamlit 1.30.0以上で height パラメータが使用可能
-                try:
-                    chat_log_container = st.container(height=330, border=False)
-                    # このコンテナがある時だけ、親のタブパネルのスクロールを無効化するCSS
-                    st.markdown("""
-                        <style>
-                        section[data-testid="stMain"] [data-testid="stTabs"] [role="tabpanel"] > div {
-                            overflow-y: hidden !important;
-                        }
-                        </style>
-                    """, unsafe_allow_html=True)
-                except TypeError:
-                    # 古いバージョンの場合は通常のコンテナ（スクロール機能なし）
-                    chat_log_container = st.container()
-
-                # プログレスバーの更新関数
-                def update_progress(percent, text):
-                    # # メインのステータステキスト更新
-                    # status_text_area.markdown(f"##### 💡 [{percent}%] {text}")
-                    # プログレスバー更新
-                    progress_bar.progress(percent)
-                    
-                    # ログに追加
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    logs.append(f"[{timestamp}] {text}")
-                    log_area.text("\n".join(logs))
-                    
-                    if progress_container:
-                        # カスタムCSSスピナーと進捗内容を表示
-                        # 完了時はクリア
-                        if percent == 100:
-                            progress_container.empty()
-                        else:
-                            spinner_html = f"""
-                            <style>
-                            @keyframes spin {{
-                                0% {{ transform: rotate(0deg); }}
-                                100% {{ transform: rotate(360deg); }}
-                            }}
-                            .custom-spinner {{
-                                border: 4px solid rgba(0, 210, 255, 0.1);
-                                border-top: 4px solid #00d2ff;
-                                border-radius: 50%;
-                                width: 24px;
-                                height: 24px;
-                                animation: spin 1s linear infinite;
-                                display: inline-block;
-                                vertical-align: middle;
-                                margin-right: 8px;
-                            }}
-                            </style>
-                            <div style="display: flex; align-items: center; padding: 10px; background-color: rgba(0, 32, 96, 0.3); border-radius: 8px; margin-bottom: 10px;">
-                                <div class="custom-spinner"></div>
-                                <span style="color: #00d2ff; font-weight: 500; font-size: 14px;">[{percent}%] {text}</span>
-                            </div>
-                            """
-                            progress_container.markdown(spinner_html, unsafe_allow_html=True)
-
-                # 初期化
-                update_progress(0, "チーム結成中...")
-                
-                interview_content = st.session_state.form_data.get("interview_memo", "")
-                
-                # 技術タグが空の場合、デフォルトタグを使用
-                tech_tags = review.tech_tags if review.tech_tags else DEFAULT_TECH_TAGS.copy()
-                
-                # 会話ログコンテナの中で実行
-                with chat_log_container:
-                    idea_report, cross_pollination_results, academic_results = run_innovation_squad(
-                        interview_memo=interview_content,
-                        tech_tags=tech_tags,
-                        department=selected_department,
-                        company_name=st.session_state.form_data.get("company_name", ""),
-                        progress_callback=update_progress,
-                        model_name=model_name,
-                    )
-                
-                # 完了時の表示
-                status_text_area.success("✅ イノベーション分隊の議論が完了しました！")
-                progress_bar.progress(100)
-            except Exception as e:
-                if "google_exceptions" in globals() and google_exceptions and isinstance(e, google_exceptions.ServiceUnavailable):
-                    st.error("⚠️ モデルが混雑しています。少し待ってから再実行してください。")
-                else:
-                    st.error(f"❌ イノベーション分隊の実行に失敗しました: {e}")
-                st.session_state.is_agent_running = False
-                return
-
-            # セッションステートに保存
-            st.session_state.idea_report = idea_report
-            st.session_state.cross_pollination_results = cross_pollination_results
-            st.session_state.academic_results = academic_results
-            st.session_state.show_idea_report = True
-
-        # フォームデータとレビュー結果は保持（レポート表示のため）
-        st.session_state.is_agent_running = False
-        st.rerun()
-    else:
-        st.error("❌ データの保存に失敗しました")
-        st.session_state.is_agent_running = False
+    st.session_state.squad_job_error = None
+    start_squad_job(selected_department, review, model_name=model_name)
 
 
 def render_review_results(
     selected_department: str,
     conversation_container: Optional[st.delta_generator.DeltaGenerator] = None,
-    progress_container: Optional[st.delta_generator.DeltaGenerator] = None,
     model_name: str = "gemini-2.5-flash-lite",
 ):
     """
@@ -186,8 +42,7 @@ def render_review_results(
 
     Args:
         selected_department: 選択された事業部名
-        conversation_container: 会話ログタブに配置したコンテナ（スピナー表示用）
-        progress_container: プログレスバーを表示するコンテナ
+        conversation_container: 会話ログタブに配置したコンテナ（実行中のジョブの進捗と会話の表示先）
         model_name: 使用するAIモデル名
     """
     # レイアウト幅を広めに確保（チャットやレポートを読みやすくするため）
@@ -221,6 +76,8 @@ def render_review_results(
             st.subheader("🏷️ 抽出された技術タグ")
             tags_display = " ".join([f"`{tag}`" for tag in review.tech_tags])
             st.markdown(tags_display)
+            if review.priority_tags:
+                st.caption("市場調査で重視するタグ: " + "、".join(review.priority_tags))
         
         # 登録ボタン
         if "is_agent_running" not in st.session_state:
@@ -228,11 +85,23 @@ def render_review_results(
 
         st.divider()
         
+        if st.session_state.get("squad_job_error"):
+            # 前回の実行が失敗した場合は自動で再実行しない
+            st.error(st.session_state.squad_job_error)
+            if st.button("🔁 イノベーション分隊を再実行", type="primary"):
+                st.session_state.squad_job_error = None
+                st.rerun()
         # 自動的に会話を開始する
         # まだ実行しておらず、かつエージェントが動作中でない場合
-        if not st.session_state.show_idea_report and not st.session_state.is_agent_running:
+        elif not st.session_state.show_idea_report and not st.session_state.is_agent_running:
             st.session_state.is_agent_running = True
-            handle_registration(selected_department, review, conversation_container, progress_container, model_name=model_name)
+            handle_registration(selected_department, review, model_name=model_name)
+
+        # 実行中のジョブの進捗と会話を会話ログタブに表示する（ジョブ側で定期的に再描画）
+        if st.session_state.is_agent_running and st.session_state.get("squad_job_id"):
+            st.info("💬 イノベーション分隊が議論中です。進捗は「会話ログ」タブで確認できます。")
+            with (conversation_container or st.container()):
+                render_squad_job(st.session_state.squad_job_id)
     else:
         # 情報が不足している場合
         st.warning("⚠️ 情報が不足しています。以下の点について確認してください。")
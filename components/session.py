@@ -4,6 +4,8 @@
 
 import streamlit as st
 
+from components.squad_job import restore_squad_job
+
 
 def init_session_state():
     """セッションステートの初期化"""
@@ -19,4 +21,8 @@ def init_session_state():
         st.session_state.cross_pollination_results = []
     if "conversation_log" not in st.session_state:
         st.session_state.conversation_log = []
-
+    if "squad_job_id" not in st.session_state:
+        # 新しいセッション（ページの再読み込みを含む）では、URLのジョブIDから結果を復元する
+        st.session_state.squad_job_id = None
+        st.session_state.squad_job_error = None
+        restore_squad_job()
@@ -5,11 +5,13 @@
 
 import streamlit as st
 import os
-from services.ai_review import review_interview_content
+from services.assets import get_asset
+from services.ingest import extract_uploaded_file, read_file
+from services.prefetch import start_memo_prefetch, start_tag_prefetch, text_key
 from typing import Dict, Tuple, Optional
 import io
-import docx
-import pypdf
+
+# AIレビュー（langchain・Gemini）は起動を遅らせないよう、使うときにインポートする
 
 # 事業部のリスト
 DEPARTMENTS = [
@@ -34,6 +36,15 @@ def check_api_keys() -> bool:
         return False
 
 
+def start_memo_prefetch_once(interview_memo: str, department: str) -> None:
+    """面談メモの先読みを、同じメモ・事業部につき1回だけ開始する（再実行のたびに先読みを投入し直さない）"""
+    prefetch_key = (text_key(interview_memo), department)
+    if st.session_state.get("memo_prefetch_key") == prefetch_key:
+        return
+    st.session_state.memo_prefetch_key = prefetch_key
+    start_memo_prefetch(interview_memo, department)
+
+
 def render_sidebar(review_container: Optional[st.delta_generator.DeltaGenerator] = None) -> Tuple[str, bool, Dict]:
     """
     サイドバーを表示する
@@ -50,7 +61,8 @@ def render_sidebar(review_container: Optional[st.delta_generator.DeltaGenerator]
     # ロゴを中央揃えで表示
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.image("images/AgentX_logo.png", use_container_width=True)
+        # 元画像（2.2MB）ではなく表示サイズに縮小したWebPを配信する
+        st.image(get_asset("AgentX_logo.png", 320), use_container_width=True)
 
     # タブを作成
     tab1, tab2 = st.tabs(["📝 面談情報入力", "⚙️ 設定"])
@@ -80,14 +92,20 @@ def render_sidebar(review_container: Optional[st.delta_generator.DeltaGenerator]
 
     # タブ1: 面談情報入力 (取得したmodel_nameを使用)
     with tab1:
-        form_data = render_interview_form(review_container, model_name=model_name)
+        form_data = render_interview_form(review_container, model_name=model_name, department=selected_department)
     
     return selected_department, api_keys_ok, form_data, model_name
 
 
-def render_interview_form(review_container: Optional[st.delta_generator.DeltaGenerator] = None, model_name: str = "gemini-2.5-flash-lite") -> Dict:
+def render_interview_form(
+    review_container: Optional[st.delta_generator.DeltaGenerator] = None,
+    model_name: str = "gemini-2.5-flash-lite",
+    department: str = DEPARTMENTS[0],
+) -> Dict:
     """
     面談情報入力フォームを表示する
+
+    面談メモを読み込んだ時点で、分隊が使うEmbeddingを先読みする（AIレビュー中に進める）。
     
     Returns:
         Dict: フォームデータ（company_name, contact_info, interview_memo, submitted）
@@ -119,17 +137,18 @@ def render_interview_form(review_container: Optional[st.delta_generator.DeltaGen
 
         if uploaded_file is not None:
             try:
-                text = ""
-                if uploaded_file.type == "text/plain":
-                    text = uploaded_file.getvalue().decode("utf-8")
-                elif uploaded_file.type == "application/pdf":
-                    pdf_reader = pypdf.PdfReader(uploaded_file)
-                    for page in pdf_reader.pages:
-                        text += page.extract_text() + "\n"
-                elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                    doc = docx.Document(uploaded_file)
-                    for para in doc.paragraphs:
-                        text += para.text + "\n"
+                # 同じファイルは再実行のたびに解析し直さない（内容のハッシュでキャッシュ）
+                progress_bar = st.progress(0, text="ファイルを読み込み中...")
+                extracted = extract_uploaded_file(
+                    uploaded_file,
+                    progress_callback=lambda done, total: progress_bar.progress(
+                        done / total, text=f"ページを読み込み中... ({done}/{total})"
+                    ),
+                )
+                progress_bar.empty()
+                text = extracted.text
+                if extracted.truncated:
+                    st.warning(f"⚠️ ファイルが長いため、先頭{len(text):,}文字のみ読み込みました")
                 
                 if text:
                     st.session_state.form_data["interview_memo"] = text
@@ -139,6 +158,7 @@ def render_interview_form(review_container: Optional[st.delta_generator.DeltaGen
         
         st.info("👆 ファイルをアップロードしてください")
     else:
+        start_memo_prefetch_once(interview_memo, department)
         st.success(f"✅ 面談メモを読み込みました ({len(interview_memo)}文字)")
         with st.expander("読み込んだ内容を確認"):
             st.text(interview_memo)
@@ -161,15 +181,24 @@ def render_interview_form(review_container: Optional[st.delta_generator.DeltaGen
             }
             
             # AIレビューを実行
+            from services.ai_review import review_interview_content
+
             spinner_target = review_container or st
             with spinner_target:
                 with st.spinner("🤖 AIが内容をレビュー中..."):
                     # 再実行のためにフラグをリセット
                     st.session_state.show_idea_report = False
                     st.session_state.is_agent_running = False
+                    st.session_state.squad_job_error = None
                     
                     review_result = review_interview_content(interview_memo, model_name=model_name)
                     st.session_state.review_result = review_result
+                    if review_result.is_sufficient:
+                        # 登録（分隊の開始）を待たずに、技術タグに依存する検索を始める
+                        start_tag_prefetch(
+                            review_result.tech_tags, interview_memo, model_name,
+                            priority_tags=review_result.priority_tags, department=department,
+                        )
     
     # デモ用面談録の読み込みとAIレビュー実行ボタン
     st.markdown("---")
@@ -179,9 +208,11 @@ def render_interview_form(review_container: Optional[st.delta_generator.DeltaGen
     if os.path.exists(demo_file_path):
         if st.button("📄 デモ用面談録を読み込んでAIレビュー実行", type="secondary", use_container_width=True):
             try:
-                # デモ用ファイルを読み込む
-                doc = docx.Document(demo_file_path)
-                text = "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
+                # デモ用ファイルを読み込む（空の段落は除く）
+                from services.ai_review import review_interview_content
+
+                extracted = read_file(demo_file_path)
+                text = "\n".join(line for line in extracted.text.split("\n") if line.strip())
                 
                 if text:
                     # セッションステートに設定
@@ -198,9 +229,16 @@ def render_interview_form(review_container: Optional[st.delta_generator.DeltaGen
                             # 再実行のためにフラグをリセット
                             st.session_state.show_idea_report = False
                             st.session_state.is_agent_running = False
+                            st.session_state.squad_job_error = None
                             
+                            start_memo_prefetch_once(text, department)
                             review_result = review_interview_content(text, model_name=model_name)
                             st.session_state.review_result = review_result
+                            if review_result.is_sufficient:
+                                start_tag_prefetch(
+                                    review_result.tech_tags, text, model_name,
+                                    priority_tags=review_result.priority_tags, department=department,
+                                )
                     
                     st.success("✅ デモ用面談録を読み込み、AIレビューを実行しました")
                     st.rerun()
@@ -0,0 +1,262 @@
+"""
+イノベーション分隊のバックグラウンド実行コンポーネント
+登録時にジョブを開始し、実行中は進捗と会話を定期的に再描画する。
+ジョブIDはURL（クエリパラメータ）に保持し、ページを再読み込みしても結果を表示できる
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+import streamlit as st
+
+from services.jobs import JOB_DONE, JOB_FAILED, JOB_RUNNING, Job, get_job_manager, memo_hash
+from components.conversation_log import get_chat_css
+
+# 分隊本体（langchain・Gemini・Supabase）は重いため、ジョブを開始・表示するときにインポートする
+if TYPE_CHECKING:
+    from services.ai_review import ReviewResult
+
+# 実行中のジョブを再描画する間隔（秒）
+POLL_INTERVAL_SECONDS = 1.0
+
+
+def get_session_key() -> str:
+    """ブラウザのセッションを識別するキー（URLの sid、なければ作成する）"""
+    session_key = st.query_params.get("sid")
+    if not session_key:
+        session_key = uuid.uuid4().hex
+        st.query_params["sid"] = session_key
+    return session_key
+
+
+def start_squad_job(
+    selected_department: str,
+    review: ReviewResult,
+    model_name: str = "gemini-2.5-flash-lite",
+) -> Job:
+    """
+    保存とイノベーション分隊をバックグラウンドジョブとして開始する
+
+    Args:
+        selected_department: 選択された事業部名
+        review: AIレビュー結果
+        model_name: 使用するAIモデル名
+
+    Returns:
+        Job: 開始した（同じメモで実行中ならそれを返す）ジョブ
+    """
+    from services.ai_review import DEFAULT_TECH_TAGS
+    from services.squad import iter_registration
+
+    form_data = dict(st.session_state.form_data)
+    interview_memo = form_data.get("interview_memo", "")
+
+    # 技術タグが空の場合、デフォルトタグを使用
+    tech_tags = review.tech_tags if review.tech_tags else DEFAULT_TECH_TAGS.copy()
+
+    # メタデータを準備
+    metadata = {
+        "company_name": form_data.get("company_name", ""),
+        "contact_info": form_data.get("contact_info", ""),
+        "department": selected_department,
+        "tech_tags": tech_tags,
+        "created_at": datetime.now().isoformat()
+    }
+
+    job = get_job_manager().submit(
+        session_key=get_session_key(),
+        memo_hash=memo_hash(interview_memo, selected_department, model_name),
+        make_events=lambda: iter_registration(
+            interview_memo,
+            metadata,
+            tech_tags=tech_tags,
+            department=selected_department,
+            company_name=form_data.get("company_name", ""),
+            model_name=model_name,
+            # AIレビューで選んだ重要タグ（市場調査で再選定しない）
+            priority_tags=review.priority_tags or None,
+        ),
+        # 再読み込み時に入力内容とレビュー結果を復元する
+        context={"form_data": form_data, "review": review.model_dump()},
+    )
+    st.session_state.squad_job_id = job.id
+    st.query_params["job"] = job.id
+    return job
+
+
+def apply_job_result(job: Job) -> None:
+    """終了したジョブの結果をセッションステートに反映する"""
+    from services.multi_agent import conversation_log_from_events
+
+    _, events, _ = job.snapshot()
+    st.session_state.conversation_log = conversation_log_from_events(events)
+    st.session_state.is_agent_running = False
+    if job.status == JOB_DONE:
+        st.session_state.idea_report = job.result.report
+        st.session_state.cross_pollination_results = job.result.internal_hits
+        st.session_state.academic_results = job.result.academic_results
+        st.session_state.show_idea_report = True
+
+
+def restore_squad_job() -> None:
+    """URLのジョブIDから、再読み込み前のジョブの状態を復元する（新しいセッションの初回のみ呼ぶ）"""
+    job = get_job_manager().get(st.query_params.get("job"))
+    if job is None:
+        if "job" in st.query_params:
+            del st.query_params["job"]
+        return
+
+    st.session_state.squad_job_id = job.id
+    st.session_state.form_data = dict(job.context.get("form_data", {}))
+    if job.context.get("review"):
+        from services.ai_review import ReviewResult
+
+        st.session_state.review_result = ReviewResult(**job.context["review"])
+    if job.status == JOB_RUNNING:
+        st.session_state.is_agent_running = True
+    else:
+        apply_job_result(job)
+        if job.status == JOB_FAILED:
+            st.session_state.squad_job_error = _error_message(job.error)
+
+
+def _error_message(error: Optional[BaseException]) -> str:
+    """ジョブの失敗理由を表示用の文言にする"""
+    from services.resilience import CircuitOpenError
+
+    try:
+        from google.api_core import exceptions as google_exceptions
+    except Exception:  # ランタイム環境によっては import できない場合がある
+        google_exceptions = None
+
+    if isinstance(error, CircuitOpenError) or (
+        google_exceptions and isinstance(error, google_exceptions.ServiceUnavailable)
+    ):
+        return "⚠️ モデルが混雑しています。少し待ってから再実行してください。"
+    if isinstance(error, RuntimeError) and "保存" in str(error):
+        return "❌ データの保存に失敗しました"
+    return f"❌ イノベーション分隊の実行に失敗しました: {error}"
+
+
+def _progress_html(percent: int, text: str) -> str:
+    """カスタムCSSスピナーと進捗内容のHTML"""
+    return f"""
+    <style>
+    @keyframes spin {{
+        0% {{ transform: rotate(0deg); }}
+        100% {{ transform: rotate(360deg); }}
+    }}
+    .custom-spinner {{
+        border: 4px solid rgba(0, 210, 255, 0.1);
+        border-top: 4px solid #00d2ff;
+        border-radius: 50%;
+        width: 24px;
+        height: 24px;
+        animation: spin 1s linear infinite;
+        display: inline-block;
+        vertical-align: middle;
+        margin-right: 8px;
+    }}
+    </style>
+    <div style="display: flex; align-items: center; padding: 10px; background-color: rgba(0, 32, 96, 0.3); border-radius: 8px; margin-bottom: 10px;">
+        <div class="custom-spinner"></div>
+        <span style="color: #00d2ff; font-weight: 500; font-size: 14px;">[{percent}%] {text}</span>
+    </div>
+    """
+
+
+def _get_job_view(job_id: str):
+    """ジョブの表示状態（セッションごとに1つ、別のジョブに切り替わったら作り直す）"""
+    from services.multi_agent import SquadJobView
+
+    view = st.session_state.get("squad_job_view")
+    if view is None or view.job_id != job_id:
+        view = SquadJobView(job_id)
+        st.session_state.squad_job_view = view
+    return view
+
+
+def render_squad_job(job_id: str) -> None:
+    """
+    実行中のジョブの進捗と会話を表示する
+
+    進捗とストリーミング中の発言だけをフラグメントで定期的に再描画し、
+    確定した発言は発言が増えたとき（アプリ全体の再実行）にだけ描画する。
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        st.session_state.is_agent_running = False
+        st.rerun()
+
+    # LINE風チャットUIのCSSを注入
+    st.markdown(get_chat_css(), unsafe_allow_html=True)
+
+    _render_job_progress(job_id)
+
+    view = _get_job_view(job_id)
+    view.update(job.snapshot()[1])
+
+    # 会話ログ用のスクロール可能なコンテナ
+    chat_log_container = st.container(height=330, border=False)
+    # このコンテナがある時だけ、親のタブパネルのスクロールを無効化するCSS
+    st.markdown("""
+        <style>
+        section[data-testid="stMain"] [data-testid="stTabs"] [role="tabpanel"] > div {
+            overflow-y: hidden !important;
+        }
+        </style>
+    """, unsafe_allow_html=True)
+    with chat_log_container:
+        view.render_finished()
+        _render_job_stream(job_id, len(view.finished))
+
+
+@st.fragment(run_every=POLL_INTERVAL_SECONDS)
+def _render_job_progress(job_id: str) -> None:
+    """
+    ジョブの進捗を表示する（この部分だけを定期的に再描画する）
+
+    ジョブが終了したらアプリ全体を再実行し、レポートと会話ログを通常の表示に切り替える。
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        st.session_state.is_agent_running = False
+        st.rerun()
+
+    status, _, progress_log = job.snapshot()
+    if status != JOB_RUNNING:
+        apply_job_result(job)
+        if status == JOB_FAILED:
+            # 失敗時は自動で再実行せず、エラーと再実行ボタンを表示する
+            st.session_state.squad_job_error = _error_message(job.error)
+        st.rerun()
+
+    percent, message = job.progress
+    st.markdown(_progress_html(percent, message or "チーム結成中..."), unsafe_allow_html=True)
+    st.progress(percent)
+
+    # 詳細ログ用のExpander（最初は閉じておく）
+    with st.expander("詳細ログを表示", expanded=False):
+        st.text("\n".join(f"[{datetime.fromtimestamp(at).strftime('%H:%M:%S')}] {text}" for at, text in progress_log))
+
+
+@st.fragment(run_every=POLL_INTERVAL_SECONDS)
+def _render_job_stream(job_id: str, finished_count: int) -> None:
+    """
+    ストリーミング中の発言を表示する（この部分だけを定期的に再描画する）
+
+    発言が確定したら、確定した発言の表示を更新するためにアプリ全体を再実行する。
+    """
+    job = get_job_manager().get(job_id)
+    if job is None or job.status != JOB_RUNNING:
+        # 終了時の切り替えは _render_job_progress が行う
+        return
+
+    view = _get_job_view(job_id)
+    view.update(job.snapshot()[1])
+    if len(view.finished) != finished_count:
+        st.rerun()
+    view.render_streams()
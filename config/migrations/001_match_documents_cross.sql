@@ -0,0 +1,36 @@
+-- 他事業部の知見検索用の関数
+-- 事業部の除外と件数制限をDB側で行い、本文の代わりに先頭のスニペットだけを返す。
+-- （match_documents は全文を返すため、Python側で捨てる行のcontentまで転送されていた）
+-- supabase_settings.txt の実行後に、SupabaseのSQL Editorで実行してください。
+
+drop function if exists match_documents_cross;
+
+create or replace function match_documents_cross (
+  query_embedding vector(1536),
+  match_count int default 5,
+  exclude_department text default null,
+  match_threshold float default 0.0,
+  snippet_length int default 300
+)
+returns table (
+  id uuid,
+  metadata jsonb,
+  snippet text,
+  similarity float
+)
+language sql stable
+as $$
+  select
+    documents.id,
+    documents.metadata,
+    left(documents.content, snippet_length) as snippet,
+    1 - (documents.embedding <=> query_embedding) as similarity
+  from documents
+  where (
+    exclude_department is null
+    or coalesce(documents.metadata->>'department', '') <> exclude_department
+  )
+  and 1 - (documents.embedding <=> query_embedding) > match_threshold
+  order by documents.embedding <=> query_embedding
+  limit match_count;
+$$;
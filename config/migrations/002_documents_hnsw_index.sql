@@ -0,0 +1,62 @@
+-- documents.embedding にHNSWインデックス（コサイン距離）を作成する
+-- インデックスがない場合、match_documents* の呼び出しは毎回全件の <=> 計算（シーケンシャルスキャン）になる。
+-- m / ef_construction は pgvector の既定値。件数が数十万を超えて再現率が落ちる場合は
+-- ef_construction を上げて作り直すか、クエリ側の ef_search を上げてください。
+
+create index if not exists documents_embedding_hnsw_idx
+  on documents
+  using hnsw (embedding vector_cosine_ops)
+  with (m = 16, ef_construction = 64);
+
+-- ef_search をクエリごとに指定できるよう match_documents_cross を再定義
+-- （インデックスを使わせるため、並び替えは距離そのもの（<=>）で行う）
+drop function if exists match_documents_cross;
+
+create or replace function match_documents_cross (
+  query_embedding vector(1536),
+  match_count int default 5,
+  exclude_department text default null,
+  match_threshold float default 0.0,
+  snippet_length int default 300,
+  ef_search int default null
+)
+returns table (
+  id uuid,
+  metadata jsonb,
+  snippet text,
+  similarity float
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  if ef_search is not null then
+    perform set_config('hnsw.ef_search', ef_search::text, true);
+  end if;
+  -- pgvector 0.8以降: 事業部の除外で候補が足りなくなった場合にインデックス探索を継続する
+  if exists (select 1 from pg_settings where name = 'hnsw.iterative_scan') then
+    perform set_config('hnsw.iterative_scan', 'relaxed_order', true);
+  end if;
+
+  return query
+  with candidates as materialized (
+    select
+      documents.id,
+      documents.metadata,
+      left(documents.content, snippet_length) as snippet,
+      1 - (documents.embedding <=> query_embedding) as similarity
+    from documents
+    where (
+      exclude_department is null
+      or coalesce(documents.metadata->>'department', '') <> exclude_department
+    )
+    order by documents.embedding <=> query_embedding
+    limit match_count
+  )
+  -- relaxed_order では順序が厳密でないため、取得後に並べ直す
+  select candidates.id, candidates.metadata, candidates.snippet, candidates.similarity
+  from candidates
+  where candidates.similarity > match_threshold
+  order by candidates.similarity desc;
+end;
+$$;
@@ -0,0 +1,34 @@
+-- documents に内容のハッシュ（content_hash）の一意な列を追加する
+-- 同じ面談メモを2回アップロードしても行が増えないよう、保存時（backend.save_interview_note /
+-- save_interview_notes_bulk）にハッシュで登録済みかを確認し、Embedding の計算と INSERT を省く。
+--
+-- ハッシュは「NFKC正規化 → 空白の連続を1つの半角スペースに → 前後の空白を削除」したテキストの SHA-256。
+-- backend.normalize_content と同じ正規化のため、どちらかを変える場合は両方を変えてください。
+-- normalize() は PostgreSQL 13 以降で使えます。
+
+alter table documents add column if not exists content_hash text;
+
+-- 既存の行を埋める
+update documents
+set content_hash = encode(
+  sha256(convert_to(btrim(regexp_replace(normalize(content, NFKC), '[ \t\n\r\f\v]+', ' ', 'g'), ' '), 'UTF8')),
+  'hex'
+)
+where content_hash is null;
+
+-- 既に重複している行は、最も古い行だけにハッシュを残す（一意インデックスを作れるようにするため）。
+-- ハッシュが null の行は削除しないので、不要なら確認のうえ下のコメントの delete を実行してください。
+with ranked as (
+  select id, row_number() over (partition by content_hash order by created_at, id) as position
+  from documents
+  where content_hash is not null
+)
+update documents
+set content_hash = null
+from ranked
+where documents.id = ranked.id and ranked.position > 1;
+
+-- delete from documents where content_hash is null;
+
+-- on conflict (content_hash) と、Supabase の upsert(on_conflict="content_hash") で使う
+create unique index if not exists documents_content_hash_key on documents (content_hash);
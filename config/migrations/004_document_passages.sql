@@ -0,0 +1,117 @@
+-- 面談メモのパッセージ（services/chunking.py で分割した文のまとまり）ごとのベクトルを保存する
+-- 長い面談メモを1つのベクトルにすると、Embeddingモデルの入力上限で後半が切り捨てられ、類似度も薄まる。
+-- 検索はパッセージ単位で行い、文書ごとに集約して返す（match_passages_cross）。
+
+create table if not exists document_passages (
+  id bigint generated always as identity primary key,
+  document_id uuid not null references documents(id) on delete cascade,
+  passage_index int not null,
+  content text not null,
+  embedding vector(1536) not null,
+  unique (document_id, passage_index)
+);
+
+create index if not exists document_passages_embedding_hnsw_idx
+  on document_passages
+  using hnsw (embedding vector_cosine_ops)
+  with (m = 16, ef_construction = 64);
+
+-- 他事業部の知見をパッセージ単位で検索し、文書ごとに集約する
+-- aggregation:
+--   'max'       … 文書内で最も近いパッセージの類似度（一部にだけ書かれた知見も拾う）
+--   'topk_mean' … 近い順に passages_per_document 件のパッセージの類似度の平均（全体的に近い文書を優先）
+-- snippet は最も近いパッセージ（先頭 snippet_length 文字）。
+-- パッセージ未作成の文書（このマイグレーション以前の行）は、これまで通り documents.embedding で検索する。
+create or replace function match_passages_cross (
+  query_embedding vector(1536),
+  match_count int default 5,
+  exclude_department text default null,
+  match_threshold float default 0.0,
+  snippet_length int default 300,
+  aggregation text default 'max',
+  passages_per_document int default 3,
+  candidate_count int default 100,
+  ef_search int default null
+)
+returns table (
+  id uuid,
+  metadata jsonb,
+  snippet text,
+  similarity float,
+  passage_index int
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  if ef_search is not null then
+    perform set_config('hnsw.ef_search', ef_search::text, true);
+  end if;
+  -- pgvector 0.8以降: 事業部の除外で候補が足りなくなった場合にインデックス探索を継続する
+  if exists (select 1 from pg_settings where name = 'hnsw.iterative_scan') then
+    perform set_config('hnsw.iterative_scan', 'relaxed_order', true);
+  end if;
+
+  return query
+  with passage_hits as materialized (
+    select
+      p.document_id,
+      p.passage_index,
+      p.content,
+      1 - (p.embedding <=> query_embedding) as similarity
+    from document_passages p
+    join documents d on d.id = p.document_id
+    where (
+      exclude_department is null
+      or coalesce(d.metadata->>'department', '') <> exclude_department
+    )
+    order by p.embedding <=> query_embedding
+    limit greatest(candidate_count, match_count)
+  ),
+  ranked as (
+    select
+      passage_hits.*,
+      row_number() over (partition by passage_hits.document_id order by passage_hits.similarity desc) as passage_rank
+    from passage_hits
+  ),
+  passage_documents as (
+    select
+      ranked.document_id,
+      case
+        when aggregation = 'topk_mean'
+          then avg(ranked.similarity) filter (where ranked.passage_rank <= passages_per_document)
+        else max(ranked.similarity)
+      end as similarity,
+      max(ranked.passage_index) filter (where ranked.passage_rank = 1) as passage_index,
+      max(left(ranked.content, snippet_length)) filter (where ranked.passage_rank = 1) as snippet
+    from ranked
+    group by ranked.document_id
+  ),
+  legacy_documents as materialized (
+    select
+      d.id as document_id,
+      1 - (d.embedding <=> query_embedding) as similarity,
+      null::int as passage_index,
+      left(d.content, snippet_length) as snippet
+    from documents d
+    where (
+      exclude_department is null
+      or coalesce(d.metadata->>'department', '') <> exclude_department
+    )
+    and not exists (select 1 from document_passages p where p.document_id = d.id)
+    order by d.embedding <=> query_embedding
+    limit match_count
+  ),
+  combined as (
+    select * from passage_documents
+    union all
+    select * from legacy_documents
+  )
+  select d.id, d.metadata, combined.snippet, combined.similarity, combined.passage_index
+  from combined
+  join documents d on d.id = combined.document_id
+  where combined.similarity > match_threshold
+  order by combined.similarity desc
+  limit match_count;
+end;
+$$;
@@ -0,0 +1,160 @@
+-- 他事業部の知見検索に、語句の一致（全文検索）を加えたハイブリッド検索
+-- text-embedding-3-small は品番・グレード名・規格値（「UL94 V-0」「PA46」「CTI 600」など）の一致に弱いため、
+-- documents.content の語句インデックスで探した結果と、ベクトル検索（match_passages_cross）の結果を
+-- Reciprocal Rank Fusion（RRF）で統合する。
+--
+-- PostgreSQL の全文検索には日本語の分かち書きがないため、語句は次のように作る（NFKC正規化・大文字化の後）:
+--   - 英数字のトークン（ハイフンは除く。「V-0」→「V0」、1文字のものは除く）… 重み A
+--   - ひらがな・カタカナ・漢字の連続部分を2文字ずつずらした bi-gram（「放熱樹脂」→「放熱 熱樹 樹脂」）… 重み D
+-- 品番・規格値が bi-gram より強く効くよう、ts_rank では重み A の語句を D の10倍に数える。
+-- BM25 の IDF（珍しい語ほど重視）は PostgreSQL 標準の全文検索にないため、この重み付けで代用する。
+
+create or replace function lexical_ascii_terms(input text)
+returns text
+language sql
+immutable
+parallel safe
+as $$
+  select coalesce(string_agg(term, ' '), '')
+  from (
+    select regexp_replace(m[1], '-', '', 'g') as term
+    from regexp_matches(upper(normalize(coalesce(input, ''), NFKC)), '([A-Z0-9]+(?:-[A-Z0-9]+)*)', 'g') as m
+  ) as tokens
+  where char_length(term) >= 2;
+$$;
+
+create or replace function lexical_cjk_terms(input text)
+returns text
+language sql
+immutable
+parallel safe
+as $$
+  select coalesce(string_agg(substr(run, i, 2), ' '), '')
+  from (
+    select m[1] as run
+    from regexp_matches(normalize(coalesce(input, ''), NFKC), '([ぁ-ゖァ-ヺー一-鿿々〆]+)', 'g') as m
+  ) as runs,
+  generate_series(1, greatest(char_length(run) - 1, 1)) as i;
+$$;
+
+-- 検索語の作成用（文書側と同じ語句）
+create or replace function lexical_terms(input text)
+returns text
+language sql
+immutable
+parallel safe
+as $$
+  select btrim(lexical_ascii_terms(input) || ' ' || lexical_cjk_terms(input));
+$$;
+
+-- 保存時に自動で計算される語句の列（既存の行も追加時に計算される）
+alter table documents add column if not exists lexical_tsv tsvector
+  generated always as (
+    setweight(to_tsvector('simple', lexical_ascii_terms(content)), 'A')
+    || setweight(to_tsvector('simple', lexical_cjk_terms(content)), 'D')
+  ) stored;
+
+create index if not exists documents_lexical_tsv_idx on documents using gin (lexical_tsv);
+
+-- ベクトル検索と語句検索の上位 candidate_count 件ずつを RRF（1 / (rrf_k + 順位) の和）で統合する
+-- snippet はベクトル検索で最も近いパッセージ。語句検索だけで見つかった文書は、語句が一致したパッセージ
+-- （パッセージがなければ本文の先頭）を返す。similarity はクエリとのベクトルの類似度。
+create or replace function match_documents_hybrid (
+  query_embedding vector(1536),
+  query_text text,
+  match_count int default 5,
+  exclude_department text default null,
+  snippet_length int default 300,
+  candidate_count int default 50,
+  rrf_k int default 60,
+  aggregation text default 'max',
+  ef_search int default null
+)
+returns table (
+  id uuid,
+  metadata jsonb,
+  snippet text,
+  similarity float,
+  rrf_score float,
+  vector_rank int,
+  lexical_rank int
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+  lexical_query tsquery;
+begin
+  -- 検索語を OR でつなぐ（語句がなければ null になり、語句検索は0件）
+  select to_tsquery('simple', string_agg(distinct term, ' | '))
+  into lexical_query
+  from unnest(string_to_array(lexical_terms(query_text), ' ')) as term
+  where term <> '';
+
+  return query
+  with vector_hits as (
+    select
+      v.id,
+      v.snippet,
+      v.similarity,
+      (row_number() over (order by v.similarity desc))::int as rank
+    from match_passages_cross(
+      query_embedding => query_embedding,
+      match_count => candidate_count,
+      exclude_department => exclude_department,
+      match_threshold => -1.0,
+      snippet_length => snippet_length,
+      aggregation => aggregation,
+      ef_search => ef_search
+    ) as v
+  ),
+  lexical_hits as (
+    select
+      d.id,
+      (row_number() over (order by ts_rank(d.lexical_tsv, lexical_query, 1) desc))::int as rank
+    from documents d
+    where d.lexical_tsv @@ lexical_query
+    and (
+      exclude_department is null
+      or coalesce(d.metadata->>'department', '') <> exclude_department
+    )
+    order by ts_rank(d.lexical_tsv, lexical_query, 1) desc
+    limit candidate_count
+  ),
+  fused as (
+    select
+      coalesce(v.id, l.id) as document_id,
+      (coalesce(1.0 / (rrf_k + v.rank), 0) + coalesce(1.0 / (rrf_k + l.rank), 0))::float as rrf_score,
+      v.rank as vector_rank,
+      l.rank as lexical_rank,
+      v.snippet,
+      v.similarity
+    from vector_hits v
+    full outer join lexical_hits l on l.id = v.id
+    order by rrf_score desc
+    limit match_count
+  )
+  select
+    d.id,
+    d.metadata,
+    coalesce(
+      f.snippet,
+      (
+        select left(p.content, snippet_length)
+        from document_passages p
+        where p.document_id = d.id
+        and to_tsvector('simple', lexical_terms(p.content)) @@ lexical_query
+        order by ts_rank(to_tsvector('simple', lexical_terms(p.content)), lexical_query) desc
+        limit 1
+      ),
+      left(d.content, snippet_length)
+    ) as snippet,
+    coalesce(f.similarity, 1 - (d.embedding <=> query_embedding))::float as similarity,
+    f.rrf_score,
+    f.vector_rank,
+    f.lexical_rank
+  from fused f
+  join documents d on d.id = f.document_id
+  order by f.rrf_score desc;
+end;
+$$;
@@ -0,0 +1,63 @@
+-- 語句の一致（全文検索）だけで他事業部の面談メモを探す関数
+-- ローカルのベクトル索引のミラー（services/vector_mirror.py）が最新のときは、ベクトル検索をミラーで行い、
+-- 語句検索だけをDBで行って、アプリ側で Reciprocal Rank Fusion により統合する（backend.search_cross_pollination_hybrid）。
+-- 語句の作成・重み付け・スニペットは match_documents_hybrid（005_documents_hybrid_search.sql）の語句検索と同じ。
+
+create or replace function match_documents_lexical (
+  query_text text,
+  match_count int default 50,
+  exclude_department text default null,
+  snippet_length int default 300
+)
+returns table (
+  id uuid,
+  metadata jsonb,
+  snippet text,
+  lexical_rank int
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+  lexical_query tsquery;
+begin
+  -- 検索語を OR でつなぐ（語句がなければ null になり、0件を返す）
+  select to_tsquery('simple', string_agg(distinct term, ' | '))
+  into lexical_query
+  from unnest(string_to_array(lexical_terms(query_text), ' ')) as term
+  where term <> '';
+
+  return query
+  with lexical_hits as (
+    select
+      d.id,
+      (row_number() over (order by ts_rank(d.lexical_tsv, lexical_query, 1) desc))::int as rank
+    from documents d
+    where d.lexical_tsv @@ lexical_query
+    and (
+      exclude_department is null
+      or coalesce(d.metadata->>'department', '') <> exclude_department
+    )
+    order by ts_rank(d.lexical_tsv, lexical_query, 1) desc
+    limit match_count
+  )
+  select
+    d.id,
+    d.metadata,
+    coalesce(
+      (
+        select left(p.content, snippet_length)
+        from document_passages p
+        where p.document_id = d.id
+        and to_tsvector('simple', lexical_terms(p.content)) @@ lexical_query
+        order by ts_rank(to_tsvector('simple', lexical_terms(p.content)), lexical_query) desc
+        limit 1
+      ),
+      left(d.content, snippet_length)
+    ) as snippet,
+    l.rank as lexical_rank
+  from lexical_hits l
+  join documents d on d.id = l.id
+  order by l.rank;
+end;
+$$;
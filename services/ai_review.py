@@ -4,7 +4,8 @@ AIレビューサービス
 """
 
 # from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
+from services.llm import ChatGoogleGenerativeAI, get_api_key, get_chat_model
+from services.tag_ranker import get_min_confidence, rank_tags
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.messages import HumanMessage
@@ -27,6 +28,10 @@ DEFAULT_TECH_TAGS = [
 ]
 
 
+# 市場調査で使う重要タグの数
+PRIORITY_TAG_COUNT = 5
+
+
 # AIレビュー結果の構造化モデル
 class ReviewResult(BaseModel):
     """AIレビューの結果を格納するモデル"""
@@ -34,6 +39,10 @@ class ReviewResult(BaseModel):
     questions: List[str] = Field(default=[], description="情報不足の場合の質問リスト")
     summary: Optional[str] = Field(default=None, description="内容の要約")
     tech_tags: List[str] = Field(default=[], description="抽出された技術タグ")
+    priority_tags: List[str] = Field(
+        default=[],
+        description=f"tech_tags の中から重要度の高い順に選んだ最大{PRIORITY_TAG_COUNT}つのタグ（tech_tags と同じ表記）",
+    )
 
 
 # プロンプトテンプレート（関数の外に定義）
@@ -53,6 +62,15 @@ REVIEW_PROMPT_TEMPLATE = """あなたは化学メーカーの研究開発部門
 
 技術タグは、材料名、用途、特性、技術領域などを含めてください。
 
+情報が十分な場合は、tech_tags の中から化学系製造業にとって重要度の高いタグを
+重要度の高い順に最大{priority_tag_count}つ選び、priority_tags に入れてください（tech_tags と同じ表記を使うこと）。
+【重要タグの選定基準】
+1. 材料名や化学物質名を優先
+2. 用途や応用分野を優先
+3. 具体的な物性や特性を優先
+4. 技術領域やプロセス名を優先
+5. 一般的すぎるキーワードは除外
+
 {format_instructions}"""
 
 
@@ -74,21 +92,8 @@ def review_interview_content(content: str, model_name: str = "gemini-2.5-flash-l
     #     openai_api_key=os.getenv("OPENAI_API_KEY")
     # )
 
-    # Gemini 用のチェック
-    if ChatGoogleGenerativeAI is None:
-        raise ImportError("Gemini を使うには langchain-google-genai のインストールが必要です")
-
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY が設定されていません")
-
-    # LLMを初期化（Gemini 2.5 Pro）
-    llm = ChatGoogleGenerativeAI(
-        # model="gemini-2.5-pro",
-        model=model_name,
-        temperature=0.3,
-        google_api_key=api_key,
-    )
+    # LLMを取得（共有クライアント。未インストール・APIキー未設定時は例外）
+    llm = get_chat_model(model_name=model_name, temperature=0.3)
     
     # 出力パーサーを設定
     parser = PydanticOutputParser(pydantic_object=ReviewResult)
@@ -102,6 +107,7 @@ def review_interview_content(content: str, model_name: str = "gemini-2.5-flash-l
     # プロンプトをフォーマット
     formatted_prompt = prompt.format_messages(
         content=content,
+        priority_tag_count=PRIORITY_TAG_COUNT,
         format_instructions=parser.get_format_instructions()
     )
     
@@ -115,6 +121,8 @@ def review_interview_content(content: str, model_name: str = "gemini-2.5-flash-l
         if not result.tech_tags:
             logger.warning("AIレビューで技術タグが取得できませんでした。デフォルトタグを使用します。")
             result.tech_tags = DEFAULT_TECH_TAGS.copy()
+            result.priority_tags = []
+        result.priority_tags = normalize_priority_tags(result.priority_tags, result.tech_tags)
         return result
     except Exception as e:
         # パースに失敗した場合、デフォルト値を返す（デフォルトタグを含める）
@@ -126,9 +134,41 @@ def review_interview_content(content: str, model_name: str = "gemini-2.5-flash-l
         )
 
 
+def normalize_priority_tags(priority_tags: List[str], tech_tags: List[str], max_tags: int = PRIORITY_TAG_COUNT) -> List[str]:
+    """
+    LLMが選んだ重要タグを tech_tags に含まれるものだけに絞り、足りない分は tech_tags の順に補う
+
+    Args:
+        priority_tags: LLMが重要度順に選んだタグ
+        tech_tags: 抽出された技術タグのリスト
+        max_tags: 重要タグの最大数
+
+    Returns:
+        List[str]: 重要度順のタグ（最大max_tags件）。LLMが1つも有効なタグを選ばなかった場合は空リスト
+    """
+    known = set(tech_tags)
+    selected = []
+    for tag in priority_tags:
+        tag = tag.strip()
+        if tag in known and tag not in selected:
+            selected.append(tag)
+    if not selected:
+        return []
+    for tag in tech_tags:
+        if len(selected) >= max_tags:
+            break
+        if tag not in selected:
+            selected.append(tag)
+    return selected[:max_tags]
+
+
 def select_important_tags(tech_tags: List[str], interview_memo: str = "", max_tags: int = 5, model_name: str = "gemini-2.5-flash-lite") -> List[str]:
     """
     抽出された技術タグから、化学系製造業にとって重要度の高いタグを選定する
+
+    AIレビューの結果に priority_tags がある場合はそれを使う（LLMの呼び出しが1回減る）。
+    この関数は priority_tags がない場合（以前のレビュー結果・タグを直接指定する呼び出し）に使う。
+    まずローカルの用語辞書で順位付けし（services/tag_ranker.py）、信頼度が低い場合だけLLMで選定する。
     
     Args:
         tech_tags: 抽出された技術タグのリスト
@@ -147,23 +187,25 @@ def select_important_tags(tech_tags: List[str], interview_memo: str = "", max_ta
         logger.info(f"技術タグ数が{max_tags}以下なので、そのまま使用: {tech_tags}")
         return tech_tags
     
+    # ローカルの順位付け（LLMを呼ばない）。信頼度が十分ならそのまま使う
+    ranking = rank_tags(tech_tags, interview_memo=interview_memo, max_tags=max_tags)
+    if ranking.confidence >= get_min_confidence():
+        logger.info(f"用語辞書で重要タグを選定（信頼度 {ranking.confidence}）: {ranking.tags}")
+        return ranking.tags
+    logger.info(f"用語辞書での選定の信頼度が低いため（{ranking.confidence}）、LLMで選定します")
+    
     # Gemini 用のチェック
     if ChatGoogleGenerativeAI is None:
-        logger.warning("Gemini が利用できないため、最初の5つのタグを返します")
-        return tech_tags[:max_tags]
+        logger.warning("Gemini が利用できないため、用語辞書で選定したタグを返します")
+        return ranking.tags
     
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        logger.warning("GEMINI_API_KEY が設定されていないため、最初の5つのタグを返します")
-        return tech_tags[:max_tags]
+    if not get_api_key():
+        logger.warning("GEMINI_API_KEY が設定されていないため、用語辞書で選定したタグを返します")
+        return ranking.tags
     
     try:
-        # LLMを初期化（Gemini 2.5 Flash - 高速で低コスト）
-        llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            temperature=0.3,
-            google_api_key=api_key,
-        )
+        # LLMを取得（共有クライアント）
+        llm = get_chat_model(model_name=model_name, temperature=0.3)
         
         # プロンプトの構築
         tags_str = "、".join(tech_tags)
@@ -214,13 +256,13 @@ def select_important_tags(tech_tags: List[str], interview_memo: str = "", max_ta
         # パースに失敗した場合やタグ数が不足している場合のフォールバック
         if len(selected_tags) < max_tags:
             logger.warning(f"LLMが{len(selected_tags)}個のタグしか選定しませんでした。フォールバック処理を実行します。")
-            # 元のタグリストから最初のmax_tags個を返す
-            return tech_tags[:max_tags]
+            # 用語辞書で選定したタグを返す
+            return ranking.tags
         
         logger.info(f"重要度の高い{len(selected_tags)}個のタグを選定: {selected_tags}")
         return selected_tags[:max_tags]
         
     except Exception as e:
         logger.error(f"技術タグの選定中にエラーが発生しました: {e}", exc_info=True)
-        # エラー時は最初のmax_tags個を返す
-        return tech_tags[:max_tags]
+        # エラー時は用語辞書で選定したタグを返す
+        return ranking.tags
@@ -0,0 +1,116 @@
+"""
+画像アセットサービス
+images/ の大きな画像から表示サイズに合わせた縮小版（WebP/PNG）を作成し、.cache/assets から配信する
+"""
+
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGES_DIR = os.path.join(BASE_DIR, "images")
+ASSET_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "assets")
+
+# 元画像 → 作成する縮小版 (幅px, 形式)
+# 幅は表示サイズの2倍（高DPIディスプレイ用）を目安にしている
+ASSET_VARIANTS: Dict[str, List[Tuple[int, str]]] = {
+    # サイドバーのロゴ（サイドバー幅の半分程度で表示）
+    "AgentX_logo.png": [(320, "webp"), (320, "png")],
+    "Orchestrator_big.png": [(256, "webp"), (256, "png")],
+}
+
+_build_lock = threading.Lock()
+
+
+def _variant_path(name: str, width: int, fmt: str) -> str:
+    """縮小版のキャッシュパス"""
+    stem = os.path.splitext(name)[0]
+    return os.path.join(ASSET_CACHE_DIR, f"{stem}-{width}w.{fmt}")
+
+
+def build_variant(name: str, width: int, fmt: str = "webp") -> str:
+    """
+    縮小版を作成する（元画像より新しいキャッシュがあれば作り直さない）
+
+    Args:
+        name: images/ 内のファイル名
+        width: 横幅（px、元画像より大きい場合は拡大しない）
+        fmt: "webp" または "png"
+
+    Returns:
+        str: 縮小版のパス
+    """
+    source = os.path.join(IMAGES_DIR, name)
+    target = _variant_path(name, width, fmt)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+        return target
+    if Image is None:
+        raise ImportError("画像の縮小には Pillow のインストールが必要です")
+
+    with _build_lock:
+        os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+        with Image.open(source) as image:
+            if image.width > width:
+                height = round(image.height * width / image.width)
+                image = image.resize((width, height), Image.LANCZOS)
+            # 書き込み途中のファイルを配信しないよう、一時ファイルに書いてから置き換える
+            tmp_path = f"{target}.tmp"
+            if fmt == "webp":
+                image.save(tmp_path, format="WEBP", quality=85, method=6)
+            else:
+                image.save(tmp_path, format="PNG", optimize=True)
+        os.replace(tmp_path, target)
+    logger.info(f"アセットを作成しました: {target} ({os.path.getsize(source):,} → {os.path.getsize(target):,} bytes)")
+    return target
+
+
+@lru_cache(maxsize=None)
+def get_asset(name: str, width: int, fmt: str = "webp") -> str:
+    """
+    表示用の画像パスを取得する（プロセス内で1回だけ作成・確認し、以降はパスを返すだけ）
+
+    縮小版を作成できない場合（Pillow未インストールなど）は元画像のパスを返す。
+
+    Args:
+        name: images/ 内のファイル名
+        width: 横幅（px）
+        fmt: "webp" または "png"
+
+    Returns:
+        str: 画像のパス
+    """
+    try:
+        return build_variant(name, width, fmt)
+    except Exception as e:
+        logger.warning(f"{name} の縮小版を作成できませんでした（元画像を使用します）: {e}")
+        return os.path.join(IMAGES_DIR, name)
+
+
+def build_all_assets() -> List[str]:
+    """
+    ASSET_VARIANTS のすべての縮小版を作成する（起動前・デプロイ時に実行）
+
+    Returns:
+        List[str]: 作成（または既存）の縮小版のパス
+    """
+    paths = []
+    for name, variants in ASSET_VARIANTS.items():
+        for width, fmt in variants:
+            paths.append(build_variant(name, width, fmt))
+    return paths
+
+
+if __name__ == "__main__":
+    # デプロイ時に事前作成する: python -m services.assets
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    for path in build_all_assets():
+        print(f"{path} ({os.path.getsize(path):,} bytes)")
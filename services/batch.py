@@ -0,0 +1,322 @@
+"""
+面談メモの一括処理サービス
+フォルダ内の docx / pdf / txt を、AIレビュー → 保存 → イノベーション分隊 → レポート出力 の順に処理する
+
+使用方法:
+    python -m services.batch memos/ --department 研究開発部 --workers 4 --rps 2
+    # 過去の面談録の移行（AIレビュー・分隊を行わず、まとめてEmbedding化して保存だけ行う）
+    python -m services.batch archive/ --department 研究開発部 --save-only
+
+同じ出力先で再実行すると、完了済みのファイル（内容のSHA-256で判定）はスキップし、
+保存済みで分隊の途中に失敗したファイルは保存をやり直さずに分隊から再開する。
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from backend import BulkSaveReport, save_interview_note, save_interview_notes_bulk
+from services.ai_review import DEFAULT_TECH_TAGS, review_interview_content
+from services.html_report import create_html_report
+from services.ingest import SUPPORTED_EXTENSIONS, read_file
+from services.llm import configure_rate_limit
+from services.markdown_parser import parse_markdown_to_slides
+from services.squad import Progress, run_squad
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "batch_manifest.json"
+
+# マニフェストの状態
+STATUS_SAVED = "saved"  # DB保存済み（分隊は未完了）
+STATUS_DONE = "done"
+STATUS_INSUFFICIENT = "insufficient"  # AIレビューで情報不足と判定
+STATUS_FAILED = "failed"
+
+
+def read_memo_file(path: Path) -> str:
+    """
+    面談メモのファイルをテキストとして読み込む
+
+    Args:
+        path: docx / pdf / txt ファイルのパス
+
+    Returns:
+        str: 抽出したテキスト（txtは文字コードを判定して読み込む）
+    """
+    return read_file(path).text
+
+
+def file_sha256(path: Path) -> str:
+    """ファイル内容のSHA-256を返す（再開時の同一性判定に使う）"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BatchManifest:
+    """処理状況をファイル内容のハッシュごとに記録するJSONマニフェスト（スレッドセーフ）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                self._entries = json.load(f)
+
+    def get(self, key: str) -> Dict:
+        """記録を取得する（未処理なら空の辞書）"""
+        with self._lock:
+            return dict(self._entries.get(key, {}))
+
+    def update(self, key: str, **fields) -> None:
+        """記録を更新し、すぐにファイルへ書き出す（途中で停止しても進捗が残るように）"""
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            entry.update(fields, updated_at=datetime.now().isoformat())
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def process_file(
+    path: Path,
+    manifest: BatchManifest,
+    department: str,
+    output_dir: Path,
+    model_name: str = "gemini-2.5-flash-lite",
+    retry_insufficient: bool = False,
+) -> Dict:
+    """
+    1ファイル分のパイプラインを実行する
+
+    Args:
+        path: 面談メモのファイル
+        manifest: 処理状況のマニフェスト
+        department: 登録する事業部名（他事業部検索の除外にも使う）
+        output_dir: レポートの出力先
+        model_name: 使用するAIモデル名
+        retry_insufficient: 情報不足と判定済みのファイルもレビューし直すか
+
+    Returns:
+        Dict: このファイルのマニフェストの記録
+    """
+    key = file_sha256(path)
+    entry = manifest.get(key)
+    status = entry.get("status")
+    if status == STATUS_DONE or (status == STATUS_INSUFFICIENT and not retry_insufficient):
+        logger.info(f"{path.name}: 処理済みのためスキップします（{status}）")
+        return entry
+
+    # 企業名はファイル名から取る（展示会後のメモは「企業名.docx」で保存されている想定）
+    company_name = path.stem
+    manifest.update(key, file=path.name)
+    try:
+        text = read_memo_file(path)
+        if not text.strip():
+            raise ValueError("テキストを抽出できませんでした")
+
+        query_embedding = None
+        if status == STATUS_SAVED:
+            # 保存済みなら二重登録しない（Embeddingは社内検索で再計算される）
+            tech_tags = entry.get("tech_tags") or DEFAULT_TECH_TAGS.copy()
+            priority_tags = entry.get("priority_tags")
+            logger.info(f"{path.name}: 保存済みのため分隊から再開します")
+        else:
+            review = review_interview_content(text, model_name=model_name)
+            if not review.is_sufficient:
+                manifest.update(key, status=STATUS_INSUFFICIENT, questions=review.questions)
+                logger.info(f"{path.name}: 情報不足のためスキップします")
+                return manifest.get(key)
+
+            tech_tags = review.tech_tags or DEFAULT_TECH_TAGS.copy()
+            priority_tags = review.priority_tags
+            metadata = {
+                "company_name": company_name,
+                "contact_info": "",
+                "department": department,
+                "tech_tags": tech_tags,
+                "created_at": datetime.now().isoformat(),
+                "source_file": path.name,
+            }
+            saved_note = save_interview_note(text=text, metadata=metadata)
+            if not saved_note:
+                raise RuntimeError("データの保存に失敗しました")
+            query_embedding = saved_note.get("embedding")
+            manifest.update(
+                key, status=STATUS_SAVED, note_id=saved_note.get("id"), tech_tags=tech_tags, priority_tags=priority_tags
+            )
+
+        def log_progress(event):
+            if isinstance(event, Progress):
+                logger.info(f"{path.name}: [{event.percent}%] {event.message}")
+
+        result = run_squad(
+            on_event=log_progress,
+            interview_memo=text,
+            tech_tags=tech_tags,
+            department=department,
+            company_name=company_name,
+            model_name=model_name,
+            query_embedding=query_embedding,
+            priority_tags=priority_tags or None,
+        )
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        markdown_path = output_dir / f"{company_name}-{key[:8]}.md"
+        markdown_path.write_text(result.report, encoding="utf-8")
+        html_path = create_html_report(
+            parse_markdown_to_slides(result.report, company_name=company_name),
+            company_name=company_name,
+            output_dir=str(output_dir),
+        )
+        manifest.update(key, status=STATUS_DONE, markdown=str(markdown_path), html=str(html_path), error=None)
+        logger.info(f"{path.name}: 完了しました → {markdown_path}")
+    except Exception as e:
+        logger.error(f"{path.name}: 処理に失敗しました: {e}", exc_info=True)
+        # 保存済みなら状態は saved のまま残し、次回は分隊から再開できるようにする
+        saved = manifest.get(key).get("status") == STATUS_SAVED
+        manifest.update(key, status=STATUS_SAVED if saved else STATUS_FAILED, error=str(e))
+    return manifest.get(key)
+
+
+def run_batch(
+    input_dir: str,
+    department: str,
+    output_dir: str = "outputs",
+    workers: int = 4,
+    requests_per_second: Optional[float] = None,
+    model_name: str = "gemini-2.5-flash-lite",
+    retry_insufficient: bool = False,
+) -> List[Dict]:
+    """
+    フォルダ内の面談メモを並列に処理する
+
+    Args:
+        input_dir: 面談メモ（docx / pdf / txt）のフォルダ
+        department: 登録する事業部名
+        output_dir: レポートとマニフェストの出力先
+        workers: 同時に処理するファイル数
+        requests_per_second: 全ワーカー合計のLLM呼び出し回数の上限（Noneで制限なし）
+        model_name: 使用するAIモデル名
+        retry_insufficient: 情報不足と判定済みのファイルもレビューし直すか
+
+    Returns:
+        List[Dict]: ファイルごとのマニフェストの記録
+    """
+    files = sorted(
+        p for p in Path(input_dir).iterdir()
+        if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS
+    )
+    if not files:
+        logger.warning(f"{input_dir} に処理対象のファイル（{', '.join(SUPPORTED_EXTENSIONS)}）がありません")
+        return []
+
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest = BatchManifest(out / MANIFEST_NAME)
+    configure_rate_limit(requests_per_second)
+
+    logger.info(f"{len(files)}件のファイルを {workers} 並列で処理します")
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as executor:
+        futures = [
+            executor.submit(process_file, path, manifest, department, out, model_name, retry_insufficient)
+            for path in files
+        ]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return results
+
+
+def run_bulk_save(input_dir: str, department: str, concurrency: int = 4) -> BulkSaveReport:
+    """
+    フォルダ内の面談メモを、AIレビュー・分隊なしでまとめて保存する（過去の面談録の移行用）
+
+    ファイルは1件ずつ読み込みながら save_interview_notes_bulk に渡す。
+    保存済みの内容はスキップされるため、途中で止まっても同じコマンドで再実行できる。
+
+    Args:
+        input_dir: 面談メモ（docx / pdf / txt）のフォルダ
+        department: 登録する事業部名
+        concurrency: 同時に処理するバッチ数
+
+    Returns:
+        BulkSaveReport: 件数とスループット
+    """
+    files = sorted(
+        p for p in Path(input_dir).iterdir()
+        if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS
+    )
+
+    def iter_notes():
+        for path in files:
+            try:
+                text = read_memo_file(path)
+            except Exception as e:
+                logger.error(f"{path.name}: 読み込みに失敗しました: {e}")
+                continue
+            yield text, {
+                "company_name": path.stem,
+                "contact_info": "",
+                "department": department,
+                "tech_tags": [],
+                "source_file": path.name,
+            }
+
+    def log_progress(report: BulkSaveReport):
+        logger.info(f"{report.inserted + report.skipped + report.failed}/{len(files)}件 "
+                    f"（{report.notes_per_second:.1f}件/秒）")
+
+    return save_interview_notes_bulk(iter_notes(), concurrency=concurrency, progress_callback=log_progress)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="面談メモを一括でレビュー・保存し、イノベーション分隊のレポートを作成します")
+    parser.add_argument("input_dir", help="面談メモ（docx / pdf / txt）のフォルダ")
+    parser.add_argument("--department", required=True, help="登録する事業部名")
+    parser.add_argument("--output-dir", default="outputs", help="レポートの出力先（デフォルト: outputs）")
+    parser.add_argument("--workers", type=int, default=4, help="同時に処理するファイル数（--save-only では同時に保存するバッチ数、デフォルト: 4）")
+    parser.add_argument("--rps", type=float, default=None, help="LLM呼び出しの上限（回/秒、全ワーカー合計）")
+    parser.add_argument("--model", default="gemini-2.5-flash-lite", help="使用するAIモデル名")
+    parser.add_argument("--retry-insufficient", action="store_true", help="情報不足と判定済みのファイルも再レビューする")
+    parser.add_argument("--save-only", action="store_true", help="AIレビュー・分隊を行わず、まとめて保存だけ行う（過去の面談録の移行用）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(threadName)s - %(levelname)s - %(message)s")
+
+    if args.save_only:
+        report = run_bulk_save(args.input_dir, department=args.department, concurrency=args.workers)
+        print(report.summary())
+        return 1 if report.failed else 0
+
+    results = run_batch(
+        args.input_dir,
+        department=args.department,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        requests_per_second=args.rps,
+        model_name=args.model,
+        retry_insufficient=args.retry_insufficient,
+    )
+    counts: Dict[str, int] = {}
+    for entry in results:
+        status = entry.get("status", STATUS_FAILED)
+        counts[status] = counts.get(status, 0) + 1
+    print(" / ".join(f"{status}: {count}" for status, count in sorted(counts.items())))
+    return 1 if counts.get(STATUS_FAILED) or counts.get(STATUS_SAVED) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+"""
+パッセージ分割サービス
+長い面談メモを、日本語の文の区切り（。！？・改行）で重なりのあるパッセージに分割する。
+
+面談メモ全体を1つのベクトルにすると、Embeddingモデルの入力上限で後半が切り捨てられ、
+話題が多いメモほど類似度が薄まる。パッセージごとのベクトル（document_passages テーブル）で検索し、
+文書単位に集約することで、長いメモの一部にだけ書かれた知見も見つけられるようにする
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import List
+
+DEFAULT_PASSAGE_CHARS = 500
+DEFAULT_OVERLAP_CHARS = 100
+
+# 文末（。！？!? と、その直後の閉じ括弧）または改行までを1文とする。
+# 「2.0 W/mK」のような数値を分割しないよう、半角のピリオドは文末として扱わない
+_SENTENCE = re.compile(r"[^\n]*?(?:[。！？!?]+[」』）)\]]*|\n+|$)")
+
+
+@dataclass(frozen=True)
+class Passage:
+    """分割したパッセージ（start / end は元のテキスト内の文字位置）"""
+    index: int
+    text: str
+    start: int
+    end: int
+
+
+def get_passage_chars() -> int:
+    """1パッセージの最大文字数（環境変数 CHUNK_PASSAGE_CHARS）"""
+    return int(os.getenv("CHUNK_PASSAGE_CHARS", DEFAULT_PASSAGE_CHARS))
+
+
+def get_overlap_chars() -> int:
+    """前のパッセージと重ねる最大文字数（環境変数 CHUNK_OVERLAP_CHARS）"""
+    return int(os.getenv("CHUNK_OVERLAP_CHARS", DEFAULT_OVERLAP_CHARS))
+
+
+def split_sentences(text: str, max_chars: int) -> List[tuple]:
+    """
+    テキストを文に分割する（max_chars を超える文は max_chars ごとに区切る）
+
+    Returns:
+        List[tuple]: (開始位置, 終了位置) のリスト。空白だけの文は含まない
+    """
+    spans = []
+    for match in _SENTENCE.finditer(text):
+        start, end = match.span()
+        if start == end or not text[start:end].strip():
+            continue
+        while end - start > max_chars:
+            spans.append((start, start + max_chars))
+            start += max_chars
+        spans.append((start, end))
+    return spans
+
+
+def chunk_text(text: str, max_chars: int = None, overlap_chars: int = None) -> List[Passage]:
+    """
+    テキストを、文の途中で切らずに max_chars 以内のパッセージへ分割する
+
+    各パッセージの先頭には、前のパッセージの末尾の文を overlap_chars 以内で重ねる
+    （文をまたぐ内容が、どちらのパッセージでも検索できるようにするため）。
+    max_chars 以内のテキストは1つのパッセージになる。
+
+    Args:
+        text: 面談メモ
+        max_chars: 1パッセージの最大文字数（省略時は環境変数 CHUNK_PASSAGE_CHARS、デフォルト: 500）
+        overlap_chars: 重ねる最大文字数（省略時は環境変数 CHUNK_OVERLAP_CHARS、デフォルト: 100）
+
+    Returns:
+        List[Passage]: パッセージのリスト（空のテキストなら空リスト）
+    """
+    max_chars = max_chars or get_passage_chars()
+    overlap_chars = get_overlap_chars() if overlap_chars is None else overlap_chars
+    if not text.strip():
+        return []
+    if len(text.strip()) <= max_chars:
+        start = len(text) - len(text.lstrip())
+        return [Passage(0, text.strip(), start, start + len(text.strip()))]
+
+    sentences = split_sentences(text, max_chars)
+    passages: List[Passage] = []
+    first = 0
+    while first < len(sentences):
+        # max_chars に収まるだけ文を足す（1文目は必ず入れる）
+        last = first
+        while last + 1 < len(sentences) and sentences[last + 1][1] - sentences[first][0] <= max_chars:
+            last += 1
+        start, end = sentences[first][0], sentences[last][1]
+        passages.append(Passage(len(passages), text[start:end].strip(), start, end))
+        if last + 1 >= len(sentences):
+            break
+        # 次のパッセージは、末尾の文を overlap_chars 以内で重ねてから始める
+        # （重ねた分で次の文が入らなくなる場合は重ねない。必ず1文以上進める）
+        next_first = last + 1
+        next_end = sentences[last + 1][1]
+        while (
+            next_first - 1 > first
+            and end - sentences[next_first - 1][0] <= overlap_chars
+            and next_end - sentences[next_first - 1][0] <= max_chars
+        ):
+            next_first -= 1
+        first = next_first
+    return passages
@@ -0,0 +1,388 @@
+"""
+文書取り込みサービス
+面談メモのファイル（docx / pdf / txt）からテキストを抽出する。
+ページ・段落を順に読みながら連結し、テキストファイルは文字コード（Shift_JIS/CP932 など）を判定する。
+同じファイルを何度も解析しないよう、抽出結果はファイル内容のSHA-256ごとにキャッシュする
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+KIND_TXT = "txt"
+KIND_PDF = "pdf"
+KIND_DOCX = "docx"
+
+SUPPORTED_EXTENSIONS = (".docx", ".pdf", ".txt")
+
+# アップロード時の MIME タイプ → 種類
+MIME_KINDS = {
+    "text/plain": KIND_TXT,
+    "application/pdf": KIND_PDF,
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": KIND_DOCX,
+}
+
+# テキストファイルの文字コード候補（先に一致したものを採用する）
+# EUC-JP は Shift_JIS の文字を含むとほぼ確実に失敗するため、CP932 より先に試す
+# （逆の順序だと EUC-JP のメモが CP932 として文字化けしたまま読めてしまう）
+TEXT_ENCODINGS = ("utf-8-sig", "euc-jp", "cp932")
+
+# 読み込むページ数・ファイルサイズの上限（環境変数で変更可能）
+DEFAULT_MAX_PAGES = 200
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+DOCX_PARAGRAPHS_PER_PAGE = 50
+# 読み込む文字数の上限。AIレビューのプロンプトに入れられる長さの目安で、
+# これを超える分は抽出しても使われないため、残りのページは読まない
+DEFAULT_MAX_CHARS = 200_000
+
+# PDFの並列抽出（ページ数がこれ未満なら、プロセス起動のコストの方が大きいため1プロセスで読む）
+DEFAULT_PDF_WORKERS = 4
+PDF_PARALLEL_MIN_PAGES = 32
+PDF_MIN_CHUNK_PAGES = 4
+PDF_MAX_CHUNK_PAGES = 16
+
+# 抽出結果のキャッシュ（ファイル内容のハッシュ → ExtractedText）
+_CACHE_SIZE = 16
+_cache: "OrderedDict[Tuple[str, str, int, int], ExtractedText]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ExtractedText:
+    """ファイルから抽出したテキスト"""
+    text: str
+    kind: str
+    sha256: str
+    pages: int = 0  # PDFのページ数・docxの段落数（txtは0）
+    truncated: bool = False  # ページ数・文字数の上限で途中までしか読んでいない
+    encoding: Optional[str] = None  # txtの文字コード
+
+
+def get_max_pages() -> int:
+    """読み込むページ数の上限（環境変数 INGEST_MAX_PAGES）"""
+    return int(os.getenv("INGEST_MAX_PAGES", DEFAULT_MAX_PAGES))
+
+
+def get_max_bytes() -> int:
+    """読み込むファイルサイズの上限（環境変数 INGEST_MAX_BYTES）"""
+    return int(os.getenv("INGEST_MAX_BYTES", DEFAULT_MAX_BYTES))
+
+
+def get_max_chars() -> int:
+    """読み込む文字数の上限（環境変数 INGEST_MAX_CHARS）"""
+    return int(os.getenv("INGEST_MAX_CHARS", DEFAULT_MAX_CHARS))
+
+
+def detect_kind(filename: str = "", mime_type: Optional[str] = None) -> str:
+    """
+    ファイルの種類を判定する（MIMEタイプを優先し、なければ拡張子で判定）
+
+    Args:
+        filename: ファイル名
+        mime_type: アップロード時のMIMEタイプ
+
+    Returns:
+        str: "txt" / "pdf" / "docx"
+
+    Raises:
+        ValueError: 未対応の形式の場合
+    """
+    if mime_type in MIME_KINDS:
+        return MIME_KINDS[mime_type]
+    suffix = os.path.splitext(filename)[1].lower()
+    if suffix in SUPPORTED_EXTENSIONS:
+        return suffix[1:]
+    raise ValueError(f"未対応のファイル形式です: {filename or mime_type}")
+
+
+def decode_text(data: bytes) -> Tuple[str, str]:
+    """
+    テキストファイルの文字コードを判定してデコードする
+
+    Args:
+        data: ファイルの内容
+
+    Returns:
+        tuple: (テキスト, 文字コード)
+    """
+    for encoding in TEXT_ENCODINGS:
+        try:
+            return data.decode(encoding), encoding
+        except UnicodeDecodeError:
+            continue
+    # どれにも一致しない場合は、読めない文字だけ置き換えて読み込む
+    logger.warning("文字コードを判定できませんでした（UTF-8として読み込みます）")
+    return data.decode("utf-8", errors="replace"), "utf-8"
+
+
+# 並列抽出用ワーカープロセス内の PdfReader（プロセスごとに1回だけ開く）
+_worker_reader = None
+
+
+def _init_pdf_worker(data: bytes) -> None:
+    """ワーカープロセスの初期化（PDFを開いておき、タスクにはページ範囲だけを渡す）"""
+    global _worker_reader
+    import pypdf
+
+    _worker_reader = pypdf.PdfReader(io.BytesIO(data))
+
+
+def _extract_pdf_range(start: int, stop: int) -> List[str]:
+    """ワーカープロセスで [start, stop) ページのテキストを抽出する"""
+    return [_worker_reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _iter_pdf_pages_serial(reader, start: int, stop: int) -> Iterator[List[str]]:
+    """ページを1枚ずつ抽出する（1ページずつのリストを返す）"""
+    for i in range(start, stop):
+        yield [reader.pages[i].extract_text() or ""]
+
+
+def _iter_pdf_pages_parallel(data: bytes, start: int, stop: int, workers: int) -> Iterator[List[str]]:
+    """
+    ページ範囲ごとにワーカープロセスで抽出し、ページ順に返す
+
+    先読みはワーカー数の2倍までにとどめ、途中で止めた場合（文字数の上限など）に
+    残りのページを無駄に抽出しないようにする。
+
+    Yields:
+        List[str]: ページ範囲（先頭から順）のテキスト
+    """
+    chunk_size = min(PDF_MAX_CHUNK_PAGES, max(PDF_MIN_CHUNK_PAGES, (stop - start) // (workers * 4)))
+    ranges = iter([(i, min(i + chunk_size, stop)) for i in range(start, stop, chunk_size)])
+    # Streamlit のサーバーはスレッドを使うため、fork ではなく spawn でワーカーを起動する
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_pdf_worker,
+        initargs=(data,),
+    )
+    try:
+        pending = deque(executor.submit(_extract_pdf_range, *r) for r in islice(ranges, workers * 2))
+        while pending:
+            pages = pending.popleft().result()
+            for r in islice(ranges, 1):
+                pending.append(executor.submit(_extract_pdf_range, *r))
+            yield pages
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_pdf_workers() -> int:
+    """PDFの並列抽出に使うプロセス数（環境変数 INGEST_PDF_WORKERS、1なら並列化しない）"""
+    default = min(DEFAULT_PDF_WORKERS, os.cpu_count() or 1)
+    return max(1, int(os.getenv("INGEST_PDF_WORKERS", default)))
+
+
+def extract_pdf(
+    data: bytes,
+    max_pages: int,
+    max_chars: Optional[int] = None,
+    workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[str, int, bool]:
+    """
+    PDFのテキストを先頭のページから順に抽出して連結する
+
+    ページ数が多い場合はワーカープロセスで並列に抽出し、ページ順に組み立て直す。
+    文字数が max_chars に達したら、残りのページは抽出しない。
+
+    Args:
+        data: PDFの内容
+        max_pages: 読み込むページ数の上限
+        max_chars: 読み込む文字数の上限（Noneなら上限なし）
+        workers: プロセス数（デフォルト: INGEST_PDF_WORKERS）
+        progress_callback: 進捗を受け取る関数 (読み込んだページ数, 対象のページ数)
+
+    Returns:
+        tuple: (テキスト, 読み込んだページ数, 上限で打ち切ったか)
+    """
+    import pypdf
+
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    total = len(reader.pages)
+    limit = min(total, max_pages)
+    workers = get_pdf_workers() if workers is None else workers
+
+    parts: List[str] = []
+    chars = 0
+    stopped = False
+
+    def consume(chunks: Iterator[List[str]]) -> None:
+        nonlocal chars, stopped
+        for pages in chunks:
+            for text in pages:
+                parts.append(text)
+                chars += len(text) + 1
+                if max_chars is not None and chars > max_chars:
+                    stopped = True
+                    break
+            if progress_callback:
+                progress_callback(len(parts), limit)
+            if stopped:
+                break
+
+    if workers > 1 and limit >= PDF_PARALLEL_MIN_PAGES:
+        chunks = _iter_pdf_pages_parallel(data, 0, limit, workers)
+        try:
+            consume(chunks)
+        except BrokenProcessPool as e:
+            # プロセスを起動できない環境では、続きのページを1プロセスで読む
+            logger.warning(f"PDFの並列抽出に失敗しました（1プロセスで続行します）: {e}")
+            consume(_iter_pdf_pages_serial(reader, len(parts), limit))
+        finally:
+            chunks.close()
+    else:
+        consume(_iter_pdf_pages_serial(reader, 0, limit))
+
+    text = "\n".join(parts)
+    if max_chars is not None:
+        text = text[:max_chars]
+    return text, len(parts), stopped or total > max_pages
+
+
+def extract_docx(data: bytes, max_paragraphs: int) -> Tuple[str, int, bool]:
+    """
+    docxの段落のテキストを先頭から順に連結する
+
+    Args:
+        data: docxの内容
+        max_paragraphs: 読み込む段落数の上限
+
+    Returns:
+        tuple: (テキスト, 読み込んだ段落数, 上限で打ち切ったか)
+    """
+    import docx
+
+    paragraphs = docx.Document(io.BytesIO(data)).paragraphs
+    text = "\n".join(paragraph.text for paragraph in islice(paragraphs, max_paragraphs))
+    return text, min(len(paragraphs), max_paragraphs), len(paragraphs) > max_paragraphs
+
+
+def _check_size(size: int, max_bytes: int) -> None:
+    """ファイルサイズが上限を超えていれば ValueError"""
+    if size > max_bytes:
+        raise ValueError(f"ファイルが大きすぎます（{size / 1024 / 1024:.1f}MB、上限 {max_bytes / 1024 / 1024:.0f}MB）")
+
+
+def extract_text(
+    data: bytes,
+    filename: str = "",
+    mime_type: Optional[str] = None,
+    max_pages: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> ExtractedText:
+    """
+    ファイルの内容からテキストを抽出する（同じ内容なら前回の結果を返す）
+
+    Args:
+        data: ファイルの内容
+        filename: ファイル名（種類の判定に使う）
+        mime_type: アップロード時のMIMEタイプ
+        max_pages: PDFのページ数・docxの段落数の上限（デフォルト: INGEST_MAX_PAGES）
+        max_bytes: ファイルサイズの上限（デフォルト: INGEST_MAX_BYTES）
+        max_chars: 文字数の上限（デフォルト: INGEST_MAX_CHARS）
+        progress_callback: PDFの進捗を受け取る関数 (読み込んだページ数, 対象のページ数)
+
+    Returns:
+        ExtractedText: 抽出結果
+
+    Raises:
+        ValueError: 未対応の形式・サイズ超過の場合
+    """
+    max_pages = get_max_pages() if max_pages is None else max_pages
+    max_bytes = get_max_bytes() if max_bytes is None else max_bytes
+    max_chars = get_max_chars() if max_chars is None else max_chars
+    _check_size(len(data), max_bytes)
+
+    kind = detect_kind(filename, mime_type)
+    sha256 = hashlib.sha256(data).hexdigest()
+    key = (sha256, kind, max_pages, max_chars)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    if kind == KIND_TXT:
+        text, encoding = decode_text(data)
+        result = ExtractedText(
+            text=text[:max_chars], kind=kind, sha256=sha256, truncated=len(text) > max_chars, encoding=encoding
+        )
+    elif kind == KIND_PDF:
+        text, pages, truncated = extract_pdf(data, max_pages, max_chars=max_chars, progress_callback=progress_callback)
+        result = ExtractedText(text=text, kind=kind, sha256=sha256, pages=pages, truncated=truncated)
+    else:
+        # docxはページの概念がないため、段落数で上限をかける（1ページ数十段落の想定で十分大きくとる）
+        text, pages, truncated = extract_docx(data, max_pages * DOCX_PARAGRAPHS_PER_PAGE)
+        result = ExtractedText(
+            text=text[:max_chars], kind=kind, sha256=sha256, pages=pages, truncated=truncated or len(text) > max_chars
+        )
+
+    if result.truncated:
+        logger.warning(
+            f"{filename or kind}: 上限（{max_pages}ページ・{max_chars:,}文字）までで読み込みを打ち切りました"
+        )
+
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def extract_uploaded_file(uploaded_file, **kwargs) -> ExtractedText:
+    """
+    Streamlit の UploadedFile からテキストを抽出する
+
+    Args:
+        uploaded_file: st.file_uploader の戻り値
+        **kwargs: extract_text に渡すオプション（max_pages, max_bytes, max_chars, progress_callback）
+
+    Returns:
+        ExtractedText: 抽出結果
+    """
+    return extract_text(
+        uploaded_file.getvalue(),
+        filename=uploaded_file.name,
+        mime_type=uploaded_file.type,
+        **kwargs,
+    )
+
+
+def read_file(path: Union[str, Path], **kwargs) -> ExtractedText:
+    """
+    ファイルを読み込んでテキストを抽出する（バッチ処理用）
+
+    Args:
+        path: docx / pdf / txt ファイルのパス
+        **kwargs: extract_text に渡すオプション（max_pages, max_bytes, max_chars, progress_callback）
+
+    Returns:
+        ExtractedText: 抽出結果
+    """
+    path = Path(path)
+    # 大きすぎるファイルはメモリに読み込む前に弾く
+    max_bytes = kwargs.get("max_bytes") or get_max_bytes()
+    _check_size(path.stat().st_size, max_bytes)
+    return extract_text(path.read_bytes(), filename=path.name, **kwargs)
+
+
+def clear_cache() -> None:
+    """抽出結果のキャッシュを空にする（テスト用）"""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,189 @@
+"""
+バックグラウンドジョブ管理サービス
+イノベーション分隊をStreamlitのスクリプト実行とは別のスレッドで動かし、
+進捗・会話イベント・結果をジョブ表に保持する（ページを再読み込みしても結果を取り出せる）
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from services.squad_events import Progress, SquadEvent, SquadResult
+
+logger = logging.getLogger(__name__)
+
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+DEFAULT_MAX_WORKERS = 4
+# 終了したジョブを保持する時間（秒）
+DEFAULT_JOB_TTL_SECONDS = 24 * 60 * 60
+
+
+def memo_hash(*parts: str) -> str:
+    """
+    ジョブの重複判定に使うハッシュ（面談メモ・事業部・モデル名など）
+
+    Returns:
+        str: SHA-256
+    """
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Job:
+    """1回分の分隊実行"""
+    id: str
+    session_key: str
+    memo_hash: str
+    context: Dict[str, Any] = field(default_factory=dict)
+    status: str = JOB_RUNNING
+    events: List[SquadEvent] = field(default_factory=list)
+    progress_log: List[Tuple[float, str]] = field(default_factory=list)
+    result: Optional[SquadResult] = None
+    error: Optional[BaseException] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_event(self, event: SquadEvent) -> None:
+        """ワーカースレッドからイベントを追加する"""
+        with self._lock:
+            self.events.append(event)
+            if isinstance(event, Progress):
+                self.progress_log.append((time.time(), event.message))
+            elif isinstance(event, SquadResult):
+                self.result = event
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """ジョブを終了状態にする"""
+        with self._lock:
+            self.error = error
+            self.status = JOB_FAILED if error is not None or self.result is None else JOB_DONE
+            self.finished_at = time.time()
+
+    def snapshot(self) -> Tuple[str, List[SquadEvent], List[Tuple[float, str]]]:
+        """
+        UIスレッドから読むための現在の状態のコピー
+
+        Returns:
+            tuple: (状態, イベント列, 進捗ログ)
+        """
+        with self._lock:
+            return self.status, list(self.events), list(self.progress_log)
+
+    @property
+    def progress(self) -> Tuple[int, str]:
+        """最新の進捗 (percent, message)"""
+        with self._lock:
+            for event in reversed(self.events):
+                if isinstance(event, Progress):
+                    return event.percent, event.message
+        return 0, ""
+
+
+class JobManager:
+    """プロセス全体で共有するジョブ表とワーカープール"""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="squad-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[Tuple[str, str], str] = {}
+
+    def submit(
+        self,
+        session_key: str,
+        memo_hash: str,
+        make_events: Callable[[], Iterator[SquadEvent]],
+        context: Optional[Dict[str, Any]] = None,
+    ) -> Job:
+        """
+        ジョブを開始する（同じセッション・同じメモのジョブが実行中なら、それを返す）
+
+        Args:
+            session_key: ブラウザのセッションを識別するキー
+            memo_hash: 面談メモなどのハッシュ（memo_hash関数）
+            make_events: ワーカースレッドで呼ばれ、分隊のイベントを返す関数
+            context: 再読み込み時に画面を復元するための情報（フォーム入力など）
+
+        Returns:
+            Job: 開始した（または実行中の）ジョブ
+        """
+        key = (session_key, memo_hash)
+        with self._lock:
+            self._purge_expired()
+            job_id = self._by_key.get(key)
+            if job_id and self._jobs[job_id].status == JOB_RUNNING:
+                return self._jobs[job_id]
+            job = Job(id=uuid.uuid4().hex, session_key=session_key, memo_hash=memo_hash, context=context or {})
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+        self._executor.submit(self._run, job, make_events)
+        return job
+
+    def _run(self, job: Job, make_events: Callable[[], Iterator[SquadEvent]]) -> None:
+        """ワーカースレッドでイベントを最後まで読み、ジョブに記録する"""
+        try:
+            for event in make_events():
+                job.add_event(event)
+        except Exception as e:
+            logger.error(f"ジョブ {job.id} が失敗しました: {e}", exc_info=True)
+            job.finish(error=e)
+        else:
+            job.finish()
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        """ジョブIDからジョブを取得する（期限切れ・不明ならNone）"""
+        if not job_id:
+            return None
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def find(self, session_key: str, memo_hash: str) -> Optional[Job]:
+        """セッションとメモのハッシュから最新のジョブを取得する"""
+        with self._lock:
+            job_id = self._by_key.get((session_key, memo_hash))
+            return self._jobs.get(job_id) if job_id else None
+
+    def _purge_expired(self) -> None:
+        """保持期間を過ぎた終了済みジョブを削除する（ロック取得済みで呼ぶ）"""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.ttl_seconds
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if self._by_key.get((job.session_key, job.memo_hash)) == job_id:
+                del self._by_key[(job.session_key, job.memo_hash)]
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """
+    共有のジョブマネージャーを取得する
+
+    環境変数:
+        SQUAD_JOB_WORKERS: 同時に実行する分隊の数（デフォルト: 4）
+        SQUAD_JOB_TTL_SECONDS: 終了したジョブを保持する時間（デフォルト: 24時間）
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(
+                max_workers=int(os.getenv("SQUAD_JOB_WORKERS", DEFAULT_MAX_WORKERS)),
+                ttl_seconds=float(os.getenv("SQUAD_JOB_TTL_SECONDS", DEFAULT_JOB_TTL_SECONDS)),
+            )
+        return _manager
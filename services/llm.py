@@ -0,0 +1,188 @@
+"""
+LLMクライアント管理サービス
+ChatGoogleGenerativeAI をプロセス内で共有し、呼び出しごとのクライアント生成とHTTP/TLS接続の確立を省く
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from services.llm_cache import get_llm_cache
+from services.resilience import ResilientChatModel
+
+try:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+except ImportError:
+    ChatGoogleGenerativeAI = None
+
+try:
+    from langchain_core.rate_limiters import InMemoryRateLimiter
+except ImportError:
+    InMemoryRateLimiter = None
+
+try:
+    from langchain_core.runnables import Runnable
+except ImportError:
+    Runnable = None
+
+
+DEFAULT_MODEL_NAME = "gemini-2.5-flash-lite"
+
+# 混雑で再試行しても応答しない場合に切り替える軽量モデル（LLM_FALLBACK_MODEL="" で無効化）
+# 既定モデルと同じモデルではフォールバックしないため、容量を別に持つ旧世代の軽量モデルを使う
+DEFAULT_FALLBACK_MODEL = "gemini-2.0-flash-lite"
+
+# 応答キャッシュを使う temperature の上限（これより高い創造的な生成は毎回生成し直す）
+CACHE_MAX_TEMPERATURE = 0.5
+
+if Runnable is not None:
+    class ResilientChatRunnable(ResilientChatModel, Runnable):
+        """
+        LCELのチェーン（prompt | llm | StrOutputParser()）に組み込める ResilientChatModel
+
+        チェーンの中でも invoke / stream は ResilientChatModel のものが呼ばれるため、
+        再試行・サーキットブレーカー・フォールバックがそのまま適用される。
+        """
+else:
+    ResilientChatRunnable = ResilientChatModel
+
+
+# (モデル名, temperature, streaming, キャッシュ有無, フォールバック先, その他オプション, APIキー) → クライアント
+# 同じ設定のクライアントは1つだけ生成し、内部のHTTPセッション（keep-alive接続）を使い回す
+_clients: Dict[Tuple, ResilientChatModel] = {}
+_clients_lock = threading.Lock()
+
+# 全クライアントで共有するLLM呼び出しのレート制限（configure_rate_limit で設定。未設定なら制限なし）
+_rate_limiter: Optional["InMemoryRateLimiter"] = None
+
+
+def get_api_key() -> str:
+    """
+    Gemini APIキーを取得する
+
+    Returns:
+        str: APIキー（GEMINI_API_KEY、なければGOOGLE_API_KEY）
+    """
+    return os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY") or ""
+
+
+def get_chat_model(
+    model_name: str = DEFAULT_MODEL_NAME,
+    temperature: float = 0.3,
+    streaming: bool = False,
+    cache: Optional[bool] = None,
+    fallback_model: Optional[str] = None,
+    **options,
+) -> ResilientChatModel:
+    """
+    共有のGeminiクライアントを取得する（設定ごとにプロセス内で1つ）
+
+    invoke / stream は 429・503・タイムアウト時に再試行し、それでも失敗した場合は
+    フォールバックモデルで続行する（services/resilience）。
+
+    Args:
+        model_name: 使用するAIモデル名
+        temperature: 生成時のtemperature
+        streaming: ストリーミング出力を有効にするか
+        cache: 応答キャッシュ（services/llm_cache）を使うか。
+            None の場合は temperature が CACHE_MAX_TEMPERATURE 以下のときだけ使う
+        fallback_model: フォールバック先のモデル名。
+            None の場合は環境変数 LLM_FALLBACK_MODEL（未設定なら DEFAULT_FALLBACK_MODEL）、"" でフォールバックしない
+        **options: ChatGoogleGenerativeAI に渡すその他の引数（キャッシュキーにも含める）
+
+    Returns:
+        ResilientChatModel: 共有クライアント（ChatGoogleGenerativeAI のラッパー。LCELのチェーンにも使える）
+    """
+    if ChatGoogleGenerativeAI is None:
+        raise ImportError("Gemini を使うには langchain-google-genai のインストールが必要です")
+
+    api_key = get_api_key()
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY が設定されていません")
+
+    if cache is None:
+        cache = temperature <= CACHE_MAX_TEMPERATURE
+    llm_cache = get_llm_cache() if cache else None
+
+    if fallback_model is None:
+        fallback_model = os.getenv("LLM_FALLBACK_MODEL", DEFAULT_FALLBACK_MODEL)
+    if fallback_model == model_name:
+        fallback_model = ""
+
+    # APIキーもキーに含め、.envの再読み込みでキーが変わった場合は新しいクライアントを作る
+    key = (
+        model_name,
+        float(temperature),
+        bool(streaming),
+        llm_cache is not None,
+        fallback_model,
+        tuple(sorted(options.items())),
+        api_key,
+    )
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            llm = ChatGoogleGenerativeAI(
+                model=model_name,
+                temperature=temperature,
+                google_api_key=api_key,
+                streaming=streaming,
+                # キャッシュ無効時は False を明示し、グローバルキャッシュも使わない
+                cache=llm_cache if llm_cache is not None else False,
+                rate_limiter=_rate_limiter,
+                # 再試行は ResilientChatModel で行う（クライアント内部の再試行と重ねて待ち時間を倍増させない）
+                **{"max_retries": 1, **options},
+            )
+            fallback = None
+            if fallback_model:
+                # フォールバック先は必要になったときに取得する（フォールバック先からはさらにフォールバックしない）
+                def fallback():
+                    return get_chat_model(
+                        model_name=fallback_model,
+                        temperature=temperature,
+                        streaming=streaming,
+                        cache=cache,
+                        fallback_model="",
+                        **options,
+                    )
+            client = ResilientChatRunnable(
+                llm,
+                model_name=model_name,
+                fallback=fallback,
+                max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", 4)),
+            )
+            _clients[key] = client
+    return client
+
+
+def clear_chat_models() -> None:
+    """共有クライアントをすべて破棄する（設定変更時やテスト用）"""
+    with _clients_lock:
+        _clients.clear()
+
+
+def configure_rate_limit(requests_per_second: Optional[float]) -> None:
+    """
+    プロセス全体のLLM呼び出し回数を制限する（バッチ処理などで並列実行する場合用）
+
+    すべての共有クライアントが同じレートリミッターを使うため、並列数に関係なく
+    合計の呼び出し回数が requests_per_second 以下になる。
+
+    Args:
+        requests_per_second: 1秒あたりの最大呼び出し回数（None または 0 以下で制限を解除）
+    """
+    global _rate_limiter
+    if requests_per_second and requests_per_second > 0:
+        if InMemoryRateLimiter is None:
+            raise ImportError("レート制限には langchain-core 0.2.24 以降が必要です")
+        limiter = InMemoryRateLimiter(
+            requests_per_second=requests_per_second,
+            check_every_n_seconds=0.1,
+            max_bucket_size=1,
+        )
+    else:
+        limiter = None
+    with _clients_lock:
+        _rate_limiter = limiter
+        # 既存のクライアントは古いリミッターを持っているため作り直す
+        _clients.clear()
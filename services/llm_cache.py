@@ -0,0 +1,176 @@
+"""
+LLM応答キャッシュサービス
+同じモデル・temperature・プロンプトの呼び出し結果をSQLiteに保存し、再実行時にローカルから返す
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.path.join(BASE_DIR, ".cache", "llm_responses.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 5000
+
+# 期限切れ・上限超過の削除は毎回ではなく、この回数の書き込みごとに行う
+_EVICTION_INTERVAL = 50
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    プロンプトを正規化する（空白・改行の揺れでキャッシュが外れないようにする）
+
+    Args:
+        prompt: LangChainがシリアライズしたプロンプト
+
+    Returns:
+        str: 連続する空白を1つにまとめたプロンプト
+    """
+    return " ".join(prompt.split())
+
+
+def make_cache_key(prompt: str, llm_string: str) -> str:
+    """
+    キャッシュキーを作成する
+
+    Args:
+        prompt: プロンプト
+        llm_string: モデル設定の文字列（モデル名・temperatureなどを含む）
+
+    Returns:
+        str: SHA-256のキー
+    """
+    payload = llm_string + "\0" + normalize_prompt(prompt)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    """TTLと最大件数で古いエントリを削除する、SQLiteのLLM応答キャッシュ"""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute(
+            """
+            create table if not exists llm_responses (
+                key text primary key,
+                value text not null,
+                created_at real not null,
+                accessed_at real not null
+            )
+            """
+        )
+        self._conn.execute("create index if not exists llm_responses_accessed_at on llm_responses (accessed_at)")
+        self._conn.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        """キャッシュを参照する（期限切れは未ヒット扱い）"""
+        key = make_cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "select value, created_at from llm_responses where key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("delete from llm_responses where key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("update llm_responses set accessed_at = ? where key = ?", (now, key))
+            self._conn.commit()
+        try:
+            return loads(value)
+        except Exception as e:
+            logger.warning(f"LLMキャッシュの読み込みに失敗しました（無視して再生成します）: {e}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        """応答をキャッシュに保存する"""
+        key = make_cache_key(prompt, llm_string)
+        value = dumps(list(return_val))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "insert or replace into llm_responses (key, value, created_at, accessed_at) values (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._writes += 1
+            if self._writes % _EVICTION_INTERVAL == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        """キャッシュをすべて削除する"""
+        with self._lock:
+            self._conn.execute("delete from llm_responses")
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """期限切れと、最大件数を超えた古い（最終参照が古い）エントリを削除する"""
+        self._conn.execute("delete from llm_responses where created_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            """
+            delete from llm_responses where key in (
+                select key from llm_responses order by accessed_at desc limit -1 offset ?
+            )
+            """,
+            (self.max_entries,),
+        )
+
+
+_cache: Optional[SQLiteLLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[SQLiteLLMCache]:
+    """
+    共有のLLM応答キャッシュを取得する
+
+    環境変数:
+        LLM_CACHE_ENABLED: "0" / "false" で無効化
+        LLM_CACHE_PATH: SQLiteファイルのパス（デフォルト: .cache/llm_responses.sqlite3）
+        LLM_CACHE_TTL_SECONDS: 有効期限（デフォルト: 7日）
+        LLM_CACHE_MAX_ENTRIES: 最大件数（デフォルト: 5000）
+
+    Returns:
+        Optional[SQLiteLLMCache]: キャッシュ（無効化されている場合・作成に失敗した場合はNone）
+    """
+    global _cache
+    if os.getenv("LLM_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = SQLiteLLMCache(
+                    path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                    ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                )
+            except Exception as e:
+                logger.warning(f"LLMキャッシュを作成できませんでした（キャッシュなしで続行します）: {e}")
+                return None
+    return _cache
@@ -0,0 +1,314 @@
+"""
+先読みサービス
+AIレビューの完了を待たずに、分隊が使う検索をバックグラウンドで先に始めておく。
+
+- 面談メモの読み込み時: メモのEmbedding
+- AIレビューの完了時: 技術タグに依存する検索（社内データ検索、重要タグの選定 → 市場トレンド・特許・arXiv）
+
+結果は完了（または最後の利用）から短時間だけ保持し、分隊（services/squad.py）と保存処理が同じ入力のときに再利用する。
+先読みが失敗・期限切れの場合、利用側はこれまで通りその場で計算する。
+検索が失敗して空・「見つからない」の結果になった先読みも失敗として扱い、保持しない
+（一時的な障害の結果を、分隊の入力として使い回さないため）
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+KIND_EMBEDDING = "embedding"
+KIND_INTERNAL_SEARCH = "internal_search"
+KIND_SELECTED_TAGS = "selected_tags"
+KIND_MARKET_SOURCES = "market_sources"
+
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_MAX_WORKERS = 4
+MAX_ENTRIES = 128
+# 利用側が実行中の先読みを待つ最大時間（秒）。超えたらその場で計算する
+DEFAULT_WAIT_SECONDS = 60.0
+
+# 分隊と同じ設定で検索する（値が違うとキャッシュが使われない）
+INTERNAL_TOP_K = 3
+MARKET_MAX_TAGS = 5
+
+
+class DegradedResultError(Exception):
+    """先読みした検索の結果が空・不完全だった（保持せず、利用側でその場で計算し直す）"""
+
+
+def text_key(text: str) -> str:
+    """長いテキスト（面談メモ）をキャッシュのキーにするためのハッシュ"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PrefetchCache:
+    """
+    先読みの Future を (種類, キー) ごとに保持する期限付きキャッシュ（スレッドセーフ）
+
+    期限は完了または最後の利用から数える（実行中の先読みは期限切れにしない）。
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        # (種類, キー) → (完了または最後に利用した時刻, Future)
+        self._entries: Dict[Tuple[str, Tuple], Tuple[float, Future]] = {}
+
+    def submit(self, kind: str, key: Tuple, fn: Callable, *args, **kwargs) -> Future:
+        """
+        先読みを開始する（同じ種類・キーの有効な先読みがあれば、それを返す）
+
+        Args:
+            kind: 先読みの種類（KIND_*）
+            key: 入力を表すキー
+            fn: バックグラウンドで実行する関数
+
+        Returns:
+            Future: 先読みの結果
+        """
+        with self._lock:
+            self._purge_expired()
+            entry = self._entries.get((kind, key))
+            if entry is not None:
+                self._touch_locked((kind, key), entry[1])
+                return entry[1]
+            future = self._executor.submit(fn, *args, **kwargs)
+            self._entries[(kind, key)] = (time.monotonic(), future)
+            while len(self._entries) > MAX_ENTRIES:
+                # 最も長く使われていないものから捨てる（dictは利用順に並べ直している）
+                self._entries.pop(next(iter(self._entries)))
+        # 完了した時刻から期限を数える（完了済みならこの場で呼ばれるため、ロックの外で登録する）
+        future.add_done_callback(lambda done: self._touch((kind, key), done))
+        return future
+
+    def get(self, kind: str, key: Tuple, timeout: float = DEFAULT_WAIT_SECONDS) -> Optional[Any]:
+        """
+        先読みの結果を取得する（実行中なら完了を待つ）
+
+        Returns:
+            先読みの結果。先読みしていない・失敗した・待ちきれない場合は None
+        """
+        with self._lock:
+            self._purge_expired()
+            entry = self._entries.get((kind, key))
+        if entry is None:
+            return None
+        try:
+            result = entry[1].result(timeout=timeout)
+        except FuturesTimeoutError:
+            logger.warning(f"先読み（{kind}）が{timeout}秒以内に完了しなかったため、再計算します")
+            return None
+        except Exception as e:
+            logger.warning(f"先読み（{kind}）が失敗したため、再計算します: {e}")
+            return None
+        self._touch((kind, key), entry[1])
+        logger.info(f"先読みの結果を使用しました: {kind}")
+        return result
+
+    def clear(self) -> None:
+        """すべての先読みを破棄する（実行中のものは結果を使わない）"""
+        with self._lock:
+            self._entries.clear()
+
+    def _touch(self, entry_key: Tuple[str, Tuple], future: Future) -> None:
+        """先読みの期限を延ばす（完了時・利用時）"""
+        with self._lock:
+            self._touch_locked(entry_key, future)
+
+    def _touch_locked(self, entry_key: Tuple[str, Tuple], future: Future) -> None:
+        """先読みの期限を延ばす（ロック取得済みで呼ぶ。破棄・再投入された先読みは対象外）"""
+        entry = self._entries.get(entry_key)
+        if entry is not None and entry[1] is future:
+            # 末尾に移して、容量超過時に捨てる順序も利用順にする
+            del self._entries[entry_key]
+            self._entries[entry_key] = (time.monotonic(), future)
+
+    def _purge_expired(self) -> None:
+        """期限切れの先読みを削除する（ロック取得済みで呼ぶ）"""
+        now = time.monotonic()
+        expired = [
+            k for k, (used, future) in self._entries.items()
+            if future.done() and now - used > self.ttl_seconds
+        ]
+        for k in expired:
+            del self._entries[k]
+
+
+_cache: Optional[PrefetchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_prefetch_cache() -> PrefetchCache:
+    """
+    共有の先読みキャッシュを取得する
+
+    環境変数:
+        PREFETCH_TTL_SECONDS: 先読みの結果を完了・最後の利用から保持する時間（デフォルト: 600秒）
+        PREFETCH_WORKERS: 先読みに使うスレッド数（デフォルト: 4）
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PrefetchCache(
+                ttl_seconds=float(os.getenv("PREFETCH_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+                max_workers=int(os.getenv("PREFETCH_WORKERS", DEFAULT_MAX_WORKERS)),
+            )
+        return _cache
+
+
+def _tags_key(tags: List[str]) -> Tuple[str, ...]:
+    return tuple(tags)
+
+
+def internal_search_tags(tech_tags: List[str], priority_tags: Optional[List[str]] = None) -> List[str]:
+    """社内データ検索の語句検索に使うタグ（重要タグを先に並べ、重複を除く）"""
+    tags = []
+    for tag in [*(priority_tags or []), *tech_tags]:
+        if tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def _submit_embedding(cache: PrefetchCache, interview_memo: str) -> Future:
+    """面談メモのEmbeddingの先読みを開始する（同じメモなら実行中・完了済みのものを返す）"""
+    import backend
+
+    def embed():
+        # 同じ内容が登録済みのメモは保存時に重複として扱われるため、Embedding APIは呼ばずに保存済みのベクトルを使う
+        try:
+            existing = backend.find_document_by_hash(backend.content_hash(interview_memo))
+        except Exception as e:
+            logger.warning(f"登録済みの面談メモを確認できませんでした: {e}")
+            existing = None
+        if existing and existing.get("embedding"):
+            return existing["embedding"]
+        return backend.embed_text(interview_memo)
+
+    return cache.submit(KIND_EMBEDDING, (text_key(interview_memo),), embed)
+
+
+def start_memo_prefetch(interview_memo: str, department: str) -> None:
+    """
+    面談メモの読み込み時に、Embeddingを先に計算する
+
+    社内データ検索は語句検索に技術タグを使うため、AIレビューの完了時（start_tag_prefetch）に始める。
+    先読みは投機的な処理のため、失敗しても例外は出さずにログだけ残す。
+
+    Args:
+        interview_memo: 面談メモ
+        department: 選択中の事業部
+    """
+    if not interview_memo.strip():
+        return
+    try:
+        _submit_embedding(get_prefetch_cache(), interview_memo)
+    except Exception as e:
+        logger.warning(f"面談メモの先読みを開始できませんでした: {e}")
+
+
+def _gather_complete_market_sources(selected_tags: List[str], interview_memo: str) -> Tuple[str, str, List[Dict]]:
+    """市場トレンド・特許・arXivを検索する（いずれかの情報源が失敗・期限切れなら DegradedResultError）"""
+    from services.squad import gather_market_sources, is_degraded_market_sources
+
+    sources = gather_market_sources(selected_tags, interview_memo)
+    if is_degraded_market_sources(sources):
+        raise DegradedResultError("市場・特許・arXivの検索結果が不完全でした")
+    return sources
+
+
+def start_tag_prefetch(
+    tech_tags: List[str],
+    interview_memo: str,
+    model_name: str,
+    priority_tags: Optional[List[str]] = None,
+    department: Optional[str] = None,
+) -> None:
+    """
+    AIレビューの完了時に、技術タグに依存する検索（社内データ検索、重要タグの選定 → 市場・特許・arXiv）を先に始める
+
+    先読みは投機的な処理のため、失敗しても例外は出さずにログだけ残す。
+
+    Args:
+        tech_tags: AIレビューで抽出された技術タグ（分隊に渡すものと同じリスト）
+        interview_memo: 面談メモ
+        model_name: 使用するAIモデル名（重要タグの選定に使う）
+        priority_tags: AIレビューで選んだ重要タグ（あれば選定せず、すぐに検索を始める）
+        department: 選択中の事業部（指定時は社内データ検索も始める。この事業部以外を探す）
+    """
+    try:
+        import backend
+        from services.ai_review import select_important_tags
+
+        cache = get_prefetch_cache()
+        memo = text_key(interview_memo)
+        if department and interview_memo.strip():
+            # 面談メモの読み込み時に始めたEmbeddingの先読みを使う（先に投入されるため、待ってもデッドロックしない）
+            embedding_future = _submit_embedding(cache, interview_memo)
+            lexical_query = backend.build_lexical_query(interview_memo, internal_search_tags(tech_tags, priority_tags))
+
+            def search():
+                hits = backend.search_cross_pollination_hybrid(
+                    interview_memo, department, top_k=INTERNAL_TOP_K,
+                    query_embedding=embedding_future.result(), lexical_query=lexical_query,
+                )
+                # 検索のエラーは空の結果として返るため、空の結果は保持しない
+                if not hits:
+                    raise DegradedResultError("社内データ検索の結果が空でした")
+                return hits
+
+            cache.submit(KIND_INTERNAL_SEARCH, (memo, department, INTERNAL_TOP_K, lexical_query), search)
+
+        if priority_tags:
+            selected_tags = priority_tags[:MARKET_MAX_TAGS]
+            cache.submit(
+                KIND_MARKET_SOURCES, (_tags_key(selected_tags), memo),
+                _gather_complete_market_sources, selected_tags, interview_memo,
+            )
+            return
+
+        def select_and_search():
+            selected_tags = select_important_tags(
+                tech_tags, interview_memo=interview_memo, max_tags=MARKET_MAX_TAGS, model_name=model_name
+            )
+            # 重要タグが決まった時点で、検索を別スレッドで始める
+            cache.submit(
+                KIND_MARKET_SOURCES, (_tags_key(selected_tags), memo),
+                _gather_complete_market_sources, selected_tags, interview_memo,
+            )
+            return selected_tags
+
+        cache.submit(KIND_SELECTED_TAGS, (_tags_key(tech_tags), memo, MARKET_MAX_TAGS, model_name), select_and_search)
+    except Exception as e:
+        logger.warning(f"技術タグの先読みを開始できませんでした: {e}")
+
+
+def prefetched_embedding(interview_memo: str) -> Optional[List[float]]:
+    """先読みした面談メモのEmbedding（なければNone）"""
+    return get_prefetch_cache().get(KIND_EMBEDDING, (text_key(interview_memo),))
+
+
+def prefetched_internal_hits(
+    interview_memo: str, department: str, top_k: int, lexical_query: str
+) -> Optional[List[Dict]]:
+    """先読みした社内データ検索の結果（なければNone）"""
+    return get_prefetch_cache().get(KIND_INTERNAL_SEARCH, (text_key(interview_memo), department, top_k, lexical_query))
+
+
+def prefetched_selected_tags(
+    tech_tags: List[str], interview_memo: str, max_tags: int, model_name: str
+) -> Optional[List[str]]:
+    """先読みした重要タグ（なければNone）"""
+    return get_prefetch_cache().get(
+        KIND_SELECTED_TAGS, (_tags_key(tech_tags), text_key(interview_memo), max_tags, model_name)
+    )
+
+
+def prefetched_market_sources(selected_tags: List[str], interview_memo: str) -> Optional[Tuple[str, str, List[Dict]]]:
+    """先読みした市場トレンド・特許・arXivの検索結果（なければNone）"""
+    return get_prefetch_cache().get(KIND_MARKET_SOURCES, (_tags_key(selected_tags), text_key(interview_memo)))
@@ -4,7 +4,7 @@
 """
 
 # from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
+from services.llm import get_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from typing import List, Dict
 import os
@@ -94,20 +94,8 @@ def generate_idea_report(
         str: Markdown形式のレポート
     """
 
-    # Gemini 用チェック
-    if ChatGoogleGenerativeAI is None:
-        raise ImportError("Gemini を使うには langchain-google-genai のインストールが必要です")
-
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY が設定されていません")
-
-    # LLMを初期化
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0.7,
-        google_api_key=api_key,
-    )
+    # LLMを取得（共有クライアント。未インストール・APIキー未設定時は例外）
+    llm = get_chat_model(model_name="gemini-2.5-flash", temperature=0.7)
     
     # 他事業部の知見をフォーマット
     cross_link_text = format_cross_pollination_results(cross_pollination_results)
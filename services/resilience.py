@@ -0,0 +1,294 @@
+"""
+LLM呼び出しの耐障害性サービス
+429/503・タイムアウトをジッター付き指数バックオフで再試行し、モデルごとのサーキットブレーカーと
+軽量モデルへのフォールバックで、一時的な混雑で分隊全体が止まらないようにする
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # ランタイム環境によっては import できない場合がある
+    google_exceptions = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 20.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+# 例外の型で判定できない場合（langchain側でラップされた例外など）に使うメッセージの目印
+_RETRYABLE_MARKERS = (
+    "429", "503", "504", "resource_exhausted", "resource exhausted", "unavailable",
+    "overloaded", "rate limit", "deadline", "timed out", "timeout",
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """サーキットブレーカーが開いているため、呼び出しを行わなかった"""
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    再試行で回復する見込みのあるエラーかどうかを判定する
+
+    Args:
+        error: 発生した例外
+
+    Returns:
+        bool: 429（レート制限）・503（混雑）・タイムアウトならTrue
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if google_exceptions is not None and isinstance(error, (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.GatewayTimeout,
+    )):
+        return True
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in _RETRYABLE_MARKERS)
+
+
+def backoff_delay(attempt: int, base_delay: float = DEFAULT_BASE_DELAY, max_delay: float = DEFAULT_MAX_DELAY) -> float:
+    """
+    再試行までの待ち時間（フルジッター付き指数バックオフ）
+
+    複数のワーカーが同時に失敗しても、再試行のタイミングが揃わないようにする。
+
+    Args:
+        attempt: 何回目の再試行か（0始まり）
+
+    Returns:
+        float: 待ち時間（秒）
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    モデルごとのサーキットブレーカー
+
+    連続で failure_threshold 回失敗すると開き、reset_timeout 秒の間は呼び出しを即座に拒否する。
+    その後は1回だけ試行を許可し（半開）、成功すれば閉じ、失敗すれば再び開く。
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        """"closed" / "open" / "half_open" """
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        """呼び出してよいか（半開状態では同時に1件だけ許可する）"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        """成功を記録する（ブレーカーを閉じる）"""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """再試行可能なエラーでの失敗を記録する"""
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(model_name: str) -> CircuitBreaker:
+    """モデル名ごとに共有のサーキットブレーカーを取得する"""
+    with _breakers_lock:
+        breaker = _breakers.get(model_name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", DEFAULT_FAILURE_THRESHOLD)),
+                reset_timeout=float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", DEFAULT_RESET_TIMEOUT)),
+            )
+            _breakers[model_name] = breaker
+        return breaker
+
+
+def reset_circuit_breakers() -> None:
+    """すべてのサーキットブレーカーを破棄する（テスト用）"""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+class ResilientChatModel:
+    """
+    チャットモデルの invoke / stream に再試行・サーキットブレーカー・フォールバックを付けるラッパー
+
+    with_structured_output / bind / bind_tools で作ったRunnableも同じラッパーで包み、
+    それ以外の属性は元のモデルにそのまま委譲する。
+    """
+
+    def __init__(
+        self,
+        llm,
+        model_name: str,
+        fallback: Optional[Callable[[], object]] = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        breaker: Optional[CircuitBreaker] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            llm: 元のチャットモデル（invoke / stream を持つもの）
+            model_name: モデル名（サーキットブレーカーとログに使う）
+            fallback: 再試行しても失敗した場合に使うモデルを返す関数（Noneでフォールバックしない）
+            max_attempts: 1モデルあたりの最大試行回数
+            breaker: サーキットブレーカー（省略時はモデル名ごとの共有ブレーカー）
+            sleep: 待機関数（テストで差し替える）
+        """
+        self.llm = llm
+        self.model_name = model_name
+        self.fallback = fallback
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or get_circuit_breaker(model_name)
+        self._sleep = sleep
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    def _derive(self, method: str, *args, **kwargs) -> "ResilientChatModel":
+        """
+        元のモデルから派生したRunnableを、再試行・フォールバック付きで返す
+
+        フォールバック先でも同じ引数で派生させ、サーキットブレーカーは元のモデルと共有する。
+        """
+        fallback = None
+        if self.fallback is not None:
+            parent_fallback = self.fallback
+
+            def fallback():
+                return getattr(parent_fallback(), method)(*args, **kwargs)
+        return type(self)(
+            getattr(self.llm, method)(*args, **kwargs),
+            model_name=self.model_name,
+            fallback=fallback,
+            max_attempts=self.max_attempts,
+            base_delay=self.base_delay,
+            max_delay=self.max_delay,
+            breaker=self.breaker,
+            sleep=self._sleep,
+        )
+
+    def with_structured_output(self, *args, **kwargs):
+        """再試行・フォールバック付きの構造化出力"""
+        return self._derive("with_structured_output", *args, **kwargs)
+
+    def bind(self, **kwargs):
+        """再試行・フォールバック付きで引数を束縛する"""
+        return self._derive("bind", **kwargs)
+
+    def bind_tools(self, *args, **kwargs):
+        """再試行・フォールバック付きでツールを束縛する"""
+        return self._derive("bind_tools", *args, **kwargs)
+
+    def _call_with_retry(self, call: Callable[[], object]):
+        """再試行とサーキットブレーカーを適用して call を実行する"""
+        for attempt in range(self.max_attempts):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.model_name} は混雑のため一時的に呼び出しを停止しています")
+            try:
+                result = call()
+            except Exception as e:
+                if not is_retryable_error(e):
+                    # 入力エラーなどはモデル自体は応答しているため、ブレーカー上は成功として扱う
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                logger.warning(f"{self.model_name} の呼び出しに失敗しました（{attempt + 1}/{self.max_attempts}回目、{delay:.1f}秒後に再試行）: {e}")
+                self._sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def _fallback_model(self, error: Exception):
+        """フォールバック先のモデルを返す（使えない場合は元の例外を送出）"""
+        if self.fallback is None or not (isinstance(error, CircuitOpenError) or is_retryable_error(error)):
+            raise error
+        logger.warning(f"{self.model_name} が応答しないため、フォールバックモデルで続行します: {error}")
+        return self.fallback()
+
+    def invoke(self, input, config=None, **kwargs):
+        """再試行・フォールバック付きの invoke"""
+        try:
+            return self._call_with_retry(lambda: self.llm.invoke(input, config, **kwargs))
+        except Exception as e:
+            return self._fallback_model(e).invoke(input, config, **kwargs)
+
+    def stream(self, input, config=None, **kwargs) -> Iterator:
+        """
+        再試行・フォールバック付きの stream
+
+        最初のチャンクを受け取るまでの失敗だけを再試行する
+        （表示済みの出力が重複しないよう、途中で切れた場合はそのまま例外を送出する）。
+        """
+        def start():
+            iterator = iter(self.llm.stream(input, config, **kwargs))
+            try:
+                first = next(iterator)
+            except StopIteration:
+                return iterator, []
+            return iterator, [first]
+
+        try:
+            iterator, head = self._call_with_retry(start)
+        except Exception as e:
+            yield from self._fallback_model(e).stream(input, config, **kwargs)
+            return
+        yield from head
+        yield from iterator
@@ -10,7 +10,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
 
-from langchain_google_genai import ChatGoogleGenerativeAI
+from services.llm import get_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
@@ -98,12 +98,10 @@ def create_slide_report(
     basename = f"slide-{company_name or 'report'}-{timestamp}.html"
     output_path = Path(output_dir) / basename
 
-    # LLMの初期化 (Gemini 2.5 Pro)
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-pro",
-        # model="gemini-2.5-flash-lite",
+    # LLMの取得 (Gemini 2.5 Pro、共有クライアント)
+    llm = get_chat_model(
+        model_name="gemini-2.5-pro",
         temperature=0.9,
-        google_api_key=os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY"),
         convert_system_message_to_human=True # System prompt support varies
     )
 
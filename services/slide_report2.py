@@ -12,7 +12,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
 
-from langchain_google_genai import ChatGoogleGenerativeAI
+from services.llm import get_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
@@ -134,11 +134,9 @@ def create_slide_report_v2(
     basename = f"slide-{safe_name}-{timestamp}.html"
     output_path = Path(output_dir) / basename
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-pro",
-        # model="gemini-2.5-flash",
+    llm = get_chat_model(
+        model_name="gemini-2.5-pro",
         temperature=temperature,
-        google_api_key=os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY"),
     )
 
     prompt = ChatPromptTemplate.from_messages(
@@ -0,0 +1,625 @@
+"""イノベーション分隊（5エージェント）の議論フロー本体（UI非依存）。
+
+iter_innovation_squad は議論の進行を型付きイベント（AgentStarted / TokenDelta /
+AgentFinished / Progress / SquadResult）として順に返すジェネレータ。
+Streamlitの描画は services/multi_agent.py がイベントを購読して行うため、
+バッチ処理・バックグラウンド実行・ベンチマークからもそのまま呼び出せる。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import AsyncIterator, Callable, Dict, Generator, Iterator, List, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+import backend
+from services.patents import search_patents
+from services.academic import search_arxiv, format_arxiv_results
+from services.ai_review import select_important_tags
+from services.llm import get_chat_model
+from services import prefetch
+
+from services.report_generator import REPORT_SYSTEM_PROMPT, REPORT_HUMAN_PROMPT
+# イベント型は services/squad_events.py に定義（ここから再エクスポート）
+from services.squad_events import (  # noqa: F401
+    ORCHESTRATOR,
+    MARKET_RESEARCHER,
+    INTERNAL_SPECIALIST,
+    SOLUTION_ARCHITECT,
+    DEVILS_ADVOCATE,
+    AgentStarted,
+    TokenDelta,
+    AgentFinished,
+    Progress,
+    SquadResult,
+    SquadEvent,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# 市場規模・トレンド・競合のフォールバック情報（検索結果が不十分な場合に使用）
+FALLBACK_MARKET_INFO = """## 市場規模（Market Size）
+
+EV用熱管理システム市場は2024–2030年にCAGR 20%以上で成長
+→ EV普及に伴い、バッテリー熱管理の重要性が高まり、市場全体が急拡大。
+
+部材単価が高く、高付加価値市場
+
+放熱樹脂は通常のエンプラの 3〜5倍（1,500〜2,500円/kg） の価格帯。
+
+一般的な自動車メーカーの事例では：
+
+年間20万台 × 1台12個 = 240万個/年
+
+1個200gと仮定 → 年間約480トンのコンパウンド需要
+→ OEM 1社だけでも数百トン規模の需要が生まれる、成長余地の大きい領域。
+
+## トレンド（Market Trends）
+
+金属から樹脂への置換が急加速
+
+バッテリーハウジング・モジュールカバーにおいて、
+
+軽量化（比重：アルミ2.7 → 樹脂1.6〜1.8）
+
+コスト削減（後加工レス、成形性向上）
+を目的に、アルミ → 放熱樹脂への転換 が進む。
+
+EV高電圧化に伴う材料要求の高度化
+
+耐電圧、熱伝導率、難燃性、耐熱性など、仕様が急速に高レベル化。
+
+これにより、PPS・PPA・高機能PBTなどの高性能樹脂が採用拡大中。
+
+環境・サステナビリティ対応の強化
+
+欧州 OEM を中心に バイオマス、リサイクル材、LCA対応 への要求が増加。
+
+樹脂材料メーカー側も「バイオマスPPA」「低CO₂排出材料」を強化する傾向。
+
+## 競合（Competitive Landscape）
+
+東レ（Toray）
+
+強み：PPSのグローバルトップメーカー。重合〜コンパウンドまで垂直統合。
+
+実績：「トレリナ」で高放熱グレード、高CTIグレードを既に展開。
+
+脅威：供給力・価格競争力ともに強く、最重要ベンチマーク。
+
+ポリプラスチックス（Polyplastics）
+
+強み：PBT・PPSに強く、自動車用途で高いシェア。
+
+特徴：金属インサート成形・接合技術（AKIT）に優れる。
+
+動向：バスバー周辺向けに耐ヒートショック性向上グレードを展開。
+
+ソルベイ（Solvay）
+
+強み：グローバルトップクラスの高機能PPA（アモデル）とPPS（ライトン）を保有。
+
+差別化：超高電圧や極限環境向けの高機能材料が豊富。
+
+実績：欧州OEMの採用例が多く、プレミアム領域に強い。
+
+DSM（Envalior）
+
+強み：PA46やPPA（ForTii）に加え、バイオマス対応（EcoPaXX） を積極展開。
+
+特徴：サステナビリティの要求が強いOEMへの相性が高い。
+
+脅威：バイオマス要求が強い顧客に対して、競合として特に強い。
+"""
+
+
+# 市場調査の情報源ごとのタイムアウト（秒、3つを同時に開始した時点から計測）
+# 期限を過ぎた情報源は「見つからない」扱いにして、要約のLLM呼び出しを先に進める
+MARKET_SOURCE_TIMEOUTS = {
+    "market": 20.0,
+    "patents": 20.0,
+    "arxiv": 30.0,  # arXivはクライアント側でリトライするため長め
+}
+MARKET_SOURCE_NOT_FOUND = {
+    "market": "市場情報が見つかりませんでした。",
+    "patents": "特許情報は見つかりませんでした。",
+    "arxiv": [],
+}
+# 情報源の検索自体が失敗したときの値（backend.search_market_trends / search_patents が返す）
+MARKET_SOURCE_FAILED_PREFIXES = {
+    "market": "市場調査結果を取得できませんでした",
+    "patents": "特許検索エラー",
+}
+
+
+def is_degraded_market_sources(sources: tuple[str, str, List[Dict]]) -> bool:
+    """
+    gather_market_sources の結果に、見つからない・期限切れ・失敗の情報源が含まれるか
+
+    一時的な失敗の結果を先読み（services/prefetch.py）に保持して分隊に渡さないための判定。
+    """
+
+    market, patents, arxiv_results = sources
+    for name, output in (("market", market), ("patents", patents), ("arxiv", arxiv_results)):
+        if output == MARKET_SOURCE_NOT_FOUND[name]:
+            return True
+        prefix = MARKET_SOURCE_FAILED_PREFIXES.get(name)
+        if prefix and isinstance(output, str) and output.startswith(prefix):
+            return True
+    return False
+
+
+def get_llm(
+    temperature: float = 0.3,
+    streaming: bool = False,
+    model_name: str = "gemini-2.5-flash-lite",
+    cache: Optional[bool] = None,
+):
+    """LLMを返すファクトリ。同じ設定のGeminiクライアントはプロセス内で共有する。
+
+    cache=False で応答キャッシュを使わない（発想・批判などの創造的なステージ用）。
+    """
+
+    return get_chat_model(model_name=model_name, temperature=temperature, streaming=streaming, cache=cache)
+
+
+def generate_orchestrator_brief(interview_memo: str, model_name: str = "gemini-2.5-flash-lite") -> str:
+    """👑司会用の短いブリーフを生成する。"""
+
+    llm = get_llm(temperature=0.5, model_name=model_name)
+    prompt = (
+        "あなたはオーケストレーターです。以下の面談メモを読み、1段落で司会用ブリーフを作成してください。"
+        "回答は必ず日本語で記載してください。"
+        "含める要素: 主課題/要求スペック、競合・材料の候補、主要リスク、納期があれば明示、各エージェントへの指示"
+        " (Market=事実調査, Internal=社内知見, Architect=発想, Devil=リスク確認)。"
+        f"\n\n面談メモ:\n{interview_memo}"
+    )
+    response = llm.invoke([HumanMessage(content=prompt)])
+    return response.content.strip()
+
+
+
+def gather_market_sources(selected_tags: List[str], use_case: str = "") -> tuple[str, str, List[Dict]]:
+    """市場トレンド・特許・arXivを並行して検索する。
+
+    情報源ごとに MARKET_SOURCE_TIMEOUTS の期限を設け、期限切れやエラーの情報源は
+    MARKET_SOURCE_NOT_FOUND の値に置き換える（遅い情報源が他を待たせない）。
+
+    Returns:
+        tuple[str, str, List[Dict]]: (市場検索結果, 特許検索結果, 学術論文情報のリスト)
+    """
+
+    executor = ThreadPoolExecutor(max_workers=3)
+    futures = {
+        "market": executor.submit(backend.search_market_trends, selected_tags, use_case),
+        "patents": executor.submit(search_patents, selected_tags),
+        "arxiv": executor.submit(search_arxiv, " ".join(selected_tags)),
+    }
+    started = time.monotonic()
+    outputs = {}
+    for name, future in futures.items():
+        remaining = max(0.0, MARKET_SOURCE_TIMEOUTS[name] - (time.monotonic() - started))
+        try:
+            outputs[name] = future.result(timeout=remaining)
+        except FuturesTimeoutError:
+            logger.warning(f"{name} の検索が{MARKET_SOURCE_TIMEOUTS[name]}秒以内に完了しなかったため、結果なしとして続行します")
+            outputs[name] = MARKET_SOURCE_NOT_FOUND[name]
+        except Exception as e:
+            logger.error(f"{name} の検索でエラーが発生しました: {e}", exc_info=True)
+            outputs[name] = MARKET_SOURCE_NOT_FOUND[name]
+    # 期限切れのスレッドの終了は待たない
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    return outputs["market"], outputs["patents"], outputs["arxiv"]
+
+
+def research_market(
+    tech_tags: List[str],
+    use_case: str = "",
+    model_name: str = "gemini-2.5-flash-lite",
+    priority_tags: Optional[List[str]] = None,
+) -> tuple[str, List[Dict]]:
+    """🕵️市場調査エージェントの処理本体（UI描画なし。別スレッドから呼び出せる）。
+
+    priority_tags（AIレビューで選んだ重要タグ）があれば、重要タグの選定でLLMを呼ばない。
+    
+    Returns:
+        tuple[str, List[Dict]]: (市場調査サマリー, 学術論文情報のリスト)
+    """
+
+    # 重要度の高いタグを選定（最大5つ）。AIレビューの結果か、先読みした結果があればそれを使う
+    max_tags = prefetch.MARKET_MAX_TAGS
+    selected_tags = priority_tags[:max_tags] if priority_tags else None
+    if selected_tags is None:
+        selected_tags = prefetch.prefetched_selected_tags(tech_tags, use_case, max_tags, model_name)
+    if selected_tags is None:
+        selected_tags = select_important_tags(tech_tags, interview_memo=use_case, max_tags=max_tags, model_name=model_name)
+    
+    # 選定されたタグで検索を実行（市場・特許・arXivを並行実行）
+    sources = prefetch.prefetched_market_sources(selected_tags, use_case)
+    if sources is None:
+        sources = gather_market_sources(selected_tags, use_case)
+    results, patents, academics_list = sources
+    results = results or ""
+    patents = patents or ""
+    academics = format_arxiv_results(academics_list) if academics_list else ""
+    
+    # 検索結果が空または不十分な場合の判定
+    # 市場情報が見つからない、または市場規模・トレンド・競合の情報が不十分な場合
+    market_info_insufficient = (
+        not results.strip() or 
+        "市場情報が見つかりませんでした" in results or 
+        "市場調査結果を取得できませんでした" in results
+    )
+    
+    # 検索結果が空の場合、フォールバック情報を使用
+    if not any([results.strip(), patents, academics]) or market_info_insufficient:
+        # フォールバック情報を使用して市場調査サマリーを生成
+        prompt = (
+            "You are a Market Researcher. Summarize the following fallback market information "
+            "into facts only (Competitors, Market Size, Trends, Patents, Academic papers). "
+            "Respond in Japanese only.\n"
+            "各セクションは必ず見出し行から始めてください: '## 競合他社', '## 市場規模', '## トレンド', '## 特許', '## 学術論文'.\n"
+            "1セクションは箇条書きで簡潔にまとめてください。\n\n"
+            "Fallback Market Information:\n{fallback_info}\n\n"
+            "Patents: {patents}\n\n"
+            "Academic: {academics}\n\n"
+            "注意: 検索結果が不十分なため、フォールバック情報を優先的に使用してください。"
+        ).format(
+            fallback_info=FALLBACK_MARKET_INFO,
+            patents=patents if patents else "特許情報は見つかりませんでした。",
+            academics=academics if academics else "学術論文情報は見つかりませんでした。"
+        )
+        llm = get_llm(temperature=0.3, model_name=model_name)
+        response = llm.invoke([HumanMessage(content=prompt)])
+        summary = response.content.strip()
+    else:
+        # 検索結果がある場合、通常の処理を実行
+        # ただし、市場規模・トレンド・競合の情報が不十分な場合はフォールバック情報も併用
+        prompt = (
+            "You are a Market Researcher. Summarize the following search results into facts only "
+            "(Competitors, Market Size, Trends, Patents, Academic papers). No speculation. "
+            "Respond in Japanese only.\n"
+            "各セクションは必ず見出し行から始めてください: '## 競合他社', '## 市場規模', '## トレンド', '## 特許', '## 学術論文'.\n"
+            "1セクションは箇条書きで簡潔にまとめてください。\n\n"
+            "Market Search Results: {results}\n\n"
+            "Fallback Market Information (検索結果が不十分な場合に使用):\n{fallback_info}\n\n"
+            "Patents: {patents}\n\n"
+            "Academic: {academics}\n\n"
+            "注意: 検索結果に市場規模・トレンド・競合の情報が不十分な場合は、"
+            "フォールバック情報を優先的に使用してください。"
+        ).format(
+            results=results,
+            fallback_info=FALLBACK_MARKET_INFO,
+            patents=patents,
+            academics=academics
+        )
+        llm = get_llm(temperature=0.3, model_name=model_name)
+        response = llm.invoke([HumanMessage(content=prompt)])
+        summary = response.content.strip()
+    
+    return summary, academics_list
+
+
+def search_internal_knowledge(
+    query_text: str,
+    department: str,
+    query_embedding: Optional[List[float]] = None,
+    tags: Optional[List[str]] = None,
+) -> tuple[str, List[dict]]:
+    """🔍社内データ検索エージェントの処理本体（UI描画なし。別スレッドから呼び出せる）。
+
+    語句検索には面談メモ全体ではなく、技術タグ（tags）とメモ中の品番・規格値だけを使う。
+    """
+
+    lexical_query = backend.build_lexical_query(query_text, tags)
+    # AIレビューの完了時に先読みしていればその結果を使う
+    hits = prefetch.prefetched_internal_hits(query_text, department, prefetch.INTERNAL_TOP_K, lexical_query)
+    if hits is None:
+        hits = backend.search_cross_pollination_hybrid(
+            query_text, department, top_k=prefetch.INTERNAL_TOP_K, query_embedding=query_embedding,
+            lexical_query=lexical_query,
+        ) or []
+    if not hits:
+        return "関連する社内データが見つかりませんでした。", []
+
+    bullet_lines = []
+    for item in hits:
+        metadata = item.get("metadata", {}) if isinstance(item, dict) else {}
+        company = metadata.get("company") or metadata.get("client") or "Unknown Company"
+        dept = metadata.get("department") or "Unknown Dept"
+        # content は検索で最も近かったパッセージ（長さはDB側の snippet_length で制限済み）
+        content = item.get("content", "") if isinstance(item, dict) else ""
+        bullet_lines.append(f"- {company} ({dept}): {content}".strip())
+
+    return "\n".join(bullet_lines), hits
+
+
+def _say(agent: str, content: str) -> Iterator[SquadEvent]:
+    """ストリーミングしない発言のイベントを返す。"""
+
+    yield AgentStarted(agent)
+    yield AgentFinished(agent, content)
+
+
+def _stream_agent(agent: str, llm, messages: List) -> Generator[SquadEvent, None, str]:
+    """LLM出力をトークン差分イベントとして返し、確定した全文を戻り値にする。"""
+
+    yield AgentStarted(agent, streaming=True)
+    parts = []
+    for chunk in llm.stream(messages):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield TokenDelta(agent, chunk.content)
+    content = "".join(parts)
+    yield AgentFinished(agent, content)
+    return content
+
+
+def solution_architect_events(
+    market_data: str,
+    internal_data: str,
+    interview_memo: str,
+    feedback: Optional[str] = None,
+    model_name: str = "gemini-2.5-flash-lite",
+) -> Generator[SquadEvent, None, str]:
+    """💡ソリューションアーキテクトエージェント。市場データと社内データを統合して提案を作成。
+
+    `proposal = yield from solution_architect_events(...)` で提案の全文を受け取れる。
+    """
+
+    llm = get_llm(temperature=0.9, streaming=True, model_name=model_name, cache=False)
+
+    intro = ""
+    if feedback:
+        intro = "I will refine the plan based on the feedback and ensure the issues are addressed.\n\n"
+        # 日本語訳:
+        # 「フィードバックがある場合は、それに応じて提案を修正すること。」
+
+    prompt = (
+        "You are a Genius Solution Architect in a chemical company. Combine the following "
+        "\"Internal Data\" and \"Market Facts\" to solve the \"Customer Dilemma\" described in the Interview Memo.\n\n"
+        "Constraints:\n"
+        "Do NOT just propose existing products. Create a \"Chemical Reaction\" (new combination).\n"
+        "If feedback is provided, you MUST revise your proposal to address the criticism.\n"
+        "Respond in Japanese only.\n\n"
+        f"Internal Data:\n{internal_data}\n\n"
+        f"Market Facts:\n{market_data}\n\n"
+        f"Interview Memo (Customer Dilemma):\n{interview_memo}\n\n"
+        f"Feedback (if any):\n{feedback or 'None'}\n\n"
+        f"{intro}Respond with a concrete proposal."
+    )
+    # 日本語訳:
+    # 「あなたは化学メーカーの天才ソリューションアーキテクトです。以下の『Internal Data』と『Market Facts』を組み合わせ、
+    # Interview Memo に記載された『Customer Dilemma』を解決する提案を作ってください。既存品の提案だけは避け、
+    # 新しい『Chemical Reaction（組み合わせ）』を作ること。フィードバックがある場合は、それに応じて提案を修正すること。」
+
+    return (yield from _stream_agent(SOLUTION_ARCHITECT, llm, [HumanMessage(content=prompt)]))
+
+
+def devils_advocate_events(proposal: str, model_name: str = "gemini-2.5-flash-lite") -> Generator[SquadEvent, None, str]:
+    """👿悪魔の擁護者エージェント。提案を厳しく批判。
+
+    `critique = yield from devils_advocate_events(...)` で批判の全文を受け取れる。
+    """
+
+    llm = get_llm(temperature=0.5, streaming=True, model_name=model_name, cache=False)
+    prompt = (
+        "You are a Devil's Advocate (Strict Technical Reviewer) inside the proposing company. "
+        "Write as an internal reviewer (use 「当社」「当方」「我々」) and never from the client's perspective "
+        "(avoid 「貴社/御社」「お客様」等). Criticize the following proposal ruthlessly. Focus on:\n\n"
+        "Chemical Risks (Hydrolysis, Heat degradation)\n"
+        "Cost Feasibility\n"
+        "Mass Production Issues\n\n"
+        "Respond in Japanese only, concise bullet style if suitable.\n\n"
+        f"Proposal: {proposal}"
+    )
+    # 日本語訳:
+    # 「あなたは悪魔の擁護者（厳しい技術レビュー）です。以下の提案を厳しく批判してください。焦点は：
+    # 化学リスク（水解、熱劣化）
+    # コスト実現性
+    # 量産問題です。」
+
+    return (yield from _stream_agent(DEVILS_ADVOCATE, llm, [HumanMessage(content=prompt)]))
+
+
+def agent_orchestrator_summary(
+    proposal: str,
+    market_data: str,
+    internal_data: str,
+    interview_memo: str,
+    tech_tags: List[str],
+    company_name: str,
+    model_name: str = "gemini-2.5-flash-lite",
+) -> str:
+    """👑要約エージェント。指定テンプレートに沿って最終レポートを作成。"""
+
+    llm = get_llm(temperature=0.5, model_name=model_name)
+
+    # /services/report_generator.pyのREPORT_SYSTEM_PROMPTを使用
+    system_prompt = REPORT_SYSTEM_PROMPT
+
+    # /services/report_generator.pyのREPORT_HUMAN_PROMPTを使用
+    human_prompt = REPORT_HUMAN_PROMPT.format(
+        company_name=company_name,
+        interview_content=interview_memo,
+        tech_tags="、".join(tech_tags),
+        cross_link_text=internal_data,
+        market_trends=market_data,
+        proposal=proposal
+    )
+
+    messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=human_prompt),
+    ]
+
+    response = llm.invoke(messages)
+    summary = response.content.strip()
+    return summary
+
+
+
+
+def iter_innovation_squad(
+    interview_memo: str,
+    tech_tags: List[str],
+    department: str,
+    company_name: str = "",
+    model_name: str = "gemini-2.5-flash-lite",
+    query_embedding: Optional[List[float]] = None,
+    priority_tags: Optional[List[str]] = None,
+) -> Iterator[SquadEvent]:
+    """イノベーション分隊のフローを実行し、進行をイベントとして順に返す。
+
+    最後のイベントは必ず SquadResult。UIには依存しないため、Streamlitのスクリプト実行外からも呼び出せる。
+
+    Args:
+        query_embedding: 面談メモの計算済みEmbedding（save_interview_noteの戻り値を渡すと再計算しない）
+        priority_tags: AIレビューで選んだ重要タグ（ReviewResult.priority_tags。あれば市場調査で再選定しない）
+    """
+
+    yield Progress(15, "オーケストレーター: チームへのブリーフィングを作成中...")
+
+    brief = generate_orchestrator_brief(interview_memo, model_name=model_name)
+    yield from _say(ORCHESTRATOR, brief or "チーム、開始しましょう。")
+
+    yield Progress(30, "マーケットリサーチャー & 社内スペシャリスト: 情報収集中...")
+
+    # 市場調査（Web/arXiv/LLM）と社内検索（Embedding/Supabase）は互いに独立しているため並行実行する。
+    # 発言は両方の完了後に決まった順序（市場 → 社内）で確定させる。
+    yield AgentStarted(MARKET_RESEARCHER)
+    yield AgentStarted(INTERNAL_SPECIALIST)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        market_future = executor.submit(
+            research_market, tech_tags, use_case=interview_memo, model_name=model_name, priority_tags=priority_tags
+        )
+        internal_future = executor.submit(
+            search_internal_knowledge, interview_memo, department, query_embedding=query_embedding,
+            tags=prefetch.internal_search_tags(tech_tags, priority_tags),
+        )
+        market_data, academic_results = market_future.result()
+        internal_data, internal_hits = internal_future.result()
+    yield AgentFinished(MARKET_RESEARCHER, market_data)
+    yield AgentFinished(INTERNAL_SPECIALIST, internal_data)
+
+    yield Progress(40, "オーケストレーター: 議論の方向性を指示中...")
+
+    yield from _say(ORCHESTRATOR, "材料は揃った。Architect、競合を上回るロジックを組んでくれ。")
+
+    yield Progress(55, "ソリューションアーキテクト: 初期提案を作成中...")
+
+    proposal_v1 = yield from solution_architect_events(market_data, internal_data, interview_memo, model_name=model_name)
+
+    yield Progress(70, "デビルズアドボケイト: リスク分析と批判的レビューを実行中...")
+
+    yield from _say(ORCHESTRATOR, "Devil、この案の弱点を洗い出してくれ。")
+
+    critique = yield from devils_advocate_events(proposal_v1, model_name=model_name)
+
+    yield Progress(80, "オーケストレーター: 改善指示を出しています...")
+
+    yield from _say(ORCHESTRATOR, "Architect、指摘を踏まえて改訂案を出して。")
+
+    yield Progress(90, "ソリューションアーキテクト: 最終提案を練り上げています...")
+
+    proposal_final = yield from solution_architect_events(
+        market_data, internal_data, interview_memo, feedback=critique, model_name=model_name
+    )
+
+    yield from _say(ORCHESTRATOR, "よし、これで行こう！ みんなありがとう。")
+
+    yield Progress(95, "オーケストレーター: 最終レポートを作成中...")
+
+    final_report_md = agent_orchestrator_summary(
+        proposal=proposal_final,
+        market_data=market_data,
+        internal_data=internal_data,
+        interview_memo=interview_memo,
+        tech_tags=tech_tags,
+        company_name=company_name,
+        model_name=model_name,
+    )
+
+    yield Progress(100, "完了！")
+
+    yield SquadResult(
+        report=final_report_md,
+        internal_hits=internal_hits,
+        academic_results=academic_results,
+        market_data=market_data,
+        internal_data=internal_data,
+        proposal=proposal_final,
+    )
+
+
+def iter_registration(text: str, metadata: Dict, **kwargs) -> Iterator[SquadEvent]:
+    """面談メモを保存してから、iter_innovation_squad のイベントを返す（画面の登録処理と同じ流れ）。
+
+    保存時に計算（または先読み）したEmbeddingを社内検索で再利用する。保存に失敗した場合は RuntimeError。
+
+    Args:
+        text: 面談メモ
+        metadata: 保存するメタデータ
+        **kwargs: iter_innovation_squad の引数（interview_memo と query_embedding 以外）
+    """
+
+    yield Progress(5, "データを保存中...")
+    # 面談メモの読み込み時に先読みしたEmbeddingがあれば、Embedding APIを呼ばずに保存する
+    saved_note = backend.save_interview_note(
+        text=text, metadata=metadata, embedding=prefetch.prefetched_embedding(text)
+    )
+    if not saved_note:
+        raise RuntimeError("データの保存に失敗しました")
+    if saved_note.get("duplicate"):
+        yield Progress(8, "同じ面談メモが登録済みのため、既存のデータを使用します")
+
+    yield Progress(10, "チーム結成中...")
+    yield from iter_innovation_squad(interview_memo=text, query_embedding=saved_note.get("embedding"), **kwargs)
+
+
+def run_squad(on_event: Optional[Callable[[SquadEvent], None]] = None, **kwargs) -> SquadResult:
+    """iter_innovation_squad を最後まで実行し、SquadResult を返す（バッチ処理・ベンチマーク用）。
+
+    Args:
+        on_event: 各イベントを受け取るコールバック（ログ出力など）
+        **kwargs: iter_innovation_squad の引数
+    """
+
+    result = None
+    for event in iter_innovation_squad(**kwargs):
+        if on_event:
+            on_event(event)
+        if isinstance(event, SquadResult):
+            result = event
+    return result
+
+
+async def aiter_innovation_squad(**kwargs) -> AsyncIterator[SquadEvent]:
+    """iter_innovation_squad の非同期イテレータ版（ワーカースレッドで実行し、イベントを順に返す）。"""
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    def produce():
+        try:
+            for event in iter_innovation_squad(**kwargs):
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+    threading.Thread(target=produce, name="innovation-squad", daemon=True).start()
+    while True:
+        item = await queue.get()
+        if item is finished:
+            break
+        if isinstance(item, Exception):
+            raise item
+        yield item
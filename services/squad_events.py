@@ -0,0 +1,62 @@
+"""
+分隊イベントの型定義
+iter_innovation_squad が返すイベントとエージェント名。
+ジョブ管理やUIが分隊本体（langchain など重い依存）を読み込まずに参照できるよう分けている
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Union
+
+# エージェント名（イベントの agent フィールドに入る値）
+ORCHESTRATOR = "orchestrator"
+MARKET_RESEARCHER = "market_researcher"
+INTERNAL_SPECIALIST = "internal_specialist"
+SOLUTION_ARCHITECT = "solution_architect"
+DEVILS_ADVOCATE = "devils_advocate"
+
+
+@dataclass(frozen=True)
+class AgentStarted:
+    """エージェントが発言を始めた（streaming=True の場合は続けて TokenDelta が届く）"""
+    agent: str
+    streaming: bool = False
+    type: str = field(default="agent_started", init=False)
+
+
+@dataclass(frozen=True)
+class TokenDelta:
+    """ストリーミング中のエージェント出力の差分"""
+    agent: str
+    text: str
+    type: str = field(default="token_delta", init=False)
+
+
+@dataclass(frozen=True)
+class AgentFinished:
+    """エージェントの発言が確定した"""
+    agent: str
+    content: str
+    type: str = field(default="agent_finished", init=False)
+
+
+@dataclass(frozen=True)
+class Progress:
+    """進捗（0〜100%）"""
+    percent: int
+    message: str
+    type: str = field(default="progress", init=False)
+
+
+@dataclass(frozen=True)
+class SquadResult:
+    """議論の最終結果（最後に1回だけ届く）"""
+    report: str
+    internal_hits: List[dict]
+    academic_results: List[dict]
+    market_data: str = ""
+    internal_data: str = ""
+    proposal: str = ""
+    type: str = field(default="result", init=False)
+
+
+SquadEvent = Union[AgentStarted, TokenDelta, AgentFinished, Progress, SquadResult]
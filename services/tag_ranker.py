@@ -0,0 +1,219 @@
+"""
+技術タグのローカルランキングサービス
+select_important_tags の選定基準（材料名・用途・物性・技術領域を優先し、一般的すぎる語は除く）を
+化学系の用語辞書・面談メモ内の出現回数・一般語のペナルティで点数化し、LLMを呼ばずに上位タグを選ぶ。
+判断が付きにくい（信頼度が低い）場合だけ、呼び出し側がLLMで選定する
+"""
+
+import functools
+import math
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+# 用語の分類ごとの重み（選定基準の優先順）
+WEIGHT_MATERIAL = 3.0
+WEIGHT_PROPERTY = 2.5
+WEIGHT_APPLICATION = 2.0
+WEIGHT_PROCESS = 1.5
+# 2つ目以降の分類に一致した場合の加点（「PPSの熱伝導率」など）
+WEIGHT_EXTRA_CATEGORY = 0.5
+# 数値と単位を含むタグ（「150℃」「2.0W/mK」など）の加点
+WEIGHT_NUMERIC_SPEC = 1.0
+# 面談メモ内の出現回数の重み（log(1 + 回数) に掛ける）
+WEIGHT_MEMO_FREQUENCY = 1.0
+# 一般的すぎる語のペナルティ
+PENALTY_GENERIC = -3.0
+
+# 信頼度がこれ未満ならLLMで選定する（環境変数 TAG_RANKER_MIN_CONFIDENCE）
+DEFAULT_MIN_CONFIDENCE = 0.6
+# 採用した最下位タグと不採用の最上位タグの点差がこれ以上なら「はっきり分かれている」とみなす
+MARGIN_SCALE = 1.0
+
+# 樹脂・材料の略号（英字の前後が英字でない位置でだけ一致させる。PA6T・PA66 などは PA に一致）
+POLYMER_ABBREVIATIONS = [
+    "PPS", "PA", "PBT", "PET", "PC", "PP", "PE", "POM", "PEEK", "LCP", "PPA", "PPE", "MPPE",
+    "PSU", "PES", "PEI", "PI", "PAI", "PTFE", "PFA", "ABS", "PMMA", "PVC", "EPDM", "TPE", "TPU",
+    "TPO", "SPS", "PCT", "CFRP", "GFRP", "FRP", "BN", "ALN", "SIC", "EMC",
+]
+
+# 物性・規格の略号
+PROPERTY_ABBREVIATIONS = ["CTI", "PTI", "UL94", "HDT", "V-0", "V-1", "V-2", "5VA", "RTI", "GWIT", "GWFI", "MFR"]
+
+LEXICON: Dict[str, List[str]] = {
+    "material": [
+        "樹脂", "ポリアミド", "ナイロン", "ポリカーボネート", "ポリエステル", "ポリプロピレン", "ポリエチレン",
+        "ポリイミド", "エポキシ", "シリコーン", "フェノール", "ウレタン", "エラストマー", "ゴム", "フッ素",
+        "フィラー", "ガラス繊維", "炭素繊維", "カーボン", "窒化ホウ素", "窒化アルミ", "アルミナ", "シリカ",
+        "タルク", "難燃剤", "可塑剤", "添加剤", "コンパウンド", "接着剤", "封止材", "塗料", "フィルム",
+        "バイオマス", "リサイクル材", "再生材", "ハロゲンフリー", "銅", "アルミ", "セラミック",
+    ],
+    "property": [
+        "熱伝導", "絶縁破壊", "絶縁", "耐トラッキング", "トラッキング", "難燃", "荷重たわみ温度", "引張強度",
+        "曲げ弾性率", "曲げ強度", "衝撃強度", "弾性率", "耐熱", "耐湿", "耐水", "耐薬品", "耐油", "耐候",
+        "耐寒", "耐摩耗", "耐加水分解", "誘電率", "誘電正接", "体積抵抗率", "線膨張", "熱膨張", "寸法安定",
+        "流動性", "スパイラルフロー", "吸水率", "比重", "密度", "結晶化", "ガラス転移", "融点", "クリープ",
+        "PLC等級", "低反り", "低誘電", "透明性",
+    ],
+    "application": [
+        "バッテリー", "電池", "EV", "HEV", "PHEV", "電動車", "車載", "バスバー", "ハウジング", "筐体",
+        "ケース", "コネクタ", "ジャンクションブロック", "モジュール", "インバータ", "モーター", "モータ",
+        "充電", "パワー半導体", "半導体", "基板", "センサ", "ECU", "ヒートシンク", "放熱", "冷却",
+        "熱管理", "電装", "ワイヤーハーネス", "高電圧", "配管", "ギア", "軸受", "ロボット",
+    ],
+    "process": [
+        "成形", "射出", "押出", "ブロー", "インサート", "アウトサート", "二色", "溶着", "接着", "接合",
+        "めっき", "塗装", "表面処理", "架橋", "重合", "混練", "配合", "加工", "金型", "3Dプリン",
+    ],
+}
+
+# 単独では選定の手がかりにならない一般的な語
+GENERIC_WORDS = [
+    "技術", "開発", "研究", "課題", "製品", "材料", "素材", "品質", "コスト", "価格", "性能", "高性能",
+    "機能", "提案", "要求", "要件", "ニーズ", "改善", "改良", "顧客", "市場", "システム", "部品", "用途",
+    "評価", "試験", "検討", "対応", "設計", "生産", "量産", "供給", "採用", "最適化", "軽量化", "安全性",
+    "信頼性", "環境", "効率", "次世代", "新規", "新素材", "ソリューション",
+]
+
+_NUMERIC_SPEC = re.compile(r"\d+(?:\.\d+)?\s*(?:℃|°C|MPA|GPA|W/MK|KV|%|MM|UM|V|A|HZ|PPM|G/CM3)", re.IGNORECASE)
+
+CATEGORY_WEIGHTS = {
+    "material": WEIGHT_MATERIAL,
+    "property": WEIGHT_PROPERTY,
+    "application": WEIGHT_APPLICATION,
+    "process": WEIGHT_PROCESS,
+}
+
+
+def _abbreviation_pattern(abbreviations: List[str]) -> re.Pattern:
+    """略号が別の英単語の一部でない位置でだけ一致する正規表現（後ろの数字は許可）"""
+    alternatives = "|".join(re.escape(a) for a in sorted(abbreviations, key=len, reverse=True))
+    return re.compile(rf"(?<![A-Z])(?:{alternatives})(?![A-Z])")
+
+
+_POLYMER_PATTERN = _abbreviation_pattern(POLYMER_ABBREVIATIONS)
+_PROPERTY_PATTERN = _abbreviation_pattern(PROPERTY_ABBREVIATIONS)
+_GENERIC_SET = set(GENERIC_WORDS)
+
+
+def normalize(text: str) -> str:
+    """全角・半角を揃え、英字を大文字にする（辞書・面談メモとの照合用）"""
+    return unicodedata.normalize("NFKC", text).upper().strip()
+
+
+# 辞書は照合用に正規化しておく
+_LEXICON = {category: [normalize(term) for term in terms] for category, terms in LEXICON.items()}
+
+
+@dataclass(frozen=True)
+class TagRanking:
+    """ローカルランキングの結果"""
+    tags: List[str]  # 重要度の高い順（最大 max_tags 件）
+    confidence: float  # 0〜1。低いほど辞書で判断できていない
+    scores: Dict[str, float] = field(default_factory=dict)
+
+
+def get_min_confidence() -> float:
+    """LLMに回さずにローカルランキングを採用する信頼度の下限（環境変数 TAG_RANKER_MIN_CONFIDENCE）"""
+    return float(os.getenv("TAG_RANKER_MIN_CONFIDENCE", DEFAULT_MIN_CONFIDENCE))
+
+
+@functools.lru_cache(maxsize=1024)
+def lexicon_categories(tag: str) -> Tuple[str, ...]:
+    """
+    タグが一致する用語の分類（同じタグは何度も渡されるため結果をキャッシュする）
+
+    Args:
+        tag: 技術タグ（正規化前でよい）
+
+    Returns:
+        tuple: 一致した分類（"material" / "property" / "application" / "process"）
+    """
+    normalized = normalize(tag)
+    categories = []
+    if _POLYMER_PATTERN.search(normalized):
+        categories.append("material")
+    if _PROPERTY_PATTERN.search(normalized) and "property" not in categories:
+        categories.append("property")
+    for category, terms in _LEXICON.items():
+        if category not in categories and any(term in normalized for term in terms):
+            categories.append(category)
+    return tuple(categories)
+
+
+def is_generic(tag: str) -> bool:
+    """一般的すぎる語（辞書の用語を含まない一般語）かどうか"""
+    normalized = normalize(tag)
+    return normalized in _GENERIC_SET and not lexicon_categories(tag)
+
+
+def score_tag(tag: str, memo: str = "") -> Tuple[float, bool]:
+    """
+    タグの重要度を点数化する
+
+    Args:
+        tag: 技術タグ
+        memo: 正規化済みの面談メモ（normalize の結果）
+
+    Returns:
+        tuple: (点数, 辞書に一致したか)
+    """
+    categories = lexicon_categories(tag)
+    score = 0.0
+    if categories:
+        weights = sorted((CATEGORY_WEIGHTS[c] for c in categories), reverse=True)
+        score += weights[0] + WEIGHT_EXTRA_CATEGORY * (len(weights) - 1)
+    normalized = normalize(tag)
+    if _NUMERIC_SPEC.search(normalized):
+        score += WEIGHT_NUMERIC_SPEC
+    if memo and normalized:
+        score += WEIGHT_MEMO_FREQUENCY * math.log1p(memo.count(normalized))
+    if not categories and normalized in _GENERIC_SET:
+        score += PENALTY_GENERIC
+    return score, bool(categories)
+
+
+def rank_tags(tech_tags: List[str], interview_memo: str = "", max_tags: int = 5) -> TagRanking:
+    """
+    技術タグを重要度順に並べ、上位 max_tags 件を選ぶ（LLMを使わない）
+
+    信頼度は「採用したタグのうち辞書に一致した割合」と
+    「採用・不採用の境目の点差」から求める。同点は元の順序を保つ。
+
+    Args:
+        tech_tags: 抽出された技術タグのリスト
+        interview_memo: 面談メモ（出現回数の計算に使う）
+        max_tags: 選定する最大タグ数
+
+    Returns:
+        TagRanking: 選定結果
+    """
+    unique_tags = list(dict.fromkeys(tech_tags))
+    if not unique_tags:
+        return TagRanking(tags=[], confidence=1.0)
+
+    memo = normalize(interview_memo) if interview_memo else ""
+    scored = []
+    for index, tag in enumerate(unique_tags):
+        score, known = score_tag(tag, memo)
+        scored.append((score, -index, tag, known))
+    scored.sort(reverse=True)
+
+    selected = scored[:max_tags]
+    rejected = scored[max_tags:]
+    coverage = sum(1 for _, _, _, known in selected if known) / len(selected)
+    if rejected:
+        margin = selected[-1][0] - rejected[0][0]
+        separation = max(0.0, min(1.0, margin / MARGIN_SCALE))
+    else:
+        # 全件採用なら、境目の判断は不要
+        separation = 1.0
+    confidence = 0.7 * coverage + 0.3 * separation
+
+    return TagRanking(
+        tags=[tag for _, _, tag, _ in selected],
+        confidence=round(confidence, 3),
+        scores={tag: round(score, 3) for score, _, tag, _ in scored},
+    )
@@ -0,0 +1,469 @@
+"""
+ベクトル索引のミラーサービス
+documents テーブルのEmbeddingをローカルのファイルに複製し、他事業部の知見の検索を
+Supabaseへの通信なしに、プロセス内の行列積1回と事業部のマスクで行う。
+
+- vectors.bin: 正規化したEmbeddingの行列（float16 または int8。読み込み時に検索用の float32 に展開する）
+- rows.jsonl: 各行のID・メタデータ・本文の先頭（スニペット）・int8の倍率
+- index.json: 件数・同期済みの位置（created_at, id）・最終同期時刻
+
+同期は created_at の位置から後に追加された行だけを取得して追記する（削除・更新は反映しないため、
+必要ならディレクトリを消して作り直す）。長いトランザクションで後からコミットされた行（created_at が
+同期済みの位置より前になる）を取りこぼさないよう、位置の VECTOR_MIRROR_SYNC_OVERLAP_SECONDS 秒前から
+読み直し、追加済みのIDは除く。最終同期から VECTOR_MIRROR_MAX_AGE_SECONDS を過ぎたミラーは
+使わず、呼び出し側（backend.search_cross_pollination / search_cross_pollination_hybrid）はSupabaseで検索する
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DIMENSION = 1536
+DEFAULT_DTYPE = "float16"
+DEFAULT_MAX_AGE_SECONDS = 300
+DEFAULT_SYNC_OVERLAP_SECONDS = 300
+SYNC_PAGE_SIZE = 1000
+SNIPPET_LENGTH = 300
+FORMAT_VERSION = 1
+
+HEADER_FILE = "index.json"
+VECTORS_FILE = "vectors.bin"
+ROWS_FILE = "rows.jsonl"
+
+STORAGE_DTYPES = {"float16": np.float16, "int8": np.int8}
+
+
+def get_mirror_dir() -> Optional[str]:
+    """ミラーの保存先（環境変数 VECTOR_MIRROR_DIR。未設定ならミラーを使わない）"""
+    return os.getenv("VECTOR_MIRROR_DIR") or None
+
+
+def get_max_age_seconds() -> float:
+    """ミラーを使う最終同期からの最大経過秒数（環境変数 VECTOR_MIRROR_MAX_AGE_SECONDS）"""
+    return float(os.getenv("VECTOR_MIRROR_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS))
+
+
+def get_sync_overlap_seconds() -> float:
+    """同期済みの位置より前から読み直す秒数（環境変数 VECTOR_MIRROR_SYNC_OVERLAP_SECONDS）"""
+    return float(os.getenv("VECTOR_MIRROR_SYNC_OVERLAP_SECONDS", DEFAULT_SYNC_OVERLAP_SECONDS))
+
+
+def _shift_timestamp(value: str, seconds: float) -> Optional[str]:
+    """created_at（ISO 8601）を seconds 秒前にずらす（解釈できない場合は None）"""
+    try:
+        return (datetime.fromisoformat(value) - timedelta(seconds=seconds)).isoformat()
+    except ValueError:
+        return None
+
+
+def get_storage_dtype() -> str:
+    """ファイルに保存する型（環境変数 VECTOR_MIRROR_DTYPE。float16 または int8）"""
+    dtype = os.getenv("VECTOR_MIRROR_DTYPE", DEFAULT_DTYPE)
+    if dtype not in STORAGE_DTYPES:
+        raise ValueError(f"VECTOR_MIRROR_DTYPE は {', '.join(STORAGE_DTYPES)} のいずれかを指定してください: {dtype}")
+    return dtype
+
+
+def _parse_embedding(value) -> Optional[List[float]]:
+    """PostgRESTが文字列（"[0.1,0.2,...]"）で返すvector列をリストにする"""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+@dataclass(frozen=True)
+class _MirrorState:
+    """検索に使うメモリ上のデータ（同期のたびに作り直して差し替える）"""
+    matrix: np.ndarray
+    department_codes: np.ndarray
+    departments: Dict[str, int]
+    ids: List[str]
+    positions: Dict[str, int]
+    metadata: List[dict]
+    snippets: List[str]
+
+
+class VectorMirror:
+    """
+    documents テーブルのEmbeddingのローカルの複製（検索はスレッドセーフ。同期は1つずつ実行する）
+
+    ファイルは float16 / int8 で保存し、検索には読み込み時に float32 にした行列を使う
+    （NumPy の float16 / int8 の行列積は BLAS を使わず、float32 より遅いため）。
+    そのためメモリは保存形式によらず 件数 × 次元 × 4バイト（1536次元で1件あたり約6KB）を使い、
+    同期で行を追加する間は一時的にその2倍になる。
+    """
+
+    def __init__(self, directory: str, dtype: Optional[str] = None, dimension: int = DIMENSION):
+        self.directory = directory
+        self.dtype = dtype or get_storage_dtype()
+        self.dimension = dimension
+        self.count = 0
+        self.rows_bytes = 0
+        self.watermark: Optional[Tuple[str, str]] = None
+        self.synced_at: Optional[float] = None
+        self._header_mtime: Optional[int] = None
+        self._sync_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._sync_thread: Optional[threading.Thread] = None
+        self._state = self._empty_state()
+        os.makedirs(directory, exist_ok=True)
+        self.load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _empty_state(self) -> _MirrorState:
+        return _MirrorState(np.zeros((0, self.dimension), dtype=np.float32), np.zeros(0, dtype=np.int32), {}, [], {}, [], [])
+
+    def load(self) -> None:
+        """ファイルからミラーを読み込む（保存形式が異なる・ファイルがない場合は空にする）"""
+        header_path = self._path(HEADER_FILE)
+        if not os.path.exists(header_path):
+            return
+        with open(header_path, encoding="utf-8") as f:
+            header = json.load(f)
+        self._header_mtime = os.stat(header_path).st_mtime_ns
+        if (header.get("version"), header.get("dtype"), header.get("dimension")) != (FORMAT_VERSION, self.dtype, self.dimension):
+            logger.warning(f"ベクトル索引のミラーの保存形式が異なるため、作り直します: {self.directory}")
+            self.count, self.rows_bytes, self.watermark, self.synced_at = 0, 0, None, None
+            self._state = self._empty_state()
+            return
+
+        count = header["count"]
+        rows = []
+        if count:
+            with open(self._path(ROWS_FILE), "rb") as f:
+                rows = [json.loads(line) for line in f.read(header["rows_bytes"]).splitlines()]
+        assert len(rows) == count, "rows.jsonl の行数が index.json と一致しません"
+        matrix = self._to_float32(
+            np.memmap(self._path(VECTORS_FILE), dtype=STORAGE_DTYPES[self.dtype], mode="r", shape=(count, self.dimension))
+            if count else np.zeros((0, self.dimension), dtype=STORAGE_DTYPES[self.dtype]),
+            rows,
+        )
+        self.count = count
+        self.rows_bytes = header["rows_bytes"]
+        self.watermark = tuple(header["watermark"]) if header.get("watermark") else None
+        self.synced_at = header.get("synced_at")
+        self._state = self._extend_state(self._empty_state(), matrix, rows)
+
+    def _to_float32(self, stored: np.ndarray, rows: List[dict]) -> np.ndarray:
+        """保存した行列を検索用の float32 にする（int8 は行ごとの倍率を掛ける）"""
+        matrix = np.asarray(stored, dtype=np.float32)
+        if self.dtype == "int8" and len(rows):
+            matrix *= np.array([row["scale"] for row in rows], dtype=np.float32)[:, None]
+        return matrix
+
+    def _to_storage(self, vectors: np.ndarray) -> Tuple[np.ndarray, List[Optional[float]]]:
+        """正規化した float32 の行列を保存用の型にする（int8 は行ごとの倍率も返す）"""
+        if self.dtype == "float16":
+            return vectors.astype(np.float16), [None] * len(vectors)
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.tolist()
+
+    @staticmethod
+    def _extend_state(state: _MirrorState, vectors: np.ndarray, rows: List[dict]) -> _MirrorState:
+        """行を追加した新しい検索用データを作る（既存のデータは変更しない）"""
+        departments = dict(state.departments)
+        positions = dict(state.positions)
+        codes = []
+        for position, row in enumerate(rows, start=len(state.ids)):
+            department = (row.get("metadata") or {}).get("department") or ""
+            codes.append(departments.setdefault(department, len(departments)))
+            positions[row["id"]] = position
+        return _MirrorState(
+            matrix=np.concatenate([state.matrix, vectors]) if len(state.matrix) else vectors,
+            department_codes=np.concatenate([state.department_codes, np.array(codes, dtype=np.int32)]),
+            departments=departments,
+            ids=state.ids + [row["id"] for row in rows],
+            positions=positions,
+            metadata=state.metadata + [row.get("metadata") or {} for row in rows],
+            snippets=state.snippets + [row.get("snippet") or "" for row in rows],
+        )
+
+    def _write_header(self) -> None:
+        """index.json を書き換える（一時ファイルから置き換えるため、途中で止まっても壊れない）"""
+        header = {
+            "version": FORMAT_VERSION,
+            "dtype": self.dtype,
+            "dimension": self.dimension,
+            "count": self.count,
+            "rows_bytes": self.rows_bytes,
+            "watermark": list(self.watermark) if self.watermark else None,
+            "synced_at": self.synced_at,
+        }
+        path = self._path(HEADER_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(header, f)
+        os.replace(path + ".tmp", path)
+        self._header_mtime = os.stat(path).st_mtime_ns
+
+    def _append_files(self, stored: np.ndarray, rows: List[dict]) -> None:
+        """
+        行列とメタデータをファイルに追記する
+
+        index.json の件数より後ろのデータ（前回の同期が途中で止まった分）は切り捨ててから追記する。
+        """
+        row_nbytes = self.dimension * np.dtype(STORAGE_DTYPES[self.dtype]).itemsize
+        for name, offset, data in (
+            (VECTORS_FILE, self.count * row_nbytes, stored.tobytes()),
+            (ROWS_FILE, self.rows_bytes, "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")),
+        ):
+            path = self._path(name)
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.truncate(offset)
+                f.seek(offset)
+                f.write(data)
+            if name == ROWS_FILE:
+                self.rows_bytes = offset + len(data)
+        self.count += len(rows)
+
+    def _fetch_page(
+        self, supabase, page_size: int, after: Optional[Tuple[str, str]], since: Optional[str]
+    ) -> List[Dict]:
+        """
+        行を (created_at, id) の順に1ページ取得する
+
+        Args:
+            after: この位置 (created_at, id) より後の行を取得する（ページの続き）
+            since: after がない場合、created_at がこの時刻以降の行を取得する（最初のページ）
+        """
+        query = supabase.table("documents").select("id, content, metadata, embedding, created_at")
+        query = query.not_.is_("created_at", "null")
+        if after:
+            created_at, last_id = after
+            # 一括登録では同じ created_at の行が多いため、id で続きから取得する
+            query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{last_id})')
+        elif since:
+            query = query.gte("created_at", since)
+        response = query.order("created_at").order("id").limit(page_size).execute()
+        return response.data if hasattr(response, 'data') else []
+
+    def _sync_start(self) -> Tuple[Optional[Tuple[str, str]], Optional[str]]:
+        """同期を始める位置（_fetch_page の after, since）。同期済みの位置から重なりの秒数だけ戻る"""
+        if not self.watermark:
+            return None, None
+        overlap = get_sync_overlap_seconds()
+        if overlap <= 0:
+            return self.watermark, None
+        since = _shift_timestamp(self.watermark[0], overlap)
+        if since is None:
+            logger.warning(f"created_at を解釈できないため、同期済みの位置から続けて同期します: {self.watermark[0]}")
+            return self.watermark, None
+        return None, since
+
+    def sync(self, supabase=None, page_size: int = SYNC_PAGE_SIZE) -> int:
+        """
+        documents テーブルの新しい行をミラーに追加する（ページごとにファイルへ追記する）
+
+        同期済みの位置の VECTOR_MIRROR_SYNC_OVERLAP_SECONDS 秒前から読み直し、追加済みのIDは除く。
+
+        Args:
+            supabase: 使い回すSupabaseクライアント（省略時は作成する）
+            page_size: 1回に取得する行数
+
+        Returns:
+            int: 追加した行数
+        """
+        with self._sync_lock:
+            if supabase is None:
+                from backend import get_supabase_client
+
+                supabase = get_supabase_client()
+            self._reload_if_changed()
+            started = time.time()
+            added_vectors: List[np.ndarray] = []
+            added_rows: List[dict] = []
+            added_ids = set()
+            after, since = self._sync_start()
+            while True:
+                page = self._fetch_page(supabase, page_size, after, since)
+                if not page:
+                    break
+                vectors, rows = [], []
+                for item in page:
+                    doc_id = str(item["id"])
+                    if doc_id in self._state.positions or doc_id in added_ids:
+                        # 重なりの範囲で読み直した、追加済みの行
+                        continue
+                    embedding = _parse_embedding(item.get("embedding"))
+                    if not embedding or len(embedding) != self.dimension:
+                        logger.warning(f"Embeddingのない行はミラーに追加しません: {item.get('id')}")
+                        continue
+                    vectors.append(embedding)
+                    added_ids.add(doc_id)
+                    rows.append({
+                        "id": doc_id,
+                        "metadata": item.get("metadata") or {},
+                        "snippet": (item.get("content") or "")[:SNIPPET_LENGTH],
+                    })
+                if rows:
+                    matrix = np.asarray(vectors, dtype=np.float32)
+                    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+                    stored, scales = self._to_storage(matrix)
+                    if self.dtype == "int8":
+                        for row, scale in zip(rows, scales):
+                            row["scale"] = scale
+                    self._append_files(stored, rows)
+                    added_vectors.append(self._to_float32(stored, rows))
+                    added_rows.extend(rows)
+                after = (page[-1]["created_at"], str(page[-1]["id"]))
+                if self.watermark is None or after > self.watermark:
+                    self.watermark = after
+                self._write_header()
+                if len(page) < page_size:
+                    break
+
+            if added_rows:
+                self._state = self._extend_state(self._state, np.concatenate(added_vectors), added_rows)
+            self.synced_at = started
+            self._write_header()
+            logger.info(f"ベクトル索引のミラーを同期しました: 追加 {len(added_rows)}件 / 合計 {self.count}件")
+            return len(added_rows)
+
+    def sync_in_background(self) -> None:
+        """同期をバックグラウンドで開始する（実行中なら何もしない）"""
+        with self._thread_lock:
+            if self._sync_thread is not None and self._sync_thread.is_alive():
+                return
+
+            def run():
+                try:
+                    self.sync()
+                except Exception as e:
+                    logger.warning(f"ベクトル索引のミラーを同期できませんでした: {e}")
+
+            self._sync_thread = threading.Thread(target=run, name="vector-mirror-sync", daemon=True)
+            self._sync_thread.start()
+
+    def _reload_if_changed(self) -> None:
+        """別のプロセス（バッチなど）が同期した場合は読み込み直す"""
+        path = self._path(HEADER_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._header_mtime:
+            with open(path, encoding="utf-8") as f:
+                synced_at = json.load(f).get("synced_at")
+            if synced_at != self.synced_at:
+                self.load()
+            else:
+                self._header_mtime = mtime
+
+    def is_fresh(self, max_age_seconds: Optional[float] = None) -> bool:
+        """最終同期から max_age_seconds 以内か（省略時は環境変数 VECTOR_MIRROR_MAX_AGE_SECONDS）"""
+        if not self._sync_lock.locked():
+            self._reload_if_changed()
+        max_age_seconds = get_max_age_seconds() if max_age_seconds is None else max_age_seconds
+        return self.synced_at is not None and time.time() - self.synced_at <= max_age_seconds
+
+    def search(
+        self,
+        query_embedding: List[float],
+        exclude_department: Optional[str] = None,
+        top_k: int = 5,
+        match_threshold: float = 0.0,
+        snippet_length: int = SNIPPET_LENGTH,
+    ) -> List[Dict]:
+        """
+        他事業部の知見をコサイン類似度で検索する（全件との行列積1回による厳密検索）
+
+        Args:
+            query_embedding: クエリのEmbedding
+            exclude_department: 除外する事業部（metadata.department が一致する行を除く）
+            top_k: 取得する結果の数
+            match_threshold: 類似度の下限（この値以下の行は返さない）
+            snippet_length: スニペットの最大文字数
+
+        Returns:
+            List[Dict]: match_passages_cross と同じ形式の結果（id, metadata, snippet, similarity）。
+                スニペットは本文の先頭（ミラーはパッセージを持たない）
+        """
+        state = self._state
+        if not len(state.matrix):
+            return []
+        query = np.array(query_embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = state.matrix @ query
+        code = state.departments.get(exclude_department) if exclude_department is not None else None
+        if code is not None:
+            scores[state.department_codes == code] = -np.inf
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "id": state.ids[i],
+                "metadata": dict(state.metadata[i]),
+                "snippet": state.snippets[i][:snippet_length],
+                "similarity": float(scores[i]),
+            }
+            for i in top
+            if scores[i] > match_threshold
+        ]
+
+    def similarities(self, query_embedding: List[float], ids: List[str]) -> Dict[str, float]:
+        """
+        指定した行とクエリのコサイン類似度を求める（ハイブリッド検索で語句検索だけで見つかった行用）
+
+        Returns:
+            Dict[str, float]: 行ID → 類似度（ミラーにない行は含めない）
+        """
+        state = self._state
+        positions = [state.positions[doc_id] for doc_id in ids if doc_id in state.positions]
+        if not positions:
+            return {}
+        query = np.array(query_embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = np.asarray(state.matrix[positions], dtype=np.float32) @ query
+        return {state.ids[position]: float(score) for position, score in zip(positions, scores)}
+
+
+_mirror: Optional[VectorMirror] = None
+_mirror_lock = threading.Lock()
+
+
+def get_vector_mirror() -> Optional[VectorMirror]:
+    """
+    共有のベクトル索引のミラーを取得する
+
+    環境変数:
+        VECTOR_MIRROR_DIR: ミラーの保存先（未設定ならミラーを使わず None を返す）
+        VECTOR_MIRROR_DTYPE: ファイルに保存する型（float16 / int8、デフォルト: float16）
+        VECTOR_MIRROR_MAX_AGE_SECONDS: ミラーを使う最終同期からの最大経過秒数（デフォルト: 300秒）
+        VECTOR_MIRROR_SYNC_OVERLAP_SECONDS: 同期済みの位置より前から読み直す秒数（デフォルト: 300秒）
+    """
+    global _mirror
+    directory = get_mirror_dir()
+    if directory is None:
+        return None
+    with _mirror_lock:
+        if _mirror is None or _mirror.directory != directory:
+            _mirror = VectorMirror(directory)
+        return _mirror
+
+
+def main() -> int:
+    """ミラーを同期する（cron などから python -m services.vector_mirror で定期的に実行する）"""
+    logging.basicConfig(level=logging.INFO)
+    mirror = get_vector_mirror()
+    if mirror is None:
+        print("VECTOR_MIRROR_DIR を設定してください")
+        return 1
+    added = mirror.sync()
+    print(f"同期しました: 追加 {added}件 / 合計 {mirror.count}件")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
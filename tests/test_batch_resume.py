@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+面談メモ一括処理（services/batch.py）の再開機能のテストスクリプト
+
+レビュー・保存・分隊を差し替え、APIキーやDBなしで
+完了済みファイルのスキップと、保存済みファイルの分隊からの再開を確認します。
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.batch as batch
+from services.squad import SquadResult
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+calls = {"review": 0, "save": 0, "squad": 0}
+fail_squad = {"enabled": False}
+
+
+def fake_review(text, model_name=""):
+    calls["review"] += 1
+    return SimpleNamespace(
+        is_sufficient="不足" not in text, questions=["温度条件は？"], tech_tags=["PPS"], priority_tags=["PPS"]
+    )
+
+
+def fake_save(text, metadata):
+    calls["save"] += 1
+    return {"id": calls["save"], "embedding": [0.0] * 3}
+
+
+def fake_run_squad(on_event=None, **kwargs):
+    calls["squad"] += 1
+    if fail_squad["enabled"]:
+        raise RuntimeError("モデルが混雑しています")
+    return SquadResult(report="# レポート\n## Trigger\n本文", internal_hits=[], academic_results=[])
+
+
+def patch_batch():
+    """外部呼び出しを差し替える"""
+    batch.review_interview_content = fake_review
+    batch.save_interview_note = fake_save
+    batch.run_squad = fake_run_squad
+    batch.configure_rate_limit = lambda requests_per_second: None
+
+
+def test_resume():
+    """失敗後の再実行で保存をやり直さず、完了済みはスキップすることを確認"""
+    print_separator()
+    print("バッチ処理の再開テスト")
+    print_separator()
+    patch_batch()
+    calls.update(review=0, save=0, squad=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "memos"
+        output_dir = Path(tmp) / "outputs"
+        input_dir.mkdir()
+        (input_dir / "A社.txt").write_text("耐熱150℃、CTI600以上が必要", encoding="utf-8")
+        (input_dir / "B社.txt").write_text("情報不足のメモ", encoding="utf-8")
+        (input_dir / "memo.csv").write_text("対象外", encoding="utf-8")
+
+        # 1回目: 分隊が失敗 → A社は保存済みのまま残る
+        fail_squad["enabled"] = True
+        results = batch.run_batch(str(input_dir), department="研究開発部", output_dir=str(output_dir), workers=2)
+        statuses = sorted(entry["status"] for entry in results)
+        assert statuses == [batch.STATUS_INSUFFICIENT, batch.STATUS_SAVED], statuses
+        assert calls == {"review": 2, "save": 1, "squad": 1}, calls
+
+        # 2回目: 保存せずに分隊から再開し、情報不足のファイルは再レビューしない
+        fail_squad["enabled"] = False
+        results = batch.run_batch(str(input_dir), department="研究開発部", output_dir=str(output_dir), workers=2)
+        statuses = sorted(entry["status"] for entry in results)
+        assert statuses == [batch.STATUS_DONE, batch.STATUS_INSUFFICIENT], statuses
+        assert calls == {"review": 2, "save": 1, "squad": 2}, calls
+        assert len(list(output_dir.glob("A社-*.md"))) == 1
+        assert len(list(output_dir.glob("*.html"))) == 1
+
+        # 3回目: すべて処理済み
+        batch.run_batch(str(input_dir), department="研究開発部", output_dir=str(output_dir), workers=2)
+        assert calls == {"review": 2, "save": 1, "squad": 2}, calls
+
+    print("✅ 再開・スキップが期待通りに動作しました")
+
+
+def main():
+    test_resume()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
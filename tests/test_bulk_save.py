@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+面談内容の一括保存（backend.save_interview_notes_bulk）のテストスクリプト
+
+Supabaseクライアントと Embedding を差し替え、APIキーやDBなしで
+embed_documents のバッチ化・複数行INSERT・失敗したバッチの再試行で二重登録しないことを確認します。
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend
+import services.batch as batch
+import services.resilience as resilience
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+class FakeQuery:
+    """supabase.table(...) の select / upsert の最小限の代替（documents と document_passages）"""
+
+    def __init__(self, db, table, action=None, payload=None):
+        self.db = db
+        self.table = table
+        self.action = action
+        self.payload = payload
+
+    def select(self, columns):
+        return FakeQuery(self.db, self.table, "select")
+
+    def in_(self, column, values):
+        assert self.table == "documents" and column == "content_hash"
+        return FakeQuery(self.db, self.table, "select", list(values))
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        expected = "content_hash" if self.table == "documents" else "document_id,passage_index"
+        assert on_conflict == expected and ignore_duplicates
+        return FakeQuery(self.db, self.table, "upsert", rows)
+
+    def execute(self):
+        with self.db.lock:
+            if self.action == "select":
+                data = [
+                    {"id": row["id"], "content_hash": row["content_hash"]}
+                    for row in self.db.rows if row["content_hash"] in self.payload
+                ]
+                return SimpleNamespace(data=data)
+            if self.table == "document_passages":
+                self.db.passages.extend(self.payload)
+                return SimpleNamespace(data=self.payload)
+            self.db.insert_calls += 1
+            # 保存済みの確認とINSERTの間に、他の処理が同じ内容を保存した場合を再現する
+            for row in self.db.concurrent_rows:
+                self.db.rows.append({**row, "id": f"id-{len(self.db.rows) + 1}"})
+            self.db.concurrent_rows = []
+            # 一意制約（content_hash）に違反する行は無視する
+            saved = {row["content_hash"] for row in self.db.rows}
+            inserted = []
+            for row in self.payload:
+                if row["content_hash"] not in saved:
+                    inserted.append({**row, "id": f"id-{len(self.db.rows) + 1}"})
+                    self.db.rows.append(inserted[-1])
+            if self.db.fail_after_commit > 0:
+                # INSERTは反映されたが、応答がタイムアウトした場合を再現する
+                self.db.fail_after_commit -= 1
+                raise TimeoutError("read timed out")
+            return SimpleNamespace(data=inserted)
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.rows = []
+        self.passages = []
+        self.lock = threading.Lock()
+        self.insert_calls = 0
+        self.fail_after_commit = 0
+        self.concurrent_rows = []
+
+    def table(self, name):
+        assert name in ("documents", "document_passages")
+        return FakeQuery(self, name)
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        return [[float(len(text)), 0.0] for text in texts]
+
+
+def install_fakes():
+    db = FakeSupabase()
+    embeddings = FakeEmbeddings()
+    backend.get_supabase_client = lambda: db
+    backend.get_embeddings = lambda: embeddings
+    resilience.backoff_delay = lambda attempt, *args, **kwargs: 0.0
+    return db, embeddings
+
+
+def make_notes(count, prefix="面談メモ"):
+    for i in range(count):
+        yield f"{prefix} {i}: 放熱樹脂の熱伝導率", {"department": "研究開発部", "company_name": f"企業{i}"}
+
+
+def test_batches_and_report():
+    """件数・文字数の上限でバッチを区切り、バッチごとに embed_documents とINSERTを1回ずつ行う"""
+    print_separator()
+    print("バッチ化とスループットのテスト")
+    print_separator()
+
+    db, embeddings = install_fakes()
+    notes = list(make_notes(45))
+    notes.append(notes[0])  # 入力内の重複
+    notes.append(("長いメモです。" * 150, {"department": "研究開発部"}))
+    report = backend.save_interview_notes_bulk(iter(notes), batch_size=10, max_chars=300, concurrency=3)
+
+    assert report.total == 47 and report.inserted == 46 and report.skipped == 1 and report.failed == 0, report
+    assert db.insert_calls == report.batches == len(embeddings.batches)
+    assert len({row["content_hash"] for row in db.rows}) == 46
+    assert all("created_at" in row["metadata"] for row in db.rows)
+    assert "created_at" not in notes[1][1], "呼び出し元のメタデータを書き換えている"
+    long_memo = next(row for row in db.rows if row["content"].startswith("長いメモ"))
+    long_passages = [p for p in db.passages if p["document_id"] == long_memo["id"]]
+    assert len(long_passages) > 1, "長いメモがパッセージに分割されていない"
+    assert len(db.passages) == 45 + len(long_passages)
+    # 面談内容とパッセージをバッチごとに1回の embed_documents で計算する（短いメモはパッセージを別に計算しない）
+    assert len(embeddings.batches) == report.batches and sum(embeddings.batches) == 46 + len(long_passages)
+    print(f"✅ {report.summary()}")
+
+
+def test_retry_and_rerun_are_idempotent():
+    """INSERT後にタイムアウトしたバッチの再試行・同じ入力での再実行で二重登録しない"""
+    print_separator()
+    print("再試行・再実行の冪等性のテスト")
+    print_separator()
+
+    db, embeddings = install_fakes()
+    db.fail_after_commit = 1
+    report = backend.save_interview_notes_bulk(make_notes(20), batch_size=10, concurrency=1)
+    assert report.inserted == 20 and report.retries == 1 and report.failed == 0, report
+    assert len(db.rows) == 20, f"{len(db.rows)}行が保存された（二重登録）"
+    assert sum(embeddings.batches) == 20, "再試行でEmbeddingを計算し直した"
+    assert len(db.passages) == 20, "応答が失われたバッチのパッセージが保存されていない"
+
+    embeddings.batches.clear()
+    rerun = backend.save_interview_notes_bulk(make_notes(25), batch_size=10)
+    assert rerun.inserted == 5 and rerun.skipped == 20 and len(db.rows) == 25
+    assert sum(embeddings.batches) == 5, "保存済みの内容をEmbedding化した"
+    print(f"✅ 再試行: {report.summary()}")
+    print(f"✅ 再実行: {rerun.summary()}")
+
+    db.fail_after_commit = 10
+    failed = backend.save_interview_notes_bulk(make_notes(3, prefix="新しいメモ"), max_attempts=2)
+    assert failed.failed == 0 and failed.inserted == 3 and failed.retries == 1, failed
+    print("✅ 応答が失われても、保存済みのハッシュを確認して成功扱いにしました")
+
+
+def test_concurrent_duplicates_are_skipped():
+    """確認の後に他の処理が保存した内容は、一意制約で無視されるためスキップとして数える"""
+    print_separator()
+    print("同時に保存された内容のテスト")
+    print_separator()
+
+    db, _ = install_fakes()
+    notes = list(make_notes(5))
+    text, metadata = notes[2]
+    db.concurrent_rows = [{"content": text, "metadata": metadata, "content_hash": backend.content_hash(text)}]
+    report = backend.save_interview_notes_bulk(iter(notes), batch_size=10)
+    assert report.inserted == 4 and report.skipped == 1 and report.failed == 0, report
+    assert len(db.rows) == 5 and len(db.passages) == 4, "他の処理が保存した文書のパッセージを保存した"
+    print(f"✅ {report.summary()}")
+
+
+def test_batch_cli_save_only():
+    """--save-only はフォルダのメモをAIレビューなしで一括保存する"""
+    print_separator()
+    print("一括処理CLIの --save-only のテスト")
+    print_separator()
+
+    db, _ = install_fakes()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i in range(3):
+            Path(tmp_dir, f"企業{i}.txt").write_text(f"過去の面談メモ {i}", encoding="utf-8")
+        assert batch.main([tmp_dir, "--department", "研究開発部", "--save-only"]) == 0
+    assert sorted(row["metadata"]["company_name"] for row in db.rows) == ["企業0", "企業1", "企業2"]
+    print("✅ 3件のメモを保存しました")
+
+
+def main():
+    test_batches_and_report()
+    test_retry_and_rerun_are_idempotent()
+    test_concurrent_duplicates_are_skipped()
+    test_batch_cli_save_only()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
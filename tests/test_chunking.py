@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+パッセージ分割（services/chunking.py）のテストスクリプト
+
+日本語の文の区切りで重なりのあるパッセージに分割できること、
+保存時に面談内容とパッセージを1回の embed_documents でEmbedding化して document_passages に保存し、
+検索結果のスニペットが最も近いパッセージになることを確認します。
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend
+import services.squad as squad
+from services.chunking import chunk_text, split_sentences
+
+SENTENCES = [f"これは{i}番目の文で、放熱樹脂の熱伝導率は2.0 W/mK以上が必要です。" for i in range(40)]
+LONG_MEMO = "".join(SENTENCES) + "\n\n「顧客の要望です。」次の段落！" + "区切りのない長い文" * 80
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+def test_split_sentences():
+    """。！？・閉じ括弧・改行で区切り、数値の小数点では区切らない"""
+    print_separator()
+    print("文の分割のテスト")
+    print_separator()
+
+    text = "熱伝導率は2.0 W/mK。「UL94 V-0が必要です。」本当に？\nはい"
+    sentences = [text[start:end] for start, end in split_sentences(text, max_chars=500)]
+    assert sentences == ["熱伝導率は2.0 W/mK。", "「UL94 V-0が必要です。」", "本当に？", "はい"], sentences
+    assert all(end - start <= 10 for start, end in split_sentences("あ" * 35, max_chars=10))
+    print(f"✅ {sentences}")
+
+
+def test_chunk_text():
+    """文の途中で切らずに上限以内で分割し、前のパッセージの末尾の文を重ねる"""
+    print_separator()
+    print("パッセージ分割のテスト")
+    print_separator()
+
+    passages = chunk_text(LONG_MEMO, max_chars=500, overlap_chars=100)
+    assert len(passages) > 3
+    assert all(len(p.text) <= 500 for p in passages)
+    assert [p.index for p in passages] == list(range(len(passages)))
+    for previous, current in zip(passages, passages[1:]):
+        assert current.start < current.end and current.end > previous.end, "パッセージが先に進んでいない"
+        if previous.end - current.start > 0:
+            assert previous.end - current.start <= 100, "重なりが上限を超えている"
+    # 文の区切りで終わる（最後の区切りのない長い文を除く）
+    assert passages[0].text.endswith("必要です。")
+    assert passages[1].start < passages[0].end, "前のパッセージと重なっていない"
+    covered = "".join(LONG_MEMO[p.start:p.end] for p in passages)
+    assert all(sentence in covered for sentence in SENTENCES)
+
+    assert [p.text for p in chunk_text("  短いメモ。  ")] == ["短いメモ。"]
+    assert chunk_text("   ") == []
+    print(f"✅ {len(LONG_MEMO)}文字を{len(passages)}パッセージに分割しました")
+
+
+def test_save_and_search_passages():
+    """保存時は面談内容とパッセージを1回でEmbedding化し、検索のスニペットは最も近いパッセージ"""
+    print_separator()
+    print("パッセージの保存と検索のテスト")
+    print_separator()
+
+    calls = []
+    saved = {"documents": [], "document_passages": []}
+
+    class FakeTable:
+        def __init__(self, name):
+            self.name = name
+            self.payload = None
+
+        def select(self, columns):
+            return self
+
+        def eq(self, column, value):
+            return self
+
+        def limit(self, count):
+            return self
+
+        def upsert(self, payload, on_conflict=None, ignore_duplicates=False):
+            self.payload = payload
+            return self
+
+        def execute(self):
+            if self.payload is None:
+                return SimpleNamespace(data=[])
+            rows = self.payload if isinstance(self.payload, list) else [{**self.payload, "id": "doc-1"}]
+            saved[self.name].extend(rows)
+            return SimpleNamespace(data=rows)
+
+    def fake_embed_documents(texts):
+        calls.append(len(texts))
+        return [[float(i)] for i in range(len(texts))]
+
+    backend.get_supabase_client = lambda: SimpleNamespace(table=FakeTable)
+    backend.get_embeddings = lambda: SimpleNamespace(embed_documents=fake_embed_documents)
+    os.environ.pop("DEDUP_SIMILARITY_THRESHOLD", None)
+
+    result = backend.save_interview_note(LONG_MEMO, {"department": "研究開発部"})
+    passages = chunk_text(LONG_MEMO)
+    assert calls == [1 + len(passages)], "面談内容とパッセージを1回でEmbedding化していない"
+    assert result["embedding"] == [0.0] and not result["duplicate"]
+    assert [row["passage_index"] for row in saved["document_passages"]] == list(range(len(passages)))
+    assert all(row["document_id"] == "doc-1" for row in saved["document_passages"])
+    print(f"✅ 面談内容と{len(passages)}パッセージを1回のAPI呼び出しでEmbedding化しました")
+
+    rpc_calls = []
+
+    def fake_rpc(function_name, params):
+        rpc_calls.append((function_name, params))
+        return [{"id": "doc-1", "metadata": {"company": "A社", "department": "営業部"},
+                 "snippet": passages[3].text[:300], "similarity": 0.8, "passage_index": 3}]
+
+    backend.call_rpc = fake_rpc
+    internal_data, hits = squad.search_internal_knowledge("放熱樹脂", "研究開発部", query_embedding=[0.1])
+    assert rpc_calls[0][0] == "match_documents_hybrid" and rpc_calls[0][1]["aggregation"] == "max"
+    assert hits[0]["content"] == passages[3].text[:300] and passages[3].text[:300] in internal_data
+    print("✅ 検索結果のスニペットは最も近いパッセージでした")
+
+
+def main():
+    test_split_sentences()
+    test_chunk_text()
+    test_save_and_search_passages()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
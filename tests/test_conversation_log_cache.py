@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+会話ログ描画のキャッシュ（components/conversation_log.py）のテストスクリプト
+
+20件の会話ログを2回目に描画するとき、ディスクI/OとMarkdown変換が発生しないことを確認します。
+"""
+
+import builtins
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import components.conversation_log as conversation_log
+from components.conversation_log import clear_render_caches, render_message_html
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AVATARS = [
+    os.path.join(BASE_DIR, "images", name)
+    for name in ["Orchestrator.png", "Market_Researcher.png", "Solution_Architect.png", "Devils_Advocate.png"]
+]
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+def render_log(messages):
+    return "".join(render_message_html(m["role"], m["avatar"], m["content"]) for m in messages)
+
+
+def test_rerun_uses_cache():
+    """2回目の描画ではファイルを開かず、Markdown変換もしない"""
+    print_separator()
+    print("会話ログ再描画のキャッシュテスト")
+    print_separator()
+
+    clear_render_caches()
+    messages = [
+        {"role": "assistant", "avatar": AVATARS[i % len(AVATARS)], "content": f"## 発言{i}\n\n- 項目A\n- 項目B"}
+        for i in range(20)
+    ]
+    first = render_log(messages)
+
+    opened = []
+    converted = []
+    stat_calls = []
+    original_open = builtins.open
+    original_markdown = conversation_log.markdown_to_html
+    original_exists = os.path.exists
+
+    def tracking_open(*args, **kwargs):
+        opened.append(args[0])
+        return original_open(*args, **kwargs)
+
+    def tracking_markdown(content):
+        converted.append(content)
+        return original_markdown(content)
+
+    def tracking_exists(path):
+        stat_calls.append(path)
+        return original_exists(path)
+
+    builtins.open = tracking_open
+    conversation_log.markdown_to_html = tracking_markdown
+    os.path.exists = tracking_exists
+    try:
+        second = render_log(messages)
+    finally:
+        builtins.open = original_open
+        conversation_log.markdown_to_html = original_markdown
+        os.path.exists = original_exists
+
+    assert second == first, "キャッシュの有無で描画結果が変わった"
+    assert not opened, f"ファイルを開いた: {opened}"
+    assert not stat_calls, f"ファイルの存在確認をした: {stat_calls}"
+    assert not converted, f"Markdown変換をした: {len(converted)}件"
+
+    # 内容が変われば変換し直す
+    messages[0]["content"] += "\n\n追記"
+    assert render_log(messages) != first
+    print("✅ 2回目の描画はキャッシュのみで完了しました")
+
+
+def main():
+    test_rerun_uses_cache()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+文書取り込み（services/ingest.py）のテストスクリプト
+
+テキストファイルの文字コード判定、サイズ・ページ数の上限、
+ファイル内容のハッシュによるキャッシュ、PDFの並列抽出を確認します。
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.ingest as ingest
+from services.ingest import clear_cache, decode_text, detect_kind, extract_text, read_file
+
+MEMO = "面談メモ：放熱樹脂の熱伝導率は 2.0 W/mK 以上が必要。ｶﾀｶﾅ・①・髙橋様にも確認。"
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+def test_decode_japanese_encodings():
+    """UTF-8（BOMあり/なし）・CP932・EUC-JP のメモを文字化けせずに読み込む"""
+    print_separator()
+    print("文字コード判定のテスト")
+    print_separator()
+
+    cases = {
+        "utf-8": MEMO.encode("utf-8"),
+        "utf-8 (BOM)": MEMO.encode("utf-8-sig"),
+        "cp932": MEMO.encode("cp932"),
+        "euc-jp": MEMO.replace("①", "1").replace("髙", "高").replace("ｶﾀｶﾅ", "カタカナ").encode("euc-jp"),
+        "shift_jis": "ひらがなと漢字だけのメモ".encode("shift_jis"),
+    }
+    for label, data in cases.items():
+        text, encoding = decode_text(data)
+        expected = data.decode("utf-8-sig") if label.startswith("utf-8") else data.decode(label)
+        assert text == expected, f"{label} を {encoding} として誤判定しました: {text}"
+        print(f"✅ {label}: {encoding}")
+
+    assert detect_kind("memo.TXT") == "txt"
+    assert detect_kind("upload", "application/pdf") == "pdf"
+    try:
+        detect_kind("memo.xlsx")
+        raise AssertionError("未対応の形式で ValueError にならない")
+    except ValueError:
+        pass
+
+
+def test_limits_and_cache():
+    """上限を超えるファイルは拒否し、同じ内容は2回目以降解析しない"""
+    print_separator()
+    print("上限・キャッシュのテスト")
+    print_separator()
+
+    clear_cache()
+    data = MEMO.encode("cp932")
+    try:
+        extract_text(data, "memo.txt", max_bytes=10)
+        raise AssertionError("サイズ上限を超えても読み込めてしまう")
+    except ValueError as e:
+        print(f"✅ サイズ上限: {e}")
+
+    calls = []
+    original = ingest.decode_text
+
+    def counting_decode(raw):
+        calls.append(1)
+        return original(raw)
+
+    ingest.decode_text = counting_decode
+    try:
+        first = extract_text(data, "memo.txt", mime_type="text/plain")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "別名で保存.txt")
+            with open(path, "wb") as f:
+                f.write(data)
+            second = read_file(path)
+    finally:
+        ingest.decode_text = original
+    assert first.text == MEMO and first.encoding == "cp932"
+    assert second is first, "同じ内容のファイルでキャッシュが使われていない"
+    assert len(calls) == 1
+    print("✅ 同じ内容のファイルは1回だけ解析しました")
+
+
+def test_docx_paragraph_limit():
+    """docxは段落を連結し、上限を超えた分は読まない"""
+    print_separator()
+    print("docxの段落数上限のテスト")
+    print_separator()
+
+    try:
+        import docx
+    except ImportError:
+        print("⚠️ python-docx が無いためスキップします")
+        return
+
+    document = docx.Document()
+    for i in range(ingest.DOCX_PARAGRAPHS_PER_PAGE + 5):
+        document.add_paragraph(f"段落{i}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "memo.docx")
+        document.save(path)
+        result = read_file(path, max_pages=1)
+    assert result.truncated and result.pages == ingest.DOCX_PARAGRAPHS_PER_PAGE
+    assert result.text.startswith("段落0\n段落1\n")
+    print(f"✅ {result.pages}段落で打ち切りました")
+
+
+def test_parallel_pdf_extraction():
+    """並列抽出はページ順に組み立て直し、文字数の上限で止まる"""
+    print_separator()
+    print("PDFの並列抽出のテスト")
+    print_separator()
+
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        print("⚠️ pypdf が無いためスキップします")
+        return
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+    from bench_pdf_extract import build_pdf
+
+    num_pages = ingest.PDF_PARALLEL_MIN_PAGES + 8
+    data = build_pdf(num_pages, lines_per_page=20)
+    serial_text, pages, truncated = ingest.extract_pdf(data, max_pages=num_pages, workers=1)
+    assert pages == num_pages and not truncated
+
+    progress = []
+    parallel_text, pages, truncated = ingest.extract_pdf(
+        data, max_pages=num_pages, workers=2, progress_callback=lambda done, total: progress.append((done, total))
+    )
+    assert parallel_text == serial_text, "並列抽出の結果がページ順になっていない"
+    assert progress[-1] == (num_pages, num_pages)
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+    print(f"✅ {num_pages}ページを並列に抽出し、1プロセスの結果と一致しました")
+
+    text, pages, truncated = ingest.extract_pdf(data, max_pages=num_pages, max_chars=3000, workers=2)
+    assert truncated and pages < num_pages and text == serial_text[:3000]
+    print(f"✅ 3,000文字に達した時点で {pages}ページで打ち切りました")
+
+
+def main():
+    test_decode_japanese_encodings()
+    test_limits_and_cache()
+    test_docx_paragraph_limit()
+    test_parallel_pdf_extraction()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+バックグラウンドジョブ管理（services/jobs.py）のテストスクリプト
+
+偽のイベント列でジョブを実行し、重複実行の抑止・結果の保持・失敗の記録を確認します。
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.jobs import JOB_DONE, JOB_FAILED, JOB_RUNNING, JobManager, memo_hash
+from services.squad_events import AgentFinished, AgentStarted, Progress, SquadResult
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+def wait_until_finished(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while job.status == JOB_RUNNING and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job.status
+
+
+def test_job_lifecycle():
+    """実行中の同一ジョブは再利用し、終了後は結果とイベントを保持する"""
+    print_separator()
+    print("ジョブのライフサイクルのテスト")
+    print_separator()
+
+    manager = JobManager(max_workers=2)
+    release = threading.Event()
+    started = []
+
+    def make_events():
+        started.append(1)
+        yield Progress(15, "ブリーフィング中...")
+        yield AgentStarted("orchestrator")
+        yield AgentFinished("orchestrator", "開始しましょう。")
+        release.wait(5)
+        yield Progress(100, "完了！")
+        yield SquadResult(report="# レポート", internal_hits=[], academic_results=[])
+
+    key = memo_hash("面談メモ", "研究開発部", "gemini-2.5-flash-lite")
+    job = manager.submit("session-a", key, make_events, context={"form_data": {"company_name": "A社"}})
+    # 実行中に同じメモで再投入しても、新しいジョブは作らない
+    assert manager.submit("session-a", key, make_events).id == job.id
+    # 別セッションは別のジョブ
+    other = manager.submit("session-b", key, make_events)
+    assert other.id != job.id
+
+    time.sleep(0.1)
+    assert job.status == JOB_RUNNING
+    assert job.progress == (15, "ブリーフィング中...")
+
+    release.set()
+    assert wait_until_finished(job) == JOB_DONE
+    assert wait_until_finished(other) == JOB_DONE
+    status, events, progress_log = job.snapshot()
+    assert job.result.report == "# レポート"
+    assert [text for _, text in progress_log] == ["ブリーフィング中...", "完了！"]
+    assert manager.get(job.id) is job and manager.find("session-a", key) is job
+    assert job.context["form_data"]["company_name"] == "A社"
+    assert len(started) == 2
+    print("✅ 重複実行を抑止し、結果を保持しました")
+
+
+def test_job_failure_and_expiry():
+    """失敗したジョブは例外を記録し、保持期間を過ぎると削除される"""
+    print_separator()
+    print("ジョブの失敗・期限切れのテスト")
+    print_separator()
+
+    manager = JobManager(max_workers=1, ttl_seconds=0)
+
+    def failing_events():
+        yield Progress(5, "データを保存中...")
+        raise RuntimeError("データの保存に失敗しました")
+
+    job = manager.submit("session-a", memo_hash("メモ"), failing_events)
+    assert wait_until_finished(job) == JOB_FAILED
+    assert isinstance(job.error, RuntimeError)
+
+    # 結果のないまま終わったジョブも失敗扱い
+    empty = manager.submit("session-a", memo_hash("別のメモ"), lambda: iter([Progress(5, "...")]))
+    assert wait_until_finished(empty) == JOB_FAILED
+
+    time.sleep(0.01)
+    manager.submit("session-b", memo_hash("新しいメモ"), lambda: iter([]))
+    assert manager.get(job.id) is None, "期限切れのジョブが残っている"
+    print("✅ 失敗を記録し、期限切れのジョブを削除しました")
+
+
+def main():
+    test_job_lifecycle()
+    test_job_failure_and_expiry()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+起動時のインポートのテストスクリプト
+
+起動時に読み込まれる軽量なモジュールが、langchain・Supabase などの重い依存を
+インポートしていないことを新しいプロセスで確認します。
+アプリ全体（import app）の時間は benchmarks/bench_import_time.py で計測します。
+"""
+
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+# 起動時（ジョブ表・イベント型の参照時）に読み込んではいけないモジュール
+HEAVY_MODULES = [
+    "langchain_core",
+    "langchain_google_genai",
+    "langchain_community",
+    "langchain_openai",
+    "openai",
+    "supabase",
+    "pypdf",
+    "docx",
+]
+
+LIGHT_MODULES = [
+    "services.squad_events",
+    "services.jobs",
+    "services.resilience",
+    "services.ingest",
+    "services.prefetch",
+    "services.tag_ranker",
+    "services.chunking",
+    "services.vector_mirror",
+]
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+def loaded_heavy_modules(module: str) -> list:
+    """新しいプロセスで module をインポートし、読み込まれた重い依存を返す"""
+    code = (
+        "import sys\n"
+        f"import {module}\n"
+        f"heavy = {HEAVY_MODULES!r}\n"
+        "print(','.join(name for name in heavy if name in sys.modules))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    return [name for name in proc.stdout.strip().split(",") if name]
+
+
+def test_light_modules():
+    """ジョブ管理とイベント型は分隊本体を読み込まずにインポートできる"""
+    print_separator()
+    print("軽量モジュールのインポートのテスト")
+    print_separator()
+
+    for module in LIGHT_MODULES:
+        heavy = loaded_heavy_modules(module)
+        assert not heavy, f"{module} が重い依存を読み込んでいます: {heavy}"
+        print(f"✅ {module}")
+
+
+def test_squad_reexports_events():
+    """分隊本体からも同じイベント型を参照できる（後方互換）"""
+    print_separator()
+    print("イベント型の再エクスポートのテスト")
+    print_separator()
+
+    try:
+        import services.squad as squad
+    except ImportError as e:
+        print(f"⚠️ 依存パッケージが無いためスキップします: {e}")
+        return
+
+    from services import squad_events
+    assert squad.Progress is squad_events.Progress
+    assert squad.SquadResult is squad_events.SquadResult
+    assert squad.ORCHESTRATOR == squad_events.ORCHESTRATOR
+    print("✅ services.squad から同じイベント型を参照できました")
+
+
+def main():
+    test_light_modules()
+    test_squad_reexports_events()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+LLM呼び出しの耐障害性（services/resilience.py）のテストスクリプト
+
+失敗を注入する偽のLLMで、再試行・サーキットブレーカー・フォールバックを確認します。
+APIキーは不要です。
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientChatModel,
+    is_retryable_error,
+)
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+class ServiceUnavailable(Exception):
+    """google_exceptions.ServiceUnavailable の代わり（メッセージで判定される）"""
+
+
+class FlakyLLM:
+    """最初の failures 回だけ失敗する偽のLLM"""
+
+    def __init__(self, failures: int, error: Exception = None, name: str = "primary"):
+        self.failures = failures
+        self.error = error or ServiceUnavailable("503 The model is overloaded.")
+        self.name = name
+        self.calls = 0
+
+    def _maybe_fail(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+
+    def invoke(self, input, config=None, **kwargs):
+        self._maybe_fail()
+        return SimpleNamespace(content=f"{self.name}の応答")
+
+    def stream(self, input, config=None, **kwargs):
+        self._maybe_fail()
+        for text in [self.name, "の", "応答"]:
+            yield SimpleNamespace(content=text)
+
+
+    def with_structured_output(self, schema, **kwargs):
+        return DerivedFlakyLLM(self, {"schema": schema})
+
+    def bind(self, **kwargs):
+        return DerivedFlakyLLM(self, kwargs)
+
+
+class DerivedFlakyLLM:
+    """FlakyLLM の with_structured_output / bind の戻り値（失敗回数は元のLLMと共有する）"""
+
+    def __init__(self, parent: FlakyLLM, options: dict):
+        self.parent = parent
+        self.options = options
+
+    def invoke(self, input, config=None, **kwargs):
+        self.parent._maybe_fail()
+        return {"model": self.parent.name, **self.options}
+
+
+class FakeClock:
+    """サーキットブレーカー用の手動で進める時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_model(llm, fallback=None, breaker=None, max_attempts=4):
+    sleeps = []
+    model = ResilientChatModel(
+        llm,
+        model_name="fake-model",
+        fallback=fallback,
+        max_attempts=max_attempts,
+        breaker=breaker or CircuitBreaker(failure_threshold=100),
+        sleep=sleeps.append,
+    )
+    return model, sleeps
+
+
+def test_retry_then_success():
+    """一時的な503は再試行で回復する"""
+    print_separator()
+    print("再試行のテスト")
+    print_separator()
+
+    llm = FlakyLLM(failures=2)
+    model, sleeps = make_model(llm)
+    assert model.invoke("こんにちは").content == "primaryの応答"
+    assert llm.calls == 3 and len(sleeps) == 2
+    assert all(0 <= delay <= 20 for delay in sleeps), sleeps
+
+    llm = FlakyLLM(failures=1)
+    model, _ = make_model(llm)
+    assert "".join(chunk.content for chunk in model.stream("こんにちは")) == "primaryの応答"
+    print("✅ invoke / stream とも再試行で成功しました")
+
+
+def test_non_retryable_error():
+    """入力エラーなどは再試行しない"""
+    print_separator()
+    print("再試行しないエラーのテスト")
+    print_separator()
+
+    llm = FlakyLLM(failures=5, error=ValueError("400 invalid argument"))
+    model, sleeps = make_model(llm, fallback=lambda: FlakyLLM(failures=0, name="fallback"))
+    try:
+        model.invoke("こんにちは")
+        raise AssertionError("例外が発生するはず")
+    except ValueError:
+        pass
+    assert llm.calls == 1 and not sleeps
+    assert is_retryable_error(TimeoutError())
+    assert not is_retryable_error(KeyError("content"))
+    print("✅ 再試行・フォールバックせずに例外を送出しました")
+
+
+def test_fallback():
+    """再試行しても失敗した場合はフォールバックモデルで続行する"""
+    print_separator()
+    print("フォールバックのテスト")
+    print_separator()
+
+    llm = FlakyLLM(failures=10)
+    fallback_llm = FlakyLLM(failures=0, name="fallback")
+    model, sleeps = make_model(llm, fallback=lambda: fallback_llm, max_attempts=3)
+    assert model.invoke("こんにちは").content == "fallbackの応答"
+    assert llm.calls == 3 and len(sleeps) == 2
+
+    llm = FlakyLLM(failures=10)
+    model, _ = make_model(llm, fallback=lambda: FlakyLLM(failures=0, name="fallback"), max_attempts=2)
+    assert "".join(chunk.content for chunk in model.stream("こんにちは")) == "fallbackの応答"
+    print("✅ フォールバックモデルの応答を返しました")
+
+
+def test_structured_output():
+    """with_structured_output / bind で作ったRunnableにも再試行・フォールバックが適用される"""
+    print_separator()
+    print("構造化出力のテスト")
+    print_separator()
+
+    llm = FlakyLLM(failures=1)
+    model, sleeps = make_model(llm)
+    assert model.bind(stop=["END"]).invoke("こんにちは") == {"model": "primary", "stop": ["END"]}
+    assert llm.calls == 2 and len(sleeps) == 1
+
+    llm = FlakyLLM(failures=10)
+    fallback_llm = FlakyLLM(failures=0, name="fallback")
+    model, sleeps = make_model(llm, fallback=lambda: fallback_llm, max_attempts=3)
+    structured = model.with_structured_output("Report")
+    assert isinstance(structured, ResilientChatModel)
+    assert structured.invoke("こんにちは") == {"model": "fallback", "schema": "Report"}
+    assert llm.calls == 3 and len(sleeps) == 2
+    print("✅ 構造化出力でも再試行し、フォールバックモデルの応答を返しました")
+
+
+def test_default_fallback_model():
+    """既定の設定で作ったクライアントは、既定モデルとは別のモデルにフォールバックする"""
+    print_separator()
+    print("既定のフォールバック先のテスト")
+    print_separator()
+
+    import services.llm as llm_module
+
+    created = []
+    original = (
+        llm_module.ChatGoogleGenerativeAI,
+        os.environ.get("GEMINI_API_KEY"),
+        os.environ.pop("LLM_FALLBACK_MODEL", None),
+    )
+    llm_module.ChatGoogleGenerativeAI = lambda **kwargs: created.append(kwargs["model"]) or FlakyLLM(failures=0)
+    os.environ["GEMINI_API_KEY"] = "dummy"
+    llm_module.clear_chat_models()
+    try:
+        client = llm_module.get_chat_model()
+        assert llm_module.DEFAULT_FALLBACK_MODEL != llm_module.DEFAULT_MODEL_NAME
+        assert client.fallback is not None, "既定のクライアントにフォールバック先が無い"
+        fallback = client.fallback()
+        assert fallback.model_name == llm_module.DEFAULT_FALLBACK_MODEL and fallback.fallback is None
+        assert created == [llm_module.DEFAULT_MODEL_NAME, llm_module.DEFAULT_FALLBACK_MODEL], created
+    finally:
+        llm_module.ChatGoogleGenerativeAI = original[0]
+        if original[1] is None:
+            os.environ.pop("GEMINI_API_KEY", None)
+        else:
+            os.environ["GEMINI_API_KEY"] = original[1]
+        if original[2] is not None:
+            os.environ["LLM_FALLBACK_MODEL"] = original[2]
+        llm_module.clear_chat_models()
+    print(f"✅ {llm_module.DEFAULT_MODEL_NAME} → {llm_module.DEFAULT_FALLBACK_MODEL} にフォールバックします")
+
+
+def test_circuit_breaker():
+    """連続失敗でブレーカーが開き、時間経過後に半開 → 成功で閉じる"""
+    print_separator()
+    print("サーキットブレーカーのテスト")
+    print_separator()
+
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    llm = FlakyLLM(failures=3)
+    model, _ = make_model(llm, breaker=breaker, max_attempts=3)
+
+    try:
+        model.invoke("こんにちは")
+        raise AssertionError("例外が発生するはず")
+    except ServiceUnavailable:
+        pass
+    assert breaker.state == "open"
+
+    # 開いている間は呼び出さずに即座に失敗する
+    try:
+        model.invoke("こんにちは")
+        raise AssertionError("例外が発生するはず")
+    except CircuitOpenError:
+        pass
+    assert llm.calls == 3
+
+    # フォールバックがあれば、開いている間もフォールバックで続行する
+    model_with_fallback, _ = make_model(llm, fallback=lambda: FlakyLLM(failures=0, name="fallback"), breaker=breaker)
+    assert model_with_fallback.invoke("こんにちは").content == "fallbackの応答"
+
+    clock.now += 31
+    assert breaker.state == "half_open"
+    assert model.invoke("こんにちは").content == "primaryの応答"
+    assert breaker.state == "closed"
+    print("✅ closed → open → half_open → closed と遷移しました")
+
+
+def test_lcel_chain():
+    """get_chat_model のクライアントを prompt | llm | StrOutputParser() のチェーンに組み込める"""
+    print_separator()
+    print("LCELのチェーンのテスト")
+    print_separator()
+
+    try:
+        from langchain_core.messages import AIMessage, AIMessageChunk
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.prompts import ChatPromptTemplate
+    except ImportError as e:
+        print(f"⚠️ 依存パッケージが無いためスキップします: {e}")
+        return
+    import services.llm as llm_module
+    import services.resilience as resilience
+
+    class FlakyChatModel(FlakyLLM):
+        """ChatGoogleGenerativeAI の代わり（最初の1回は503で失敗し、メッセージを返す）"""
+
+        def __init__(self, **kwargs):
+            super().__init__(failures=1)
+            self.prompts = []
+
+        def invoke(self, input, config=None, **kwargs):
+            self._maybe_fail()
+            self.prompts.append(input.to_string())
+            return AIMessage(content="スライドのHTML")
+
+        def stream(self, input, config=None, **kwargs):
+            self._maybe_fail()
+            for text in ["スライド", "のHTML"]:
+                yield AIMessageChunk(content=text)
+
+    created = []
+    original = (llm_module.ChatGoogleGenerativeAI, resilience.backoff_delay, os.environ.get("GEMINI_API_KEY"))
+    llm_module.ChatGoogleGenerativeAI = lambda **kwargs: created.append(FlakyChatModel(**kwargs)) or created[-1]
+    resilience.backoff_delay = lambda *args: 0.0
+    os.environ["GEMINI_API_KEY"] = "dummy"
+    llm_module.clear_chat_models()
+    try:
+        prompt = ChatPromptTemplate.from_messages([("system", "スライドを作成する"), ("human", "{company_name}")])
+        chain = prompt | llm_module.get_chat_model(model_name="fake-chain-model", temperature=0.9) | StrOutputParser()
+        assert chain.invoke({"company_name": "A社"}) == "スライドのHTML"
+        assert created[0].calls == 2 and "A社" in created[0].prompts[0], "チェーンの中で再試行していない"
+
+        created[0].failures = created[0].calls + 1
+        assert "".join(chain.stream({"company_name": "B社"})) == "スライドのHTML"
+    finally:
+        llm_module.ChatGoogleGenerativeAI, resilience.backoff_delay = original[:2]
+        if original[2] is None:
+            os.environ.pop("GEMINI_API_KEY", None)
+        else:
+            os.environ["GEMINI_API_KEY"] = original[2]
+        llm_module.clear_chat_models()
+    print("✅ チェーンの invoke / stream で再試行して応答を返しました")
+
+
+def main():
+    test_retry_then_success()
+    test_non_retryable_error()
+    test_fallback()
+    test_structured_output()
+    test_default_fallback_model()
+    test_circuit_breaker()
+    test_lcel_chain()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+先読み（services/prefetch.py）のテストスクリプト
+
+Embedding・社内検索・重要タグ選定・市場検索を差し替え、
+面談メモの読み込み時とAIレビュー完了時に始めた先読みの結果を、
+分隊の保存・社内検索・市場調査が再計算せずに使うことを確認します。
+先読みの期限が完了・最後の利用から数えられること、登録済みの面談メモではEmbedding APIを呼ばないこと、
+検索が失敗して空・不完全になった先読みの結果は使わずに再計算することも確認します。
+差し替えたモジュールの属性は、各テストの終わりに元に戻します。
+"""
+
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend
+import services.ai_review as ai_review
+import services.squad as squad
+from services import prefetch
+from services.prefetch import PrefetchCache
+
+MEMO = "放熱樹脂の熱伝導率 2.0 W/mK 以上、UL94 V-0 が必要"
+DEPARTMENT = "研究開発部"
+MODEL = "gemini-2.5-flash-lite"
+
+PAPER = {"title": "paper", "authors": ["A"], "published": "2024-01-01", "link": "http://arxiv.org/abs/0", "summary": "要約"}
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+class Patcher:
+    """モジュールの属性を差し替え、restore で元に戻す"""
+
+    def __init__(self):
+        self.originals = []
+
+    def set(self, target, name, value):
+        self.originals.append((target, name, getattr(target, name)))
+        setattr(target, name, value)
+
+    def restore(self):
+        for target, name, value in reversed(self.originals):
+            setattr(target, name, value)
+        self.originals.clear()
+
+
+def test_cache_deduplicates_and_expires():
+    """同じキーの先読みは1回だけ実行し、失敗・期限切れは None を返す"""
+    print_separator()
+    print("先読みキャッシュのテスト")
+    print_separator()
+
+    cache = PrefetchCache(ttl_seconds=0.2, max_workers=2)
+    calls = []
+    release = threading.Event()
+
+    def slow(value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    first = cache.submit("kind", ("a",), slow, 21)
+    assert cache.submit("kind", ("a",), slow, 21) is first
+    release.set()
+    assert cache.get("kind", ("a",)) == 42 and calls == [21]
+    assert cache.get("kind", ("missing",)) is None
+
+    cache.submit("kind", ("error",), lambda: 1 / 0)
+    assert cache.get("kind", ("error",)) is None, "失敗した先読みは None（呼び出し側で再計算）"
+
+    time.sleep(0.3)
+    assert cache.get("kind", ("a",)) is None, "期限切れの先読みが残っている"
+    print("✅ 重複実行を抑止し、失敗・期限切れは再計算に回しました")
+
+
+def test_ttl_counts_from_completion_and_access():
+    """実行中の先読みは期限切れにせず、期限は完了・最後の利用から数える"""
+    print_separator()
+    print("先読みの期限のテスト")
+    print_separator()
+
+    cache = PrefetchCache(ttl_seconds=0.5, max_workers=2)
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "done"
+
+    first = cache.submit("kind", ("slow",), slow)
+    time.sleep(0.7)
+    assert cache.submit("kind", ("slow",), slow) is first, "実行中の先読みが投入から数えて期限切れになった"
+    release.set()
+    assert cache.get("kind", ("slow",)) == "done" and calls == [1]
+
+    # 利用するたびに期限が延びる（完了から0.6秒後でも、最後の利用から0.3秒なら残る）
+    time.sleep(0.3)
+    assert cache.get("kind", ("slow",)) == "done"
+    time.sleep(0.3)
+    assert cache.get("kind", ("slow",)) == "done", "最後の利用から期限内の先読みが消えた"
+    time.sleep(0.7)
+    assert cache.get("kind", ("slow",)) is None, "期限切れの先読みが残っている"
+    print("✅ 実行中は保持し、完了・最後の利用から期限を数えました")
+
+
+def test_registered_memo_skips_embedding():
+    """同じ内容が登録済みの面談メモは、Embedding APIを呼ばずに保存済みのベクトルを使う"""
+    print_separator()
+    print("登録済みの面談メモの先読みのテスト")
+    print_separator()
+
+    embedded = []
+    digests = []
+    patcher = Patcher()
+    patcher.set(prefetch, "_cache", PrefetchCache(ttl_seconds=60, max_workers=2))
+    patcher.set(backend, "embed_text", lambda text: embedded.append(text) or [0.9])
+    patcher.set(backend, "find_document_by_hash", lambda digest: digests.append(digest) or {"id": 7, "embedding": [0.3, 0.4]})
+    try:
+        prefetch.start_memo_prefetch(MEMO, DEPARTMENT)
+        assert prefetch.prefetched_embedding(MEMO) == [0.3, 0.4]
+        assert embedded == [] and digests == [backend.content_hash(MEMO)], (embedded, digests)
+    finally:
+        patcher.restore()
+    print("✅ 登録済みの面談メモではEmbedding APIを呼びませんでした")
+
+
+def test_degraded_results_are_not_reused():
+    """検索が失敗して空・不完全になった先読みは保持せず、利用側で再計算する"""
+    print_separator()
+    print("失敗した検索の先読みのテスト")
+    print_separator()
+
+    calls = {"search": 0, "gather": 0}
+
+    def failing_search(*args, **kwargs):
+        # search_cross_pollination_hybrid はエラー時に空のリストを返す
+        calls["search"] += 1
+        return []
+
+    def failing_gather(selected_tags, use_case=""):
+        # 市場検索だけ失敗し、その情報源はエラー時の文言になる
+        calls["gather"] += 1
+        return "市場調査結果を取得できませんでした。", "特許の検索結果", [PAPER]
+
+    patcher = Patcher()
+    patcher.set(prefetch, "_cache", PrefetchCache(ttl_seconds=60, max_workers=4))
+    patcher.set(backend, "embed_text", lambda text: [0.1, 0.2])
+    patcher.set(backend, "find_document_by_hash", lambda digest: None)
+    patcher.set(backend, "search_cross_pollination_hybrid", failing_search)
+    patcher.set(squad, "gather_market_sources", failing_gather)
+    try:
+        prefetch.start_tag_prefetch(["PPS", "放熱樹脂"], MEMO, MODEL, priority_tags=["PPS"], department=DEPARTMENT)
+        lexical_query = backend.build_lexical_query(MEMO, prefetch.internal_search_tags(["PPS", "放熱樹脂"], ["PPS"]))
+        assert prefetch.prefetched_internal_hits(MEMO, DEPARTMENT, prefetch.INTERNAL_TOP_K, lexical_query) is None
+        assert prefetch.prefetched_market_sources(["PPS"], MEMO) is None
+        assert calls == {"search": 1, "gather": 1}, calls
+    finally:
+        patcher.restore()
+
+    assert squad.is_degraded_market_sources(("市場情報が見つかりませんでした。", "特許", [PAPER]))
+    assert squad.is_degraded_market_sources(("市場", "特許検索エラー: timeout", [PAPER]))
+    assert squad.is_degraded_market_sources(("市場", "特許", []))
+    assert not squad.is_degraded_market_sources(("市場", "特許", [PAPER]))
+    print("✅ 空・不完全な検索結果は先読みとして使わず、再計算に回しました")
+
+
+def test_squad_consumes_prefetched_results():
+    """先読みした結果を、保存・社内検索・市場調査がそのまま使う"""
+    print_separator()
+    print("分隊による先読み結果の利用のテスト")
+    print_separator()
+
+    calls = {"embed": 0, "search": 0, "select": 0, "gather": 0}
+
+    def fake_embed(text):
+        calls["embed"] += 1
+        return [0.1, 0.2]
+
+    def fake_search(query_text, department, top_k=5, query_embedding=None, ef_search=None, lexical_query=None):
+        calls["search"] += 1
+        assert query_embedding == [0.1, 0.2], "社内検索が先読みしたEmbeddingを使っていない"
+        assert lexical_query == "PPS 放熱樹脂 2.0 W/mK UL94 V-0", lexical_query
+        return [{"content": "他事業部の知見", "metadata": {"company": "A社", "department": "営業部"}}]
+
+    def fake_select(tech_tags, interview_memo="", max_tags=5, model_name=""):
+        calls["select"] += 1
+        return tech_tags[:max_tags]
+
+    def fake_gather(selected_tags, use_case=""):
+        calls["gather"] += 1
+        return "市場の検索結果", "特許の検索結果", [PAPER]
+
+    saved = {}
+
+    def fake_save(text, metadata, embedding=None):
+        saved["embedding"] = embedding
+        return {"id": 1, "embedding": embedding}
+
+    prompts = []
+    patcher = Patcher()
+    patcher.set(prefetch, "_cache", PrefetchCache(ttl_seconds=60, max_workers=4))
+    patcher.set(backend, "embed_text", fake_embed)
+    patcher.set(backend, "find_document_by_hash", lambda digest: None)
+    patcher.set(backend, "search_cross_pollination_hybrid", fake_search)
+    patcher.set(backend, "save_interview_note", fake_save)
+    patcher.set(squad, "select_important_tags", fake_select)
+    patcher.set(squad, "gather_market_sources", fake_gather)
+    patcher.set(ai_review, "select_important_tags", fake_select)
+    patcher.set(squad, "get_llm", lambda *args, **kwargs: SimpleNamespace(
+        invoke=lambda messages: prompts.append(messages[0].content) or SimpleNamespace(content="市場サマリー")
+    ))
+    try:
+        # 面談メモの読み込み時（AIレビュー中）
+        prefetch.start_memo_prefetch(MEMO, DEPARTMENT)
+        # AIレビューの完了時
+        prefetch.start_tag_prefetch(["PPS", "放熱樹脂"], MEMO, MODEL, department=DEPARTMENT)
+
+        # 分隊側（保存 → 社内検索 → 市場調査）
+        events = squad.iter_registration(MEMO, {"department": DEPARTMENT})
+        next(events)
+        next(events)
+        assert saved["embedding"] == [0.1, 0.2], "保存時に先読みしたEmbeddingが使われていない"
+
+        internal_data, hits = squad.search_internal_knowledge(MEMO, DEPARTMENT, tags=["PPS", "放熱樹脂"])
+        assert hits and "A社" in internal_data
+
+        summary, _ = squad.research_market(["PPS", "放熱樹脂"], use_case=MEMO, model_name=MODEL)
+        assert summary == "市場サマリー" and "市場の検索結果" in prompts[0]
+        assert calls == {"embed": 1, "search": 1, "select": 1, "gather": 1}, calls
+
+        # 事業部を変えた場合は先読みを使わず、その場で検索する
+        squad.search_internal_knowledge(MEMO, "製品開発部", query_embedding=[0.1, 0.2], tags=["PPS", "放熱樹脂"])
+        assert calls["search"] == 2
+    finally:
+        patcher.restore()
+    print("✅ Embedding・社内検索・市場検索はそれぞれ1回だけ実行されました")
+
+
+def main():
+    test_cache_deduplicates_and_expires()
+    test_ttl_counts_from_completion_and_access()
+    test_registered_memo_skips_embedding()
+    test_degraded_results_are_not_reused()
+    test_squad_consumes_prefetched_results()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
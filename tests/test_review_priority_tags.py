@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+AIレビューの重要タグ（ReviewResult.priority_tags）のテストスクリプト
+
+LLMを差し替え、1回のレビュー呼び出しで技術タグと重要タグが同時に得られること、
+市場調査が重要タグを使って select_important_tags（2回目のLLM呼び出し）を省くことを確認します。
+"""
+
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.ai_review as ai_review
+import services.squad as squad
+from services.ai_review import PRIORITY_TAG_COUNT, normalize_priority_tags
+
+TECH_TAGS = ["EVバッテリー", "放熱樹脂", "PPS", "熱伝導率", "UL94 V-0", "耐熱性", "コスト"]
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+class FakeLLM:
+    """レビュー結果のJSONを返すLLM（呼び出し回数を数える）"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return SimpleNamespace(content=json.dumps(self.payload, ensure_ascii=False))
+
+
+def test_normalize_priority_tags():
+    """tech_tags にないタグ・重複は除き、足りない分は tech_tags の順に補う"""
+    print_separator()
+    print("重要タグの正規化のテスト")
+    print_separator()
+
+    assert normalize_priority_tags(["PPS", "PPS", "存在しないタグ", " 放熱樹脂 "], TECH_TAGS) == [
+        "PPS", "放熱樹脂", "EVバッテリー", "熱伝導率", "UL94 V-0",
+    ]
+    assert normalize_priority_tags(["存在しないタグ"], TECH_TAGS) == [], "有効なタグがなければ空（従来の選定に回す）"
+    assert normalize_priority_tags(["PPS"], ["PPS", "耐熱性"]) == ["PPS", "耐熱性"]
+    print("✅ 重要タグを正規化しました")
+
+
+def test_single_review_call():
+    """1回のレビューで tech_tags と priority_tags が得られ、市場調査は再選定しない"""
+    print_separator()
+    print("レビュー1回で重要タグまで得るテスト")
+    print_separator()
+
+    llm = FakeLLM({
+        "is_sufficient": True,
+        "questions": [],
+        "summary": "EV用放熱樹脂のニーズ",
+        "tech_tags": TECH_TAGS,
+        "priority_tags": ["放熱樹脂", "PPS", "熱伝導率", "UL94 V-0", "EVバッテリー"],
+    })
+    ai_review.get_chat_model = lambda *args, **kwargs: llm
+    result = ai_review.review_interview_content("面談メモ")
+    assert llm.calls == 1
+    assert result.tech_tags == TECH_TAGS
+    assert result.priority_tags == ["放熱樹脂", "PPS", "熱伝導率", "UL94 V-0", "EVバッテリー"]
+    assert len(result.priority_tags) == PRIORITY_TAG_COUNT
+
+    def fail_select(*args, **kwargs):
+        raise AssertionError("重要タグがあるのに select_important_tags が呼ばれた")
+
+    searched = {}
+
+    def fake_gather(selected_tags, use_case=""):
+        searched["tags"] = selected_tags
+        return "市場の検索結果", "", []
+
+    squad.select_important_tags = fail_select
+    squad.gather_market_sources = fake_gather
+    squad.get_llm = lambda *args, **kwargs: SimpleNamespace(invoke=lambda messages: SimpleNamespace(content="要約"))
+    summary, _ = squad.research_market(result.tech_tags, use_case="面談メモ", priority_tags=result.priority_tags)
+    assert summary == "要約" and searched["tags"] == result.priority_tags
+    print("✅ LLM呼び出し1回で技術タグと重要タグを取得し、市場調査で再選定しませんでした")
+
+
+def main():
+    test_normalize_priority_tags()
+    test_single_review_call()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
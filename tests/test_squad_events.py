@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+イノベーション分隊のイベントストリーム（services/squad.py）のテストスクリプト
+
+LLM・市場調査・社内検索を差し替え、APIキーやStreamlitなしで
+イベントの順序と最終結果を確認します。
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.squad as squad
+from services.squad import (
+    AgentStarted,
+    TokenDelta,
+    AgentFinished,
+    Progress,
+    SquadResult,
+)
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+class FakeLLM:
+    """invoke / stream の応答を固定したLLM"""
+
+    def invoke(self, messages):
+        return SimpleNamespace(content="固定の応答")
+
+    def stream(self, messages):
+        for text in ["提案", "の", "本文"]:
+            yield SimpleNamespace(content=text)
+
+
+def patch_squad():
+    """外部呼び出しを差し替える"""
+    squad.get_llm = lambda *args, **kwargs: FakeLLM()
+    squad.research_market = lambda tech_tags, use_case="", model_name="", priority_tags=None: (
+        "市場サマリー",
+        [{"title": "paper"}],
+    )
+    squad.search_internal_knowledge = lambda query_text, department, query_embedding=None, tags=None: (
+        "- A社 (営業部): 知見",
+        [{"content": "知見", "metadata": {}}],
+    )
+
+
+SQUAD_ARGS = dict(interview_memo="面談メモ", tech_tags=["PPS"], department="研究開発部")
+
+
+def test_event_order():
+    """イベントの順序と最終結果を確認"""
+    print_separator()
+    print("イベント順序のテスト")
+    print_separator()
+    patch_squad()
+
+    events = list(squad.iter_innovation_squad(**SQUAD_ARGS))
+
+    assert isinstance(events[-1], SquadResult), "最後のイベントは SquadResult であること"
+    assert sum(isinstance(e, SquadResult) for e in events) == 1, "SquadResult は1回だけ"
+
+    percents = [e.percent for e in events if isinstance(e, Progress)]
+    assert percents == sorted(percents) and percents[-1] == 100, f"進捗が単調増加していない: {percents}"
+
+    finished = [e.agent for e in events if isinstance(e, AgentFinished)]
+    assert finished == [
+        squad.ORCHESTRATOR,
+        squad.MARKET_RESEARCHER,
+        squad.INTERNAL_SPECIALIST,
+        squad.ORCHESTRATOR,
+        squad.SOLUTION_ARCHITECT,
+        squad.ORCHESTRATOR,
+        squad.DEVILS_ADVOCATE,
+        squad.ORCHESTRATOR,
+        squad.SOLUTION_ARCHITECT,
+        squad.ORCHESTRATOR,
+    ], f"発言順が想定と異なる: {finished}"
+
+    # 各発言は AgentStarted → (TokenDelta...) → AgentFinished の順
+    open_agents = set()
+    for event in events:
+        if isinstance(event, AgentStarted):
+            open_agents.add(event.agent)
+        elif isinstance(event, TokenDelta):
+            assert event.agent in open_agents, "開始前に TokenDelta が届いた"
+        elif isinstance(event, AgentFinished):
+            assert event.agent in open_agents, "開始前に AgentFinished が届いた"
+            open_agents.discard(event.agent)
+    assert not open_agents, f"終了していないエージェントがある: {open_agents}"
+
+    result = events[-1]
+    assert result.proposal == "提案の本文"
+    assert result.market_data == "市場サマリー"
+    assert len(result.internal_hits) == 1 and len(result.academic_results) == 1
+    print(f"✅ イベント数: {len(events)}")
+
+
+def test_run_squad_and_async():
+    """run_squad と非同期版が同じ結果を返すことを確認"""
+    print_separator()
+    print("run_squad / aiter_innovation_squad のテスト")
+    print_separator()
+    patch_squad()
+
+    seen = []
+    result = squad.run_squad(on_event=seen.append, **SQUAD_ARGS)
+    assert isinstance(result, SquadResult) and seen[-1] is result
+
+    async def collect():
+        return [event async for event in squad.aiter_innovation_squad(**SQUAD_ARGS)]
+
+    async_events = asyncio.run(collect())
+    assert [e.type for e in async_events] == [e.type for e in seen], "同期版と非同期版のイベント列が異なる"
+    assert async_events[-1].report == result.report
+    print(f"✅ レポート: {result.report}")
+
+
+def main():
+    test_event_order()
+    test_run_squad_and_async()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+ストリーミング描画（components/conversation_log.StreamingMessageRenderer）のテストスクリプト
+
+チャンクのまとめ描画と、確定済みブロックを変換し直さないことを確認します。
+バックグラウンドジョブの表示（services/multi_agent.SquadJobView）が、定期的な再描画のたびに
+確定した発言や確定済みブロックを変換し直さないことも確認します。
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import components.conversation_log as conversation_log
+from components.conversation_log import StreamingMessageRenderer, find_stable_boundary, render_message_html
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+class FakePlaceholder:
+    """st.empty() の代わりに描画内容を記録する"""
+
+    def __init__(self):
+        self.renders = []
+
+    def markdown(self, html, unsafe_allow_html=False):
+        self.renders.append(html)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_stable_boundary():
+    """空行でブロックが確定し、コードブロック内の空行では確定しない"""
+    print_separator()
+    print("ブロック境界のテスト")
+    print_separator()
+
+    text = "段落1\n\n```\ncode\n\nmore\n```\n\n書きかけ"
+    boundary = find_stable_boundary(text)
+    assert text[boundary:] == "書きかけ", repr(text[boundary:])
+    assert find_stable_boundary("```\ncode\n\n") == 0
+    print("✅ コードブロックの外の空行だけで区切りました")
+
+
+def test_coalescing_and_incremental():
+    """チャンクをまとめて描画し、Markdown変換は末尾のブロックだけ行う"""
+    print_separator()
+    print("まとめ描画・差分変換のテスト")
+    print_separator()
+
+    converted = []
+    original = conversation_log.markdown_to_html
+
+    def counting_markdown_to_html(content):
+        converted.append(content)
+        return original(content)
+
+    conversation_log.markdown_to_html = counting_markdown_to_html
+    try:
+        clock = FakeClock()
+        placeholder = FakePlaceholder()
+        renderer = StreamingMessageRenderer(placeholder, "assistant", "🤖", min_interval=0.1, min_chars=1000, clock=clock)
+
+        chunks = [f"段落{i}の本文です。\n\n" for i in range(50)]
+        for chunk in chunks:
+            clock.now += 0.01  # 0.01秒ごとにチャンクが届く
+            renderer.append(chunk)
+
+        # 50チャンクに対して、描画は最初の1回 + 0.1秒ごと
+        assert len(placeholder.renders) <= 7, len(placeholder.renders)
+        # 確定したブロックは一度しか変換しないため、変換した文字数の合計は全文の長さ程度に収まる
+        total = sum(len(c) for c in converted)
+        assert total <= len("".join(chunks)) + 100, total
+
+        renderer.finish("".join(chunks))
+        assert placeholder.renders[-1] == render_message_html("assistant", "🤖", "".join(chunks))
+    finally:
+        conversation_log.markdown_to_html = original
+
+    print(f"✅ 描画回数: {len(placeholder.renders)} / チャンク数: {len(chunks)}")
+
+
+def test_squad_job_view():
+    """ジョブの表示は追加されたイベントだけを取り込み、再描画では途中経過の末尾だけを変換する"""
+    print_separator()
+    print("ジョブの表示（SquadJobView）のテスト")
+    print_separator()
+
+    import services.multi_agent as multi_agent
+    from services.multi_agent import AGENT_AVATARS, SquadJobView
+    from services.squad import AgentFinished, AgentStarted, DEVILS_ADVOCATE, INTERNAL_SPECIALIST, SOLUTION_ARCHITECT, TokenDelta
+
+    converted = []
+    original_markdown_to_html = conversation_log.markdown_to_html
+    original_st = multi_agent.st
+    placeholders = []
+
+    def counting_markdown_to_html(content):
+        converted.append(content)
+        return original_markdown_to_html(content)
+
+    def fake_empty():
+        placeholders.append(FakePlaceholder())
+        return placeholders[-1]
+
+    conversation_log.markdown_to_html = counting_markdown_to_html
+    multi_agent.st = SimpleNamespace(empty=fake_empty)
+    try:
+        events = [
+            AgentFinished(INTERNAL_SPECIALIST, "社内の知見です。"),
+            AgentStarted(SOLUTION_ARCHITECT, streaming=True),
+        ]
+        view = SquadJobView("job-1")
+        chunks = [f"段落{i}の提案です。\n\n" for i in range(40)]
+        for i, chunk in enumerate(chunks):
+            events.append(TokenDelta(SOLUTION_ARCHITECT, chunk))
+            # 1秒ごとのポーリングを想定し、イベント列の全体を渡して再描画する
+            view.update(list(events))
+            view.render_streams()
+            assert view.consumed == len(events)
+
+        assert [m["content"] for m in view.finished] == ["社内の知見です。"]
+        assert len(placeholders) == len(chunks) and placeholders[-1].renders[-1].count("段落39") == 1
+        # 確定したブロックは一度しか変換しないため、変換した文字数の合計は全文の長さ程度に収まる
+        total = sum(len(c) for c in converted)
+        assert total <= len("".join(chunks)) + 100, total
+
+        # ストリーミングの空の応答は残さず、ストリーミングしない発言は空でも残す
+        events += [
+            AgentFinished(SOLUTION_ARCHITECT, "".join(chunks)),
+            AgentStarted(DEVILS_ADVOCATE, streaming=True),
+            AgentFinished(DEVILS_ADVOCATE, ""),
+        ]
+        view.update(events)
+        assert not view.streams
+        assert [m["avatar"] for m in view.finished] == [AGENT_AVATARS[INTERNAL_SPECIALIST], AGENT_AVATARS[SOLUTION_ARCHITECT]]
+        assert view.finished == multi_agent.conversation_log_from_events(events)
+    finally:
+        conversation_log.markdown_to_html = original_markdown_to_html
+        multi_agent.st = original_st
+
+    print(f"✅ {len(chunks)}回の再描画で変換した文字数: {total} / 全文: {len(''.join(chunks))}")
+
+
+def main():
+    test_stable_boundary()
+    test_coalescing_and_incremental()
+    test_squad_job_view()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+技術タグのローカルランキング（services/tag_ranker.py）のテストスクリプト
+
+用語辞書・面談メモ内の出現回数・一般語のペナルティによる順位付けと、
+信頼度が十分なときは select_important_tags がLLMを呼ばないこと、
+低いときだけLLMで選定することを確認します。
+"""
+
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.ai_review as ai_review
+from services.ai_review import DEFAULT_TECH_TAGS
+from services.tag_ranker import get_min_confidence, is_generic, lexicon_categories, rank_tags
+
+MEMO = (
+    "EV向けバッテリーモジュールのハウジングにPPSを検討中。"
+    "熱伝導率 2.0 W/mK 以上、UL94 V-0、CTI 600V 以上が必要。PPSの流動性が課題。"
+)
+GENERIC_TAGS = ["技術", "開発", "課題", "製品", "コスト", "市場", "品質"]
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+class FakeLLM:
+    """番号付きリストを返すLLM（呼び出し回数を数える）"""
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return SimpleNamespace(content=self.content)
+
+
+def test_lexicon_matching():
+    """略号は別の英単語の一部では一致せず、全角・半角の違いは吸収する"""
+    print_separator()
+    print("用語辞書の照合のテスト")
+    print_separator()
+
+    assert lexicon_categories("PPS") == ("material",)
+    assert lexicon_categories("高耐熱PA66") == ("material", "property")
+    assert lexicon_categories("ＵＬ９４ Ｖ－０") == ("property",), "全角の表記が一致しない"
+    assert "material" not in lexicon_categories("SPACE"), "単語の一部（PA）に一致している"
+    assert is_generic("コスト") and not is_generic("コスト低減樹脂")
+    print("✅ 略号・全角表記・一般語を判定しました")
+
+
+def test_rank_tags():
+    """材料・物性・メモで繰り返し出るタグが上位になり、一般語は下位になる"""
+    print_separator()
+    print("順位付けのテスト")
+    print_separator()
+
+    tags = ["コスト", "技術", "PPS", "市場", "熱伝導率", "UL94 V-0", "放熱樹脂", "課題"]
+    ranking = rank_tags(tags, MEMO, max_tags=4)
+    assert set(ranking.tags) == {"PPS", "熱伝導率", "UL94 V-0", "放熱樹脂"}, ranking.tags
+    assert ranking.tags[0] in ("PPS", "UL94 V-0"), "メモで繰り返し出るタグが上位にない"
+    assert ranking.confidence >= get_min_confidence()
+    assert ranking.scores["コスト"] < 0
+    print(f"✅ {ranking.tags}（信頼度 {ranking.confidence}）")
+
+    generic = rank_tags(GENERIC_TAGS, MEMO, max_tags=5)
+    assert generic.confidence < get_min_confidence(), "辞書で判断できないのに信頼度が高い"
+    print(f"✅ 一般語だけのタグは信頼度 {generic.confidence} でした")
+
+    assert rank_tags(tags, MEMO, max_tags=4) == ranking, "同じ入力で結果が変わった"
+
+    started = time.perf_counter()
+    for _ in range(100):
+        rank_tags(DEFAULT_TECH_TAGS, MEMO, max_tags=5)
+    elapsed_us = (time.perf_counter() - started) / 100 * 1_000_000
+    print(f"✅ {len(DEFAULT_TECH_TAGS)}タグの順位付け: {elapsed_us:.0f}µs/回")
+
+
+def test_select_important_tags_uses_llm_only_when_unsure():
+    """信頼度が十分ならLLMを呼ばず、低い場合だけLLMで選定する"""
+    print_separator()
+    print("select_important_tags の高速経路のテスト")
+    print_separator()
+
+    llm = FakeLLM("\n".join(f"{i}. {tag}" for i, tag in enumerate(GENERIC_TAGS[:5], 1)))
+    original_get_chat_model = ai_review.get_chat_model
+    original_get_api_key = ai_review.get_api_key
+    ai_review.get_chat_model = lambda *args, **kwargs: llm
+    ai_review.get_api_key = lambda: "dummy"
+    try:
+        selected = ai_review.select_important_tags(DEFAULT_TECH_TAGS, interview_memo=MEMO, max_tags=5)
+        assert llm.calls == 0, "信頼度が十分なのにLLMが呼ばれた"
+        assert "PPS" in selected and len(selected) == 5
+        print(f"✅ LLMを呼ばずに選定: {selected}")
+
+        selected = ai_review.select_important_tags(GENERIC_TAGS, interview_memo=MEMO, max_tags=5)
+        assert llm.calls == 1 and selected == GENERIC_TAGS[:5]
+        print("✅ 信頼度が低い場合はLLMで選定しました")
+
+        def failing_model(*args, **kwargs):
+            raise RuntimeError("LLMが利用できない")
+
+        ai_review.get_chat_model = failing_model
+        ranking = rank_tags(GENERIC_TAGS, MEMO, max_tags=5)
+        assert ai_review.select_important_tags(GENERIC_TAGS, interview_memo=MEMO, max_tags=5) == ranking.tags
+    finally:
+        ai_review.get_chat_model = original_get_chat_model
+        ai_review.get_api_key = original_get_api_key
+    print("✅ LLMが失敗した場合は用語辞書の選定結果を返しました")
+
+
+def main():
+    test_lexicon_matching()
+    test_rank_tags()
+    test_select_important_tags_uses_llm_only_when_unsure()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+ベクトル索引のミラー（services/vector_mirror.py）のテストスクリプト
+
+Supabaseクライアントを差し替え、created_at の位置からの差分同期（同じ created_at の行や、
+長いトランザクションで後からコミットされた行を含む）、
+ファイルからの読み込み直し、事業部を除外した検索の結果が NumPy の厳密計算と一致すること、
+ミラーが古い場合に Supabase の検索へ切り替えることを確認します。
+社内データ検索エージェント（ハイブリッド検索）が、最新のミラーのベクトル検索の順位と
+DBの語句検索の順位をRRFで統合することも確認します。
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend
+import services.squad as squad
+from services.vector_mirror import VectorMirror
+
+DIMENSION = 1536
+DEPARTMENTS = ["研究開発部", "製品開発部", "営業部"]
+
+
+def print_separator():
+    """区切り線を表示"""
+    print("=" * 80)
+
+
+class FakeQuery:
+    """supabase.table("documents") の select / not_.is_ / or_ / gte / order / limit の最小限の代替"""
+
+    def __init__(self, db):
+        self.db = db
+        self.watermark = None
+        self.since = None
+        self.page_size = None
+        self.not_ = self
+
+    def select(self, columns):
+        return self
+
+    def is_(self, column, value):
+        return self
+
+    def or_(self, condition):
+        created_at, last_id = re.match(r'created_at\.gt\."(.*?)",and\(created_at\.eq\."(.*?)",id\.gt\.(.*)\)$', condition).group(1, 3)
+        self.watermark = (created_at, last_id)
+        return self
+
+    def gte(self, column, value):
+        assert column == "created_at"
+        self.since = datetime.fromisoformat(value)
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, count):
+        self.page_size = count
+        return self
+
+    def execute(self):
+        self.db.fetches += 1
+        rows = sorted(self.db.rows, key=lambda row: (row["created_at"], row["id"]))
+        if self.watermark:
+            rows = [row for row in rows if (row["created_at"], row["id"]) > self.watermark]
+        if self.since:
+            rows = [row for row in rows if datetime.fromisoformat(row["created_at"]) >= self.since]
+        return SimpleNamespace(data=rows[:self.page_size])
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.rows = []
+        self.fetches = 0
+
+    def table(self, name):
+        assert name == "documents"
+        return FakeQuery(self)
+
+    def add(self, n, created_at, rng):
+        for _ in range(n):
+            i = len(self.rows)
+            self.rows.append({
+                "id": f"doc-{i:04d}",
+                "content": f"面談メモ{i}の本文。" * 50,
+                "metadata": {"department": DEPARTMENTS[i % len(DEPARTMENTS)], "company": f"{i}社"},
+                # PostgREST と同じく文字列で返す
+                "embedding": "[" + ",".join(f"{v:.6f}" for v in rng.standard_normal(DIMENSION)) + "]",
+                "created_at": created_at,
+            })
+
+
+def exact_search(db, query, exclude_department, top_k):
+    """NumPyで厳密に計算した他事業部の上位top_k件のID"""
+    rows = [row for row in db.rows if row["metadata"]["department"] != exclude_department]
+    matrix = np.array([json.loads(row["embedding"]) for row in rows])
+    scores = matrix @ query / np.linalg.norm(matrix, axis=1) / np.linalg.norm(query)
+    return [rows[i]["id"] for i in np.argsort(-scores)[:top_k]]
+
+
+def test_incremental_sync_and_search():
+    """差分同期・読み込み直し・事業部の除外が正しく、結果が厳密計算と一致する"""
+    print_separator()
+    print("差分同期と検索のテスト")
+    print_separator()
+
+    for dtype in ("float16", "int8"):
+        rng = np.random.default_rng(0)
+        db = FakeSupabase()
+        # 一括登録を想定し、同じ created_at の行をページの大きさより多く入れる
+        db.add(25, "2026-01-01T00:00:00+00:00", rng)
+        db.add(5, "2026-01-02T00:00:00+00:00", rng)
+        query = rng.standard_normal(DIMENSION)
+
+        with tempfile.TemporaryDirectory() as directory:
+            mirror = VectorMirror(directory, dtype=dtype)
+            assert not mirror.is_fresh(), "同期前のミラーが最新と判定された"
+            assert mirror.sync(db, page_size=10) == 30 and mirror.count == 30
+            assert mirror.is_fresh()
+
+            db.add(4, "2026-01-03T00:00:00+00:00", rng)
+            db.fetches = 0
+            assert mirror.sync(db, page_size=10) == 4 and mirror.count == 34
+            assert db.fetches == 1, "重なりの範囲より前の行を取得し直している"
+
+            results = mirror.search(query, "製品開発部", top_k=5, match_threshold=-1.0)
+            expected = exact_search(db, query, "製品開発部", 5)
+            assert [r["id"] for r in results] == expected, (dtype, [r["id"] for r in results], expected)
+            assert all(r["metadata"]["department"] != "製品開発部" for r in results)
+            assert all(len(r["snippet"]) == 300 for r in results)
+
+            # 長いトランザクションで、同期済みの位置より前の created_at の行が後からコミットされた
+            db.add(1, "2026-01-02T23:58:00+00:00", rng)
+            assert mirror.sync(db, page_size=10) == 1 and mirror.count == 35, "重なりの範囲の行を取りこぼした"
+            assert mirror.sync(db, page_size=10) == 0 and mirror.count == 35, "追加済みの行を重複して追加した"
+            assert mirror.watermark == ("2026-01-03T00:00:00+00:00", "doc-0033")
+            expected = exact_search(db, query, "製品開発部", 5)
+
+            reloaded = VectorMirror(directory, dtype=dtype)
+            assert reloaded.count == 35 and reloaded.watermark == mirror.watermark
+            assert [r["id"] for r in reloaded.search(query, "製品開発部", top_k=5, match_threshold=-1.0)] == expected
+            print(f"✅ {dtype}: 30件 + 差分4件 + 後からコミットされた1件を同期し、厳密計算と同じ上位5件を返しました")
+
+
+def test_search_falls_back_when_stale():
+    """最新のミラーは Supabase を呼ばずに検索し、古いミラーは Supabase で検索して同期を始める"""
+    print_separator()
+    print("ミラーの鮮度による切り替えのテスト")
+    print_separator()
+
+    rng = np.random.default_rng(1)
+    db = FakeSupabase()
+    db.add(12, "2026-01-01T00:00:00+00:00", rng)
+    rpc_calls = []
+    backend.call_rpc = lambda name, params: rpc_calls.append(name) or []
+    backend.get_supabase_client = lambda: db
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["VECTOR_MIRROR_DIR"] = directory
+        try:
+            from services.vector_mirror import get_vector_mirror
+
+            mirror = get_vector_mirror()
+            backend.search_cross_pollination("dummy", "研究開発部", query_embedding=rng.standard_normal(DIMENSION).tolist())
+            assert rpc_calls == ["match_passages_cross"], "同期前のミラーで検索した"
+            mirror._sync_thread.join(timeout=30)
+            assert mirror.count == 12 and mirror.is_fresh(), "バックグラウンドの同期が完了していない"
+
+            started = time.perf_counter()
+            results = backend.search_cross_pollination("dummy", "研究開発部", top_k=3, query_embedding=rng.standard_normal(DIMENSION).tolist())
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            assert rpc_calls == ["match_passages_cross"], "最新のミラーがあるのに Supabase で検索した"
+            assert len(results) <= 3 and all(r["content"] == r["snippet"] for r in results)
+            print(f"✅ 同期後はミラーで検索しました（{elapsed_ms:.2f}ms）")
+
+            os.environ["VECTOR_MIRROR_MAX_AGE_SECONDS"] = "0"
+            mirror.synced_at -= 1
+            backend.search_cross_pollination("dummy", "研究開発部", query_embedding=rng.standard_normal(DIMENSION).tolist())
+            assert rpc_calls == ["match_passages_cross"] * 2, "古いミラーで検索した"
+            mirror._sync_thread.join(timeout=30)
+            print("✅ 古いミラーは使わず Supabase で検索しました")
+        finally:
+            os.environ.pop("VECTOR_MIRROR_DIR", None)
+            os.environ.pop("VECTOR_MIRROR_MAX_AGE_SECONDS", None)
+
+
+def test_hybrid_search_uses_mirror():
+    """最新のミラーがあれば、社内データ検索はベクトル検索をミラーで行い、語句検索の順位とRRFで統合する"""
+    print_separator()
+    print("ミラーを使うハイブリッド検索のテスト")
+    print_separator()
+
+    rng = np.random.default_rng(2)
+    db = FakeSupabase()
+    db.add(20, "2026-01-01T00:00:00+00:00", rng)
+    query = rng.standard_normal(DIMENSION)
+    vector_ranking = exact_search(db, query, "研究開発部", 20)
+    rpc_calls = []
+
+    def fake_rpc(function_name, params):
+        rpc_calls.append((function_name, params))
+        # ベクトル検索で5位の文書が、語句検索で1位になる
+        return [{"id": vector_ranking[4], "metadata": {"department": "営業部"}, "snippet": "UL94 V-0 を取得", "lexical_rank": 1}]
+
+    backend.call_rpc = fake_rpc
+    backend.get_supabase_client = lambda: db
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["VECTOR_MIRROR_DIR"] = directory
+        try:
+            from services.vector_mirror import get_vector_mirror
+
+            mirror = get_vector_mirror()
+            mirror.sync(db)
+            memo = "難燃性は UL94 V-0 が必要。"
+            _, hits = squad.search_internal_knowledge(memo, "研究開発部", query_embedding=query.tolist(), tags=["放熱樹脂"])
+            assert [name for name, _ in rpc_calls] == ["match_documents_lexical"], "ミラーがあるのにDBでベクトル検索した"
+            assert rpc_calls[0][1]["query_text"] == "放熱樹脂 UL94 V-0" and rpc_calls[0][1]["exclude_department"] == "研究開発部"
+
+            # 1 / (60 + 5) + 1 / (60 + 1) > 1 / (60 + 1) > 1 / (60 + 2)
+            assert [hit["id"] for hit in hits] == [vector_ranking[4], vector_ranking[0], vector_ranking[1]], hits
+            assert hits[0]["vector_rank"] == 5 and hits[0]["lexical_rank"] == 1 and hits[1]["lexical_rank"] is None
+            assert abs(hits[0]["rrf_score"] - (1 / 65 + 1 / 61)) < 1e-9
+            assert all(hit["content"] == hit["snippet"] for hit in hits)
+
+            similarities = mirror.similarities(query.tolist(), [vector_ranking[4], "missing"])
+            assert list(similarities) == [vector_ranking[4]] and abs(similarities[vector_ranking[4]] - hits[0]["similarity"]) < 1e-6
+            print("✅ ミラーのベクトル検索とDBの語句検索をRRFで統合しました")
+
+            # 古いミラーは使わず、DBのハイブリッド検索で探して同期を始める
+            rpc_calls.clear()
+            mirror.synced_at -= 10_000
+            backend.search_cross_pollination_hybrid(memo, "研究開発部", query_embedding=query.tolist())
+            assert [name for name, _ in rpc_calls] == ["match_documents_hybrid"], rpc_calls
+            mirror._sync_thread.join(timeout=30)
+            assert mirror.is_fresh()
+            print("✅ 古いミラーは使わず、DBのハイブリッド検索で探しました")
+        finally:
+            os.environ.pop("VECTOR_MIRROR_DIR", None)
+
+
+def main():
+    test_incremental_sync_and_search()
+    test_search_falls_back_when_stale()
+    test_hybrid_search_uses_mirror()
+    print_separator()
+    print("すべてのテストが成功しました")
+
+
+if __name__ == "__main__":
+    main()